@@ -16,6 +16,8 @@ CONTEXT = """
 - `allergies` (text): known allergies list
 - `medical_notes` (text): general medical history and notes
 - `is_active` (bool, default True): inactive = discharged or archived
+- `visit_count` (int, read-only): number of live treatments
+- `last_visit_date` (date, nullable, read-only): date of the latest treatment
 
 **Treatment** — a clinical encounter or treatment session linked to a patient.
 - `patient` (FK → PatientRecord): the patient treated
@@ -30,7 +32,7 @@ CONTEXT = """
 
 1. **Register a patient**: create PatientRecord with name and demographic info.
 2. **Record a visit**: create Treatment linked to the patient with date, description, diagnosis, and prescription.
-3. **View patient history**: query Treatment.objects.filter(patient=patient).order_by('-date').
+3. **View patient history**: query Treatment.objects.filter(patient=patient).order_by('-date', '-id') (indexed); PatientRecord.visit_count and last_visit_date hold the precomputed summary.
 4. **Archive a patient**: set PatientRecord.is_active=False.
 5. **Search patients**: filter PatientRecord by patient_name (icontains) or filter by is_active=True.
 
@@ -39,6 +41,8 @@ CONTEXT = """
 - Treatment.practitioner_id → UUID reference to accounts.LocalUser (no FK constraint)
 
 ### Notes
+- `list_patients` and `list_treatments` return at most 100 rows per call (long texts clipped); when `next_cursor` is set, call again with `cursor` to continue.
+- To record or edit many visits at once use `create_treatments_batch`, `update_patient_visits_batch` or `create_patients_batch` (up to 100 items, one confirmation, all-or-nothing) instead of repeated single-record calls.
 - This module contains sensitive health data — handle with appropriate confidentiality.
 - blood_type valid values: A+, A-, B+, B-, AB+, AB-, O+, O-.
 """
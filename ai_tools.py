@@ -1,32 +1,186 @@
 """AI tools for the Patient Records module."""
+import datetime
+import json
+import uuid
+
 from assistant.tools import AssistantTool, register_tool
 
+from patient_records.instrumentation import instrumented_tool
+
+DEFAULT_LIST_LIMIT = 20
+MAX_LIST_LIMIT = 100
+MAX_LIST_BYTES = 16 * 1024
+MAX_TEXT_CHARS = 300
+MAX_BATCH_ITEMS = 100
+
+LIST_PARAMETERS = {
+    "limit": {"type": "integer", "description": f"Rows per page (max {MAX_LIST_LIMIT})."},
+    "cursor": {"type": "string", "description": "next_cursor from the previous call, to continue the list."},
+}
+
+
+def _clip(value):
+    if isinstance(value, str) and len(value) > MAX_TEXT_CHARS:
+        return value[:MAX_TEXT_CHARS] + '…'
+    return value
+
+
+def _list_page(qs, column, sort_key, sort_dir, args, serialize):
+    """One bounded page of a ``values()`` queryset as ``(items, next_cursor)``.
+
+    At most ``MAX_LIST_LIMIT`` rows are read, and rows stop being added once
+    the serialized items reach ``MAX_LIST_BYTES``; the cursor then resumes
+    after the last row returned.
+    """
+    from patient_records.pagination import encode_cursor, paginate_keyset
+    try:
+        limit = int(args.get('limit') or DEFAULT_LIST_LIMIT)
+    except (TypeError, ValueError):
+        limit = DEFAULT_LIST_LIMIT
+    limit = min(max(limit, 1), MAX_LIST_LIMIT)
+    page = paginate_keyset(qs, column, sort_key, sort_dir, args.get('cursor'), limit)
+
+    items, size, next_cursor, last = [], 0, page.next_cursor, None
+    for row in page:
+        item = serialize(row)
+        item_size = len(json.dumps(item, default=str)) + 1
+        if last is not None and size + item_size > MAX_LIST_BYTES:
+            next_cursor = encode_cursor(sort_key, sort_dir, last[column], last['id'], 'next')
+            break
+        items.append(item)
+        size += item_size
+        last = row
+    return items, next_cursor
+
+
+class ItemError(ValueError):
+    """A batch item that fails validation."""
+
+
+def _text(item, field, max_length=None, required=False):
+    value = str(item.get(field) or '').strip()
+    if required and not value:
+        raise ItemError(f'{field} is required')
+    if max_length and len(value) > max_length:
+        raise ItemError(f'{field} is longer than {max_length} characters')
+    return value
+
+
+def _date(item, field, required=False):
+    value = str(item.get(field) or '').strip()
+    if not value:
+        if required:
+            raise ItemError(f'{field} is required')
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ItemError(f'{field} is not a YYYY-MM-DD date')
+
+
+def _uuid(item, field, required=False):
+    value = str(item.get(field) or '').strip()
+    if not value:
+        if required:
+            raise ItemError(f'{field} is required')
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise ItemError(f'{field} is not a valid id')
+
+
+def _validate_batch(items, build):
+    """Build every item with ``build(index, item)``; return ``(objs, errors)``.
+
+    ``errors`` lists ``{"index", "error"}`` for each invalid item; when it is
+    non-empty nothing should be written.
+    """
+    objs, errors = [], []
+    if len(items) > MAX_BATCH_ITEMS:
+        return [], [{"index": None, "error": f"At most {MAX_BATCH_ITEMS} items per call"}]
+    for index, item in enumerate(items):
+        try:
+            objs.append(build(index, item))
+        except ItemError as exc:
+            errors.append({"index": index, "error": str(exc)})
+    return objs, errors
+
+
+def _batch_parameters(properties, required):
+    return {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "maxItems": MAX_BATCH_ITEMS,
+                "items": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": required,
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["items"],
+        "additionalProperties": False,
+    }
+
+
+PATIENT_PROPERTIES = {
+    "patient_name": {"type": "string"}, "date_of_birth": {"type": "string"},
+    "gender": {"type": "string"}, "blood_type": {"type": "string"},
+    "allergies": {"type": "string"}, "medical_notes": {"type": "string"},
+}
+TREATMENT_PROPERTIES = {
+    "date": {"type": "string"}, "description": {"type": "string"},
+    "diagnosis": {"type": "string"}, "prescription": {"type": "string"},
+    "notes": {"type": "string"}, "practitioner_id": {"type": "string"},
+}
+
 
 @register_tool
+@instrumented_tool
 class ListPatients(AssistantTool):
     name = "list_patients"
-    description = "List patient records."
+    description = (
+        "List patient records of the current hub, ordered by name. "
+        "Pass next_cursor back as cursor to fetch the following page."
+    )
     module_id = "patient_records"
     required_permission = "patient_records.view_patientrecord"
     parameters = {
         "type": "object",
-        "properties": {"is_active": {"type": "boolean"}, "search": {"type": "string"}, "limit": {"type": "integer"}},
+        "properties": {"is_active": {"type": "boolean"}, "search": {"type": "string"}, **LIST_PARAMETERS},
         "required": [],
         "additionalProperties": False,
     }
 
     def execute(self, args, request):
+        from django.db.models import F
         from patient_records.models import PatientRecord
-        qs = PatientRecord.objects.all()
+        from patient_records.search import get_search_backend
+        qs = PatientRecord.objects.filter(hub_id=request.session.get('hub_id'), is_deleted=False)
         if 'is_active' in args:
             qs = qs.filter(is_active=args['is_active'])
         if args.get('search'):
-            qs = qs.filter(patient_name__icontains=args['search'])
-        limit = args.get('limit', 20)
-        return {"patients": [{"id": str(p.id), "patient_name": p.patient_name, "date_of_birth": str(p.date_of_birth) if p.date_of_birth else None, "gender": p.gender, "blood_type": p.blood_type, "allergies": p.allergies, "is_active": p.is_active} for p in qs[:limit]]}
+            qs = get_search_backend().search(qs, args['search'])
+        qs = qs.values(
+            'id', 'patient_name', 'date_of_birth', 'gender', 'blood_type',
+            'is_active', 'visit_count', 'last_visit_date', allergies=F('detail__allergies'),
+        )
+        patients, next_cursor = _list_page(qs, 'patient_name', 'name', 'asc', args, lambda p: {
+            "id": str(p['id']), "patient_name": p['patient_name'],
+            "date_of_birth": str(p['date_of_birth']) if p['date_of_birth'] else None,
+            "gender": p['gender'], "blood_type": p['blood_type'], "allergies": _clip(p['allergies']),
+            "is_active": p['is_active'], "visit_count": p['visit_count'],
+            "last_visit_date": str(p['last_visit_date']) if p['last_visit_date'] else None,
+        })
+        return {"patients": patients, "next_cursor": next_cursor}
 
 
 @register_tool
+@instrumented_tool
 class CreatePatient(AssistantTool):
     name = "create_patient"
     description = "Create a patient record."
@@ -55,28 +209,84 @@ class CreatePatient(AssistantTool):
 
 
 @register_tool
+@instrumented_tool
+class CreatePatientsBatch(AssistantTool):
+    name = "create_patients_batch"
+    description = (
+        f"Create up to {MAX_BATCH_ITEMS} patient records in one transaction. "
+        "All items are validated first; if any is invalid nothing is created."
+    )
+    module_id = "patient_records"
+    required_permission = "patient_records.add_patientrecord"
+    requires_confirmation = True
+    parameters = _batch_parameters(PATIENT_PROPERTIES, ["patient_name"])
+
+    def execute(self, args, request):
+        from patient_records import writes
+        from patient_records.models import PatientRecord
+        hub_id = request.session.get('hub_id')
+        user_id = request.session.get('local_user_id')
+
+        def build(index, item):
+            return PatientRecord(
+                hub_id=hub_id, created_by=user_id,
+                patient_name=_text(item, 'patient_name', 255, required=True),
+                date_of_birth=_date(item, 'date_of_birth'),
+                gender=_text(item, 'gender', 20), blood_type=_text(item, 'blood_type', 5),
+                allergies=_text(item, 'allergies'), medical_notes=_text(item, 'medical_notes'),
+            )
+
+        objs, errors = _validate_batch(args.get('items') or [], build)
+        if errors:
+            return {"created": 0, "errors": errors}
+        writes.create_patient_records(hub_id, objs)
+        return {
+            "created": len(objs),
+            "results": [{"index": i, "id": str(p.id), "patient_name": p.patient_name} for i, p in enumerate(objs)],
+        }
+
+
+@register_tool
+@instrumented_tool
 class ListTreatments(AssistantTool):
     name = "list_treatments"
-    description = "List patient treatments."
+    description = (
+        "List treatments of the current hub, newest first. "
+        "Pass next_cursor back as cursor to fetch the following page."
+    )
     module_id = "patient_records"
     required_permission = "patient_records.view_treatment"
     parameters = {
         "type": "object",
-        "properties": {"patient_id": {"type": "string"}, "limit": {"type": "integer"}},
+        "properties": {"patient_id": {"type": "string"}, **LIST_PARAMETERS},
         "required": [],
         "additionalProperties": False,
     }
 
     def execute(self, args, request):
+        from django.db.models import F
         from patient_records.models import Treatment
-        qs = Treatment.objects.select_related('patient').all()
+        qs = Treatment.objects.filter(hub_id=request.session.get('hub_id'), is_deleted=False)
         if args.get('patient_id'):
-            qs = qs.filter(patient_id=args['patient_id'])
-        limit = args.get('limit', 20)
-        return {"treatments": [{"id": str(t.id), "patient": t.patient.patient_name, "date": str(t.date), "description": t.description, "diagnosis": t.diagnosis, "prescription": t.prescription} for t in qs.order_by('-date')[:limit]]}
+            try:
+                qs = qs.filter(patient_id=uuid.UUID(str(args['patient_id'])))
+            except ValueError:
+                return {"error": "Invalid patient_id"}
+        qs = qs.values(
+            'id', 'patient_id', 'patient__patient_name', 'date', description=F('detail__description'),
+            diagnosis=F('detail__diagnosis'), prescription=F('detail__prescription'),
+        )
+        treatments, next_cursor = _list_page(qs, 'date', 'date', 'desc', args, lambda t: {
+            "id": str(t['id']), "patient_id": str(t['patient_id']) if t['patient_id'] else None,
+            "patient": t['patient__patient_name'], "date": str(t['date']),
+            "description": _clip(t['description']), "diagnosis": _clip(t['diagnosis']),
+            "prescription": _clip(t['prescription']),
+        })
+        return {"treatments": treatments, "next_cursor": next_cursor}
 
 
 @register_tool
+@instrumented_tool
 class CreateTreatment(AssistantTool):
     name = "create_treatment"
     description = "Create a treatment record for a patient."
@@ -105,6 +315,56 @@ class CreateTreatment(AssistantTool):
 
 
 @register_tool
+@instrumented_tool
+class CreateTreatmentsBatch(AssistantTool):
+    name = "create_treatments_batch"
+    description = (
+        f"Create up to {MAX_BATCH_ITEMS} treatment records in one transaction, e.g. a day's visits. "
+        "All items are validated first; if any is invalid nothing is created."
+    )
+    module_id = "patient_records"
+    required_permission = "patient_records.add_treatment"
+    requires_confirmation = True
+    parameters = _batch_parameters(
+        {"patient_id": {"type": "string"}, **TREATMENT_PROPERTIES}, ["patient_id", "date", "description"],
+    )
+
+    def execute(self, args, request):
+        from patient_records import writes
+        from patient_records.models import PatientRecord, Treatment
+        hub_id = request.session.get('hub_id')
+        user_id = request.session.get('local_user_id')
+        items = args.get('items') or []
+        requested = set()
+        for item in items[:MAX_BATCH_ITEMS]:
+            try:
+                requested.add(_uuid(item, 'patient_id'))
+            except ItemError:
+                pass
+        patient_ids = set(PatientRecord.objects.filter(
+            hub_id=hub_id, is_deleted=False, pk__in=requested - {None},
+        ).values_list('pk', flat=True))
+
+        def build(index, item):
+            patient_id = _uuid(item, 'patient_id', required=True)
+            if patient_id not in patient_ids:
+                raise ItemError('Patient not found')
+            return Treatment(
+                hub_id=hub_id, created_by=user_id, patient_id=patient_id,
+                date=_date(item, 'date', required=True), description=_text(item, 'description', required=True),
+                diagnosis=_text(item, 'diagnosis'), prescription=_text(item, 'prescription'),
+                notes=_text(item, 'notes'), practitioner_id=_uuid(item, 'practitioner_id'),
+            )
+
+        objs, errors = _validate_batch(items, build)
+        if errors:
+            return {"created": 0, "errors": errors}
+        writes.create_treatments(hub_id, objs)
+        return {"created": len(objs), "results": [{"index": i, "id": str(t.id)} for i, t in enumerate(objs)]}
+
+
+@register_tool
+@instrumented_tool
 class DeletePatient(AssistantTool):
     name = "delete_patient"
     description = "Deactivate (soft-delete) a patient record."
@@ -130,6 +390,7 @@ class DeletePatient(AssistantTool):
 
 
 @register_tool
+@instrumented_tool
 class UpdatePatientVisit(AssistantTool):
     name = "update_patient_visit"
     description = "Update a patient treatment/visit record."
@@ -167,6 +428,68 @@ class UpdatePatientVisit(AssistantTool):
 
 
 @register_tool
+@instrumented_tool
+class UpdatePatientVisitsBatch(AssistantTool):
+    name = "update_patient_visits_batch"
+    description = (
+        f"Update up to {MAX_BATCH_ITEMS} treatment/visit records in one transaction. "
+        "All items are validated first; if any is invalid nothing is updated."
+    )
+    module_id = "patient_records"
+    required_permission = "patient_records.change_treatment"
+    requires_confirmation = True
+    parameters = _batch_parameters({"treatment_id": {"type": "string"}, **TREATMENT_PROPERTIES}, ["treatment_id"])
+
+    def execute(self, args, request):
+        from patient_records import writes
+        from patient_records.models import Treatment
+        hub_id = request.session.get('hub_id')
+        user_id = request.session.get('local_user_id')
+        items = args.get('items') or []
+        requested = set()
+        for item in items[:MAX_BATCH_ITEMS]:
+            try:
+                requested.add(_uuid(item, 'treatment_id'))
+            except ItemError:
+                pass
+        treatments = Treatment.objects.filter(
+            hub_id=hub_id, is_deleted=False, pk__in=requested - {None},
+        ).select_related('detail').in_bulk()
+        fields, seen = set(), set()
+
+        def build(index, item):
+            treatment = treatments.get(_uuid(item, 'treatment_id', required=True))
+            if treatment is None:
+                raise ItemError('Treatment not found')
+            if treatment.pk in seen:
+                raise ItemError('Treatment appears more than once in the batch')
+            seen.add(treatment.pk)
+            values = {}
+            if 'date' in item:
+                values['date'] = _date(item, 'date', required=True)
+            if 'description' in item:
+                values['description'] = _text(item, 'description', required=True)
+            for field in ('diagnosis', 'prescription', 'notes'):
+                if field in item:
+                    values[field] = _text(item, field)
+            if 'practitioner_id' in item:
+                values['practitioner_id'] = _uuid(item, 'practitioner_id')
+            for field, value in values.items():
+                setattr(treatment, field, value)
+            fields.update(values)
+            treatment.updated_by = user_id
+            return treatment
+
+        objs, errors = _validate_batch(items, build)
+        if errors:
+            return {"updated": 0, "errors": errors}
+        if objs:
+            writes.update_treatments(hub_id, objs, [*sorted(fields), 'updated_by'])
+        return {"updated": len(objs), "results": [{"index": i, "id": str(t.id)} for i, t in enumerate(objs)]}
+
+
+@register_tool
+@instrumented_tool
 class DeletePatientVisit(AssistantTool):
     name = "delete_patient_visit"
     description = "Delete a patient treatment/visit record."
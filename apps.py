@@ -9,4 +9,4 @@ class PatientRecordsConfig(AppConfig):
     verbose_name = _('Patient Records')
 
     def ready(self):
-        pass
+        from . import signals  # noqa: F401
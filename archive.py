@@ -0,0 +1,308 @@
+"""
+Archive tier for old soft-deleted and long-inactive patients.
+
+``archive_hub`` moves patients soft-deleted more than ``DELETED_AFTER`` ago,
+or inactive with no change and no visit for ``INACTIVE_AFTER``, into
+``ArchivedPatientRecord`` together with all of their treatments, and moves
+treatments soft-deleted more than ``DELETED_AFTER`` ago into
+``ArchivedTreatment`` on their own. Rows are moved ``ARCHIVE_BATCH_SIZE``
+at a time with ``INSERT ... SELECT`` + ``DELETE``, one short transaction per
+batch, so the hot tables (and their indexes) only hold the working set.
+
+Patients that a merge still refers to are never archived: the merge log
+and its undo need them in the hot table.
+
+Archive tables keep every column of the hot tables with the clinical text
+of the detail tables inline (previews are recomputed on restore), are
+full-text indexed by ``search`` and are searched with ``search_archive``. ``restore_patient``
+moves a patient and its treatments back and undeletes the patient.
+Treatments archived on their own belong to a live patient; they are listed
+by ``search_archived_treatments`` and ``restore_treatment`` moves one back
+and undeletes it.
+Counters, rollups, the search index and the hub generation are kept in sync
+in both directions.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from . import details, generations, rollups, search, stats, visits
+from .models import ArchivedPatientRecord, ArchivedTreatment, PatientMerge, PatientRecord, Treatment
+
+ARCHIVE_BATCH_SIZE = 500
+DELETED_AFTER = timedelta(days=90)
+INACTIVE_AFTER = timedelta(days=2 * 365)
+
+# Columns that exist only on the archive tables.
+ARCHIVE_ONLY_COLUMNS = {'archived_at', 'archive_reason'}
+
+
+class ArchiveError(Exception):
+    """The requested restore is not possible."""
+
+
+def _columns(archive_model):
+    return [
+        field.column for field in archive_model._meta.concrete_fields if field.column not in ARCHIVE_ONLY_COLUMNS
+    ]
+
+
+def _db_ids(ids):
+    uuid_field = PatientRecord._meta.pk
+    return [uuid_field.get_db_prep_value(pk, connection) for pk in ids]
+
+
+def _copy(source, target, columns, ids, extra=()):
+    """``INSERT INTO target SELECT ... FROM source`` for the rows with the given ids.
+
+    ``columns`` holds ``(target column, source SQL)`` pairs and ``extra``
+    ``(column, value)`` pairs written as constants.
+    """
+    qn = connection.ops.quote_name
+    values = [target._meta.get_field(column).get_db_prep_value(value, connection) for column, value in extra]
+    target_columns = ', '.join(qn(column) for column in [
+        *(column for column, _sql in columns), *(column for column, _value in extra),
+    ])
+    select_columns = ', '.join([*(sql for _column, sql in columns), *(['%s'] * len(extra))])
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(target._meta.db_table)} ({target_columns}) '
+            f'SELECT {select_columns} FROM {qn(source._meta.db_table)} WHERE id IN ({placeholders})',
+            [*values, *_db_ids(ids)],
+        )
+
+
+def _archive_columns(source, archive_model):
+    """Hot row to archive row: the detail text is read through the detail table."""
+    return [(column, details.column_sql(source, column)) for column in _columns(archive_model)]
+
+
+def _restore_columns(target, archive_model):
+    """Archive row to hot row: the detail text becomes previews."""
+    qn = connection.ops.quote_name
+    columns = []
+    for column in _columns(archive_model):
+        if column not in target.DETAIL_FIELDS:
+            columns.append((column, qn(column)))
+        elif column in target.PREVIEW_FIELDS:
+            columns.append((target.PREVIEW_FIELDS[column], details.preview_sql(qn(column))))
+    return columns
+
+
+def _restore_details(source, target, ids):
+    qn = connection.ops.quote_name
+    rel = details.detail_relation(target)
+    columns = [(rel.field.column, qn('id')), *((field, qn(field)) for field in target.DETAIL_FIELDS)]
+    _copy(source, rel.related_model, columns, ids)
+
+
+def delete_rows(model, ids):
+    """Hard-delete rows (and their detail rows) by id with one ``DELETE`` each; no signals."""
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    rel = details.detail_relation(model)
+    with connection.cursor() as cursor:
+        if rel is not None:
+            cursor.execute(
+                f'DELETE FROM {qn(rel.related_model._meta.db_table)} WHERE {qn(rel.field.column)} IN ({placeholders})',
+                _db_ids(ids),
+            )
+        cursor.execute(f'DELETE FROM {qn(model._meta.db_table)} WHERE id IN ({placeholders})', _db_ids(ids))
+
+
+def _move(source, target, archive_model, ids, extra=()):
+    """Move rows between a hot table and its archive table, keeping the search index in step."""
+    for start in range(0, len(ids), search.ID_BATCH_SIZE):
+        chunk = ids[start:start + search.ID_BATCH_SIZE]
+        if source is archive_model:
+            _copy(source, target, _restore_columns(target, archive_model), chunk, extra)
+            _restore_details(source, target, chunk)
+        else:
+            _copy(source, target, _archive_columns(source, archive_model), chunk, extra)
+        search.remove_records(source, chunk)
+        delete_rows(source, chunk)
+        search.index_records(target, chunk)
+
+
+def protected_patient_ids(hub_id):
+    """Patients a merge log refers to, as survivor or as (not undone) merged record."""
+    protected = set()
+    for survivor_id, merged_ids, reversed_at in PatientMerge.objects.filter(hub_id=hub_id).values_list(
+        'survivor_id', 'merged_ids', 'reversed_at',
+    ):
+        protected.add(str(survivor_id))
+        if reversed_at is None:
+            protected.update(str(pk) for pk in merged_ids)
+    return protected
+
+
+def patient_candidates(hub_id, now=None):
+    """Patients of ``hub_id`` due for the archive, ordered by primary key."""
+    now = now or timezone.now()
+    inactive_before = now - INACTIVE_AFTER
+    deleted = Q(is_deleted=True, deleted_at__lt=now - DELETED_AFTER)
+    inactive = Q(is_deleted=False, is_active=False, updated_at__lt=inactive_before) & (
+        Q(last_visit_date__isnull=True) | Q(last_visit_date__lt=inactive_before.date())
+    )
+    return PatientRecord.all_objects.filter(deleted | inactive, hub_id=hub_id).order_by('pk')
+
+
+def treatment_candidates(hub_id, now=None):
+    """Soft-deleted treatments of ``hub_id`` due for the archive, ordered by primary key."""
+    now = now or timezone.now()
+    return Treatment.all_objects.filter(
+        hub_id=hub_id, is_deleted=True, deleted_at__lt=now - DELETED_AFTER,
+    ).order_by('pk')
+
+
+def archive_patients(hub_id, patient_ids, now=None):
+    """Move the given patients and all their treatments to the archive in one transaction.
+
+    Patients a merge refers to are skipped. Returns ``(patients, treatments)`` moved.
+    """
+    now = now or timezone.now()
+    protected = protected_patient_ids(hub_id)
+    with transaction.atomic():
+        rows = [
+            row for row in PatientRecord.all_objects.filter(hub_id=hub_id, pk__in=patient_ids).values_list(
+                'pk', 'is_deleted', 'is_active',
+            )
+            if str(row[0]) not in protected
+        ]
+        if not rows:
+            return 0, 0
+        treatments = Treatment.all_objects.filter(hub_id=hub_id, patient_id__in=[pk for pk, _d, _a in rows])
+        treatment_ids = list(treatments.values_list('pk', flat=True))
+        deltas = rollups.queryset_deltas(treatments)
+        live_treatments = treatments.filter(is_deleted=False).count()
+
+        _move(Treatment, ArchivedTreatment, ArchivedTreatment, treatment_ids, [('archived_at', now)])
+        for reason, deleted in ((ArchivedPatientRecord.DELETED, True), (ArchivedPatientRecord.INACTIVE, False)):
+            ids = [pk for pk, is_deleted, _active in rows if is_deleted == deleted]
+            if ids:
+                _move(PatientRecord, ArchivedPatientRecord, ArchivedPatientRecord, ids, [
+                    ('archived_at', now), ('archive_reason', reason),
+                ])
+
+        live = [is_active for _pk, is_deleted, is_active in rows if not is_deleted]
+        rollups.apply(hub_id, deltas)
+        stats.apply_deltas(hub_id, {
+            'patient_records': -len(live),
+            'active_patient_records': -sum(live),
+            'treatments': -live_treatments,
+        })
+        generations.bump(hub_id)
+    return len(rows), len(treatment_ids)
+
+
+def archive_treatments(hub_id, treatment_ids, now=None):
+    """Move soft-deleted treatments to the archive in one transaction; returns the rows moved."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(Treatment.all_objects.filter(
+            hub_id=hub_id, pk__in=treatment_ids, is_deleted=True,
+        ).values_list('pk', flat=True))
+        if ids:
+            _move(Treatment, ArchivedTreatment, ArchivedTreatment, ids, [('archived_at', now)])
+            generations.bump(hub_id)
+    return len(ids)
+
+
+def _batches(qs, batch_size):
+    last_pk = None
+    while True:
+        chunk = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+        ids = list(chunk.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def archive_hub(hub_id, now=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive everything due in ``hub_id``, batch by batch; returns ``(patients, treatments)`` moved."""
+    now = now or timezone.now()
+    patients = treatments = 0
+    for ids in _batches(patient_candidates(hub_id, now), batch_size):
+        moved, moved_treatments = archive_patients(hub_id, ids, now)
+        patients += moved
+        treatments += moved_treatments
+    for ids in _batches(treatment_candidates(hub_id, now), batch_size):
+        treatments += archive_treatments(hub_id, ids, now)
+    return patients, treatments
+
+
+def search_archive(hub_id, query=''):
+    """Archived patients of ``hub_id``, filtered by ``query`` like the live list."""
+    qs = ArchivedPatientRecord.objects.filter(hub_id=hub_id)
+    if query:
+        return search.get_search_backend().search(qs, query).order_by('-search_rank', 'patient_name', 'pk')
+    return qs.order_by('patient_name', 'pk')
+
+
+def restore_patient(hub_id, patient_id):
+    """Move an archived patient and its archived treatments back, undeleted; returns the patient."""
+    with transaction.atomic():
+        try:
+            archived = ArchivedPatientRecord.objects.select_for_update().get(hub_id=hub_id, pk=patient_id)
+        except ArchivedPatientRecord.DoesNotExist:
+            raise ArchiveError('Archived patient not found.')
+        treatments = ArchivedTreatment.objects.filter(hub_id=hub_id, patient_id=archived.pk)
+        treatment_ids = list(treatments.values_list('pk', flat=True))
+        deltas = {key: -delta for key, delta in rollups.queryset_deltas(treatments).items()}
+        live_treatments = treatments.filter(is_deleted=False).count()
+
+        _move(ArchivedPatientRecord, PatientRecord, ArchivedPatientRecord, [archived.pk])
+        _move(ArchivedTreatment, Treatment, ArchivedTreatment, treatment_ids)
+        PatientRecord.all_objects.filter(pk=archived.pk).update(
+            is_deleted=False, deleted_at=None, updated_at=timezone.now(),
+        )
+
+        visits.refresh({archived.pk})
+        rollups.apply(hub_id, deltas)
+        stats.apply_deltas(hub_id, {
+            'patient_records': 1,
+            'active_patient_records': int(archived.is_active),
+            'treatments': live_treatments,
+        })
+        generations.bump(hub_id)
+    return PatientRecord.objects.get(pk=archived.pk)
+
+
+def search_archived_treatments(hub_id, query=''):
+    """Archived treatments of live patients in ``hub_id``, newest first, with ``patient_name``.
+
+    Treatments of archived patients are left out; they come back with
+    ``restore_patient``.
+    """
+    patients = PatientRecord.objects.filter(hub_id=hub_id)
+    qs = ArchivedTreatment.objects.filter(hub_id=hub_id, patient_id__in=patients.values('pk')).annotate(
+        patient_name=Subquery(patients.filter(pk=OuterRef('patient_id')).values('patient_name')[:1]),
+    )
+    if query:
+        return search.get_search_backend().search(qs, query).order_by('-search_rank', '-date', 'pk')
+    return qs.order_by('-date', '-pk')
+
+
+def restore_treatment(hub_id, treatment_id):
+    """Move an archived treatment back to its live patient, undeleted; returns the treatment."""
+    with transaction.atomic():
+        try:
+            archived = ArchivedTreatment.objects.select_for_update().get(hub_id=hub_id, pk=treatment_id)
+        except ArchivedTreatment.DoesNotExist:
+            raise ArchiveError('Archived treatment not found.')
+        if not PatientRecord.objects.filter(hub_id=hub_id, pk=archived.patient_id).exists():
+            raise ArchiveError('The patient of this treatment is archived or deleted; restore the patient first.')
+
+        _move(ArchivedTreatment, Treatment, ArchivedTreatment, [archived.pk])
+        restored = Treatment.all_objects.filter(pk=archived.pk)
+        restored.update(is_deleted=False, deleted_at=None, updated_at=timezone.now())
+
+        visits.refresh({archived.patient_id})
+        rollups.apply(hub_id, {key: -delta for key, delta in rollups.queryset_deltas(restored).items()})
+        stats.adjust(hub_id, 'treatments', 1)
+        generations.bump(hub_id)
+    return Treatment.objects.select_related('patient').get(pk=archived.pk)
@@ -0,0 +1,152 @@
+"""
+Bulk actions for the Patient Records datatables.
+
+``apply_action`` runs one action (activate / deactivate / delete) on a
+queryset of rows and keeps counters, rollups and visit summaries in sync;
+the list views use it for the rows ticked on the visible page.
+
+"Select all matching" runs as a ``BulkActionJob`` instead: the job re-runs
+the list's search filter, walks the matching ids in primary-key order and
+applies the action ``CHUNK_SIZE`` rows at a time, each chunk in its own
+short transaction. No request ever carries the id list, no lock is held
+for longer than one chunk, and the job row records progress for the UI to
+poll. Jobs run on a small thread pool; a unique constraint over active
+jobs allows one job per hub at a time, so concurrent requests cannot start
+two.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import generations, rollups, stats, visits
+from .models import BulkActionJob, PatientRecord, Treatment
+from .queries import patient_records_queryset, treatments_queryset
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 2
+CHUNK_SIZE = 500
+STALE_AFTER = timedelta(hours=2)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='patient-records-bulk')
+
+
+class BulkActionInProgress(Exception):
+    """The hub already has a bulk action job queued or running."""
+
+
+def _activate(hub_id, qs):
+    changed = qs.filter(is_active=False).update(is_active=True, updated_at=timezone.now())
+    stats.adjust(hub_id, 'active_patient_records', changed)
+    return changed
+
+
+def _deactivate(hub_id, qs):
+    changed = qs.filter(is_active=True).update(is_active=False, updated_at=timezone.now())
+    stats.adjust(hub_id, 'active_patient_records', -changed)
+    return changed
+
+
+def _delete_patient_records(hub_id, qs):
+    now = timezone.now()
+    active = qs.filter(is_active=True).update(is_deleted=True, deleted_at=now)
+    inactive = qs.filter(is_active=False).update(is_deleted=True, deleted_at=now)
+    stats.apply_deltas(hub_id, {'patient_records': -(active + inactive), 'active_patient_records': -active})
+    return active + inactive
+
+
+def _delete_treatments(hub_id, qs):
+    patient_ids = set(qs.values_list('patient_id', flat=True))
+    deltas = rollups.queryset_deltas(qs)
+    deleted = qs.update(is_deleted=True, deleted_at=timezone.now())
+    rollups.apply(hub_id, deltas)
+    visits.refresh(patient_ids)
+    stats.adjust(hub_id, 'treatments', -deleted)
+    return deleted
+
+
+RESOURCES = {
+    'patient_records': (PatientRecord, patient_records_queryset, {
+        'activate': _activate,
+        'deactivate': _deactivate,
+        'delete': _delete_patient_records,
+    }),
+    'treatments': (Treatment, treatments_queryset, {
+        'delete': _delete_treatments,
+    }),
+}
+
+
+def is_supported(resource, action):
+    return resource in RESOURCES and action in RESOURCES[resource][2]
+
+
+def apply_action(hub_id, resource, action, qs):
+    """Apply ``action`` to the live rows of ``qs`` in one transaction; returns the rows changed."""
+    _model, _build_queryset, actions = RESOURCES[resource]
+    qs = qs.filter(hub_id=hub_id, is_deleted=False)
+    with transaction.atomic():
+        changed = actions[action](hub_id, qs)
+        if changed:
+            generations.bump(hub_id)
+    return changed
+
+
+def start_bulk_action(hub_id, resource, action, params, user_id=None):
+    """Queue ``action`` for every row matching ``params['search_query']`` and return the job."""
+    if not is_supported(resource, action):
+        raise ValueError(f'Unsupported bulk action: {resource}/{action}')
+    now = timezone.now()
+    BulkActionJob.objects.filter(
+        hub_id=hub_id, status__in=[BulkActionJob.QUEUED, BulkActionJob.RUNNING], created_at__lt=now - STALE_AFTER,
+    ).update(status=BulkActionJob.FAILED, error='Bulk action did not finish', finished_at=now)
+    try:
+        with transaction.atomic():
+            job = BulkActionJob.objects.create(
+                hub_id=hub_id, resource=resource, action=action, params=params, created_by=user_id,
+            )
+    except IntegrityError:
+        raise BulkActionInProgress
+    transaction.on_commit(lambda: _executor.submit(_run_in_worker, job.pk))
+    return job
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_bulk_action(job_id)
+    finally:
+        connection.close()
+
+
+def run_bulk_action(job_id):
+    """Apply the job's action chunk by chunk; runs on the pool or synchronously."""
+    try:
+        job = BulkActionJob.objects.get(pk=job_id)
+        model, build_queryset, _actions = RESOURCES[job.resource]
+        matching = build_queryset(job.hub_id, job.params.get('search_query', '')).order_by('pk')
+        BulkActionJob.objects.filter(pk=job.pk).update(status=BulkActionJob.RUNNING, total_rows=matching.count())
+
+        processed = changed = 0
+        last_pk = None
+        while True:
+            chunk = matching if last_pk is None else matching.filter(pk__gt=last_pk)
+            ids = list(chunk.values_list('pk', flat=True)[:CHUNK_SIZE])
+            if not ids:
+                break
+            changed += apply_action(job.hub_id, job.resource, job.action, model.objects.filter(pk__in=ids))
+            processed += len(ids)
+            last_pk = ids[-1]
+            BulkActionJob.objects.filter(pk=job.pk).update(rows_processed=processed, rows_changed=changed)
+
+        BulkActionJob.objects.filter(pk=job.pk).update(
+            status=BulkActionJob.DONE, rows_processed=processed, rows_changed=changed, finished_at=timezone.now(),
+        )
+    except Exception as exc:
+        logger.exception('Bulk action job %s failed', job_id)
+        BulkActionJob.objects.filter(pk=job_id).update(
+            status=BulkActionJob.FAILED, error=str(exc), finished_at=timezone.now(),
+        )
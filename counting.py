@@ -0,0 +1,78 @@
+"""
+Row counts for the numbered datatable pagination.
+
+``list_count`` picks the cheapest count that is good enough:
+
+* no search filter: the hub's cached counters from ``stats`` (exact);
+* a filter matching at most ``EXACT_COUNT_THRESHOLD`` rows: an exact count,
+  bounded by a ``LIMIT`` so it never reads more than the threshold;
+* more matches: the PostgreSQL planner's row estimate, shown as "about N"
+  (other databases fall back to a full exact count).
+
+Filtered counts are cached per hub and search for ``COUNT_CACHE_TTL``
+seconds. Exact counts are also tied to the hub's generation, so a write
+makes them recount; estimates are only refreshed by the TTL.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import connection
+
+from . import generations, stats
+
+EXACT_COUNT_THRESHOLD = 10_000
+COUNT_CACHE_TTL = 5 * 60
+
+# List resource -> ``stats`` counter holding its unfiltered total.
+LIST_COUNTERS = {
+    'patient_records': 'patient_records',
+    'treatments': 'treatments',
+}
+
+
+def _key(hub_id, resource, search_query):
+    digest = hashlib.md5(search_query.encode()).hexdigest()
+    return f'patient_records:list_count:{hub_id}:{resource}:{digest}'
+
+
+def planner_estimate(qs):
+    """The planner's row estimate for ``qs`` on PostgreSQL, else ``None``."""
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = qs.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def filtered_count(hub_id, resource, qs, search_query):
+    """``(count, approximate)`` for a filtered list queryset."""
+    key = _key(hub_id, resource, search_query)
+    generation = generations.current(hub_id)
+    cached = cache.get(key)
+    if cached is not None:
+        cached_generation, value, approximate = cached
+        if approximate or cached_generation == generation:
+            return value, approximate
+
+    qs = qs.order_by()
+    value, approximate = qs[:EXACT_COUNT_THRESHOLD + 1].count(), False
+    if value > EXACT_COUNT_THRESHOLD:
+        estimate = planner_estimate(qs)
+        if estimate is None:
+            value = qs.count()
+        else:
+            value, approximate = max(estimate, value), True
+    cache.set(key, (generation, value, approximate), COUNT_CACHE_TTL)
+    return value, approximate
+
+
+def list_count(hub_id, resource, qs, search_query=''):
+    """``(count, approximate)`` of the rows a datatable shows."""
+    if not search_query:
+        return stats.get_counts(hub_id)[LIST_COUNTERS[resource]], False
+    return filtered_count(hub_id, resource, qs, search_query)
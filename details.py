@@ -0,0 +1,47 @@
+"""
+SQL helpers for the clinical text kept in one-to-one detail tables.
+
+``PatientRecord`` and ``Treatment`` keep their long-form text
+(``DETAIL_FIELDS``) in ``PatientRecordDetail`` / ``TreatmentDetail`` and
+only short ``PREVIEW_FIELDS`` columns on the hot row. Raw SQL that reads
+every column of a record (search indexing, archiving) goes through
+``column_sql``; ORM lookups go through ``lookup``.
+"""
+from django.db import connection
+
+from .models import PREVIEW_LENGTH
+
+
+def detail_relation(model):
+    """The reverse one-to-one relation to ``model``'s detail table, or ``None``."""
+    if not getattr(model, 'DETAIL_FIELDS', ()):
+        return None
+    return model._meta.get_field('detail')
+
+
+def lookup(model, field):
+    """ORM path of ``field`` on ``model``, through the detail row for detail fields."""
+    if field in getattr(model, 'DETAIL_FIELDS', ()):
+        return f'detail__{field}'
+    return field
+
+
+def column_sql(model, field):
+    """SQL reading ``field`` of a ``model`` row in a statement over its table ('' without a detail row)."""
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    if field in getattr(model, 'DETAIL_FIELDS', ()):
+        rel = detail_relation(model)
+        return (
+            f"COALESCE((SELECT {qn(field)} FROM {qn(rel.related_model._meta.db_table)} "
+            f"WHERE {qn(rel.field.column)} = {table}.{qn('id')}), '')"
+        )
+    return f'{table}.{qn(field)}'
+
+
+def preview_sql(expression):
+    """SQL computing ``models.text_preview`` of ``expression``."""
+    return (
+        f"CASE WHEN LENGTH({expression}) > {PREVIEW_LENGTH} "
+        f"THEN SUBSTR({expression}, 1, {PREVIEW_LENGTH - 1}) || '…' ELSE {expression} END"
+    )
@@ -0,0 +1,148 @@
+"""
+Duplicate patient detection.
+
+Candidates are only ever compared inside a block: patients sharing a
+``phonetic_key``, or sharing a ``date_of_birth``. Both columns are indexed
+per hub, so checking one new patient reads a handful of rows, and the
+hub-wide report is one ordered scan per key. Blocks larger than
+``MAX_BLOCK_SIZE`` (a placeholder birth date used for hundreds of patients,
+say) fall back to comparing each record with its ``WINDOW`` nearest
+neighbours by ``name_key``. The report therefore stays near-linear in the
+number of patients instead of quadratic.
+"""
+import datetime
+from difflib import SequenceMatcher
+from itertools import groupby
+
+from django.db.models import Q
+
+from .models import PatientRecord
+from .names import name_key, phonetic_key
+
+DUPLICATE_THRESHOLD = 0.85
+MAX_BLOCK_SIZE = 200
+WINDOW = 20
+MAX_CANDIDATES = 5
+
+CANDIDATE_FIELDS = ('id', 'patient_name', 'date_of_birth', 'name_key', 'phonetic_key', 'created_at')
+
+
+def name_similarity(key_a, key_b):
+    """Similarity of two ``name_key`` values in 0..1."""
+    if not key_a or not key_b:
+        return 0.0
+    if key_a == key_b:
+        return 1.0
+    tokens_a, tokens_b = set(key_a.split()), set(key_b.split())
+    overlap = len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+    return max(overlap, SequenceMatcher(None, key_a, key_b).ratio())
+
+
+def score(a, b):
+    """Likelihood in 0..1 that two patient dicts describe the same person."""
+    similarity = name_similarity(a['name_key'], b['name_key'])
+    if a['phonetic_key'] and a['phonetic_key'] == b['phonetic_key']:
+        similarity = max(similarity, 0.8)
+    dob_a, dob_b = a['date_of_birth'], b['date_of_birth']
+    if dob_a and dob_b:
+        if dob_a != dob_b:
+            return similarity * 0.5
+        return min(1.0, similarity + 0.15)
+    return similarity * 0.9
+
+
+def find_duplicates(hub_id, patient_name, date_of_birth=None, exclude_id=None, limit=MAX_CANDIDATES):
+    """Existing patients that likely match the given name and birth date, best first.
+
+    Returns ``[(score, patient_dict)]``.
+    """
+    if isinstance(date_of_birth, str):
+        try:
+            date_of_birth = datetime.date.fromisoformat(date_of_birth)
+        except ValueError:
+            date_of_birth = None
+    probe = {
+        'name_key': name_key(patient_name),
+        'phonetic_key': phonetic_key(patient_name),
+        'date_of_birth': date_of_birth,
+    }
+    if not probe['name_key']:
+        return []
+    block = Q(phonetic_key=probe['phonetic_key'])
+    if date_of_birth:
+        block |= Q(date_of_birth=date_of_birth)
+    qs = PatientRecord.objects.filter(block, hub_id=hub_id, is_deleted=False)
+    if exclude_id is not None:
+        qs = qs.exclude(pk=exclude_id)
+    matches = []
+    for candidate in qs.values(*CANDIDATE_FIELDS)[:MAX_BLOCK_SIZE]:
+        value = score(probe, candidate)
+        if value >= DUPLICATE_THRESHOLD:
+            matches.append((value, candidate))
+    matches.sort(key=lambda match: -match[0])
+    return matches[:limit]
+
+
+def _pairs(block):
+    if len(block) <= MAX_BLOCK_SIZE:
+        for i, a in enumerate(block):
+            for b in block[i + 1:]:
+                yield a, b
+        return
+    block = sorted(block, key=lambda row: row['name_key'])
+    for i, a in enumerate(block):
+        for b in block[i + 1:i + 1 + WINDOW]:
+            yield a, b
+
+
+def _blocks(hub_id, column):
+    qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+    if column == 'phonetic_key':
+        qs = qs.exclude(phonetic_key='')
+    else:
+        qs = qs.exclude(date_of_birth=None)
+    qs = qs.order_by(column).values(*CANDIDATE_FIELDS)
+    for _key, rows in groupby(qs.iterator(chunk_size=2000), key=lambda row: row[column]):
+        block = list(rows)
+        if len(block) > 1:
+            yield block
+
+
+def duplicate_groups(hub_id):
+    """Clusters of likely duplicates in the hub, largest first.
+
+    Returns ``[{'patients': [patient_dict, ...], 'score': best pair score}]``.
+    """
+    parent = {}
+    rows = {}
+    best = {}
+
+    def find(pk):
+        while parent.setdefault(pk, pk) != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    for column in ('phonetic_key', 'date_of_birth'):
+        for block in _blocks(hub_id, column):
+            for a, b in _pairs(block):
+                value = score(a, b)
+                if value < DUPLICATE_THRESHOLD:
+                    continue
+                rows[a['id']], rows[b['id']] = a, b
+                root_a, root_b = find(a['id']), find(b['id'])
+                if root_a != root_b:
+                    parent[root_b] = root_a
+                    best[root_a] = max(best.get(root_a, 0), best.pop(root_b, 0), value)
+                else:
+                    best[root_a] = max(best.get(root_a, 0), value)
+
+    clusters = {}
+    for pk in rows:
+        clusters.setdefault(find(pk), []).append(rows[pk])
+    groups = [
+        {'patients': sorted(members, key=lambda row: row['created_at']), 'score': best.get(root, 0)}
+        for root, members in clusters.items()
+    ]
+    groups.sort(key=lambda group: (-len(group['patients']), -group['score']))
+    return groups
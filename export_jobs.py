@@ -0,0 +1,130 @@
+"""
+Background export jobs for the Patient Records datatables.
+
+Jobs run on a small module-level thread pool so a burst of exports cannot
+take over the request workers; each hub may only have ``MAX_JOBS_PER_HUB``
+queued or running jobs at a time, enforced by a unique ``(hub_id, slot)``
+constraint over active jobs so concurrent requests cannot overshoot it. The worker writes the file to
+``EXPORT_DIR`` and records progress on the ``ExportJob`` row, which the UI
+polls. Finished artifacts expire after ``ARTIFACT_TTL`` and are removed by
+``cleanup_expired_exports`` (run on every new job and by the
+``cleanup_export_jobs`` command).
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .exports import PATIENT_RECORD_EXPORT_COLUMNS, TREATMENT_EXPORT_COLUMNS, write_csv, write_xlsx
+from .models import ExportJob
+from .queries import patient_records_queryset, treatments_queryset
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 2
+MAX_JOBS_PER_HUB = 2
+ARTIFACT_TTL = timedelta(hours=1)
+STALE_AFTER = timedelta(hours=2)
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'patient_records_exports')
+
+RESOURCES = {
+    'patient_records': (patient_records_queryset, PATIENT_RECORD_EXPORT_COLUMNS),
+    'treatments': (treatments_queryset, TREATMENT_EXPORT_COLUMNS),
+}
+
+FILE_EXTENSIONS = {'csv': 'csv', 'excel': 'xlsx'}
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='patient-records-export')
+
+
+class ExportLimitReached(Exception):
+    """The hub already has ``MAX_JOBS_PER_HUB`` exports in flight."""
+
+
+def start_export(hub_id, resource, export_format, params, user_id=None):
+    """Queue an export and return its ``ExportJob``.
+
+    ``params`` holds the ``search_query`` / ``sort_field`` / ``sort_dir``
+    arguments of the resource's queryset builder.
+    """
+    if resource not in RESOURCES or export_format not in FILE_EXTENSIONS:
+        raise ValueError(f'Unsupported export: {resource}/{export_format}')
+    cleanup_expired_exports()
+    taken = set(ExportJob.objects.filter(
+        hub_id=hub_id, status__in=[ExportJob.QUEUED, ExportJob.RUNNING],
+    ).values_list('slot', flat=True))
+    for slot in range(MAX_JOBS_PER_HUB):
+        if slot in taken:
+            continue
+        try:
+            with transaction.atomic():
+                job = ExportJob.objects.create(
+                    hub_id=hub_id, resource=resource, export_format=export_format,
+                    params=params, created_by=user_id, slot=slot,
+                )
+        except IntegrityError:
+            # Taken concurrently; try the next slot.
+            continue
+        transaction.on_commit(lambda: _executor.submit(_run_in_worker, job.pk))
+        return job
+    raise ExportLimitReached
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_export(job_id)
+    finally:
+        connection.close()
+
+
+def run_export(job_id):
+    """Build the export file for ``job_id``; runs on the pool or synchronously."""
+    try:
+        job = ExportJob.objects.get(pk=job_id)
+        build_queryset, columns = RESOURCES[job.resource]
+        qs = build_queryset(job.hub_id, **job.params)
+        ExportJob.objects.filter(pk=job.pk).update(status=ExportJob.RUNNING, total_rows=qs.count())
+
+        def progress(rows):
+            ExportJob.objects.filter(pk=job.pk).update(rows_processed=rows)
+
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = os.path.join(EXPORT_DIR, f'{job.pk}.{FILE_EXTENSIONS[job.export_format]}')
+        if job.export_format == 'csv':
+            with open(path, 'w', newline='', encoding='utf-8') as fileobj:
+                rows = write_csv(fileobj, qs, columns, progress)
+        else:
+            with open(path, 'wb') as fileobj:
+                rows = write_xlsx(fileobj, qs, columns, progress)
+
+        now = timezone.now()
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.DONE, rows_processed=rows, file_path=path,
+            finished_at=now, expires_at=now + ARTIFACT_TTL,
+        )
+    except Exception as exc:
+        logger.exception('Export job %s failed', job_id)
+        now = timezone.now()
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.FAILED, error=str(exc), finished_at=now, expires_at=now + ARTIFACT_TTL,
+        )
+
+
+def cleanup_expired_exports():
+    """Delete expired artifacts and fail jobs whose worker disappeared."""
+    now = timezone.now()
+    ExportJob.objects.filter(
+        status__in=[ExportJob.QUEUED, ExportJob.RUNNING], created_at__lt=now - STALE_AFTER,
+    ).update(status=ExportJob.FAILED, error='Export did not finish', finished_at=now, expires_at=now)
+    expired = ExportJob.objects.filter(expires_at__lt=now)
+    for path in expired.exclude(file_path='').values_list('file_path', flat=True):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return expired.delete()[0]
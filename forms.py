@@ -3,7 +3,33 @@ from django.utils.translation import gettext_lazy as _
 
 from .models import PatientRecord, Treatment
 
-class PatientRecordForm(forms.ModelForm):
+
+def _textarea():
+    return forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3})
+
+
+class DetailFieldsFormMixin:
+    """Edit a model's ``DETAIL_FIELDS`` (kept in its detail row) like model fields."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance._state.adding:
+            return
+        for field in self._meta.model.DETAIL_FIELDS:
+            if field in self.fields and field not in self.initial:
+                self.initial[field] = getattr(self.instance, field)
+
+    def _post_clean(self):
+        super()._post_clean()
+        for field in self._meta.model.DETAIL_FIELDS:
+            if field in self.cleaned_data:
+                setattr(self.instance, field, self.cleaned_data[field])
+
+
+class PatientRecordForm(DetailFieldsFormMixin, forms.ModelForm):
+    allergies = forms.CharField(required=False, label=_('Allergies'), widget=_textarea())
+    medical_notes = forms.CharField(required=False, label=_('Medical Notes'), widget=_textarea())
+
     class Meta:
         model = PatientRecord
         fields = ['patient_name', 'date_of_birth', 'gender', 'blood_type', 'allergies', 'medical_notes', 'is_active']
@@ -12,22 +38,21 @@ class PatientRecordForm(forms.ModelForm):
             'date_of_birth': forms.TextInput(attrs={'class': 'input input-sm w-full', 'type': 'date'}),
             'gender': forms.TextInput(attrs={'class': 'input input-sm w-full'}),
             'blood_type': forms.TextInput(attrs={'class': 'input input-sm w-full'}),
-            'allergies': forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3}),
-            'medical_notes': forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3}),
             'is_active': forms.CheckboxInput(attrs={'class': 'toggle'}),
         }
 
-class TreatmentForm(forms.ModelForm):
+class TreatmentForm(DetailFieldsFormMixin, forms.ModelForm):
+    description = forms.CharField(label=_('Description'), widget=_textarea())
+    diagnosis = forms.CharField(required=False, label=_('Diagnosis'), widget=_textarea())
+    prescription = forms.CharField(required=False, label=_('Prescription'), widget=_textarea())
+    notes = forms.CharField(required=False, label=_('Notes'), widget=_textarea())
+
     class Meta:
         model = Treatment
         fields = ['patient', 'date', 'description', 'diagnosis', 'prescription', 'practitioner_id', 'notes']
         widgets = {
             'patient': forms.Select(attrs={'class': 'select select-sm w-full'}),
             'date': forms.TextInput(attrs={'class': 'input input-sm w-full', 'type': 'date'}),
-            'description': forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3}),
-            'diagnosis': forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3}),
-            'prescription': forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3}),
             'practitioner_id': forms.TextInput(attrs={'class': 'input input-sm w-full'}),
-            'notes': forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3}),
         }
 
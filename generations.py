@@ -0,0 +1,45 @@
+"""
+Per-hub change generation for conditional GETs.
+
+Every write path bumps its hub's generation once the transaction commits:
+the save/delete signals, ``writes``, ``bulk_actions``, ``merge`` and the
+rollup/visit rebuilds. The list and dashboard views derive their ``ETag``
+from it, so while nothing in the hub changes a revalidation answers
+``304 Not Modified`` without running the list query or rendering.
+
+A generation starts at the current time in milliseconds, so one evicted
+from the cache does not repeat a value an earlier ETag was built from.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _key(hub_id):
+    return f'patient_records:generation:{hub_id}'
+
+
+def current(hub_id):
+    """The hub's current generation."""
+    key = _key(hub_id)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        value = cache.get(key) or int(time.time() * 1000)
+    return value
+
+
+def bump(hub_id):
+    """Advance the hub's generation once the current transaction commits."""
+    if hub_id is None:
+        return
+
+    def apply():
+        try:
+            cache.incr(_key(hub_id))
+        except ValueError:
+            # Not cached (evicted); start a new, later generation.
+            current(hub_id)
+
+    transaction.on_commit(apply)
@@ -0,0 +1,285 @@
+"""
+Bulk CSV imports for patients and treatments.
+
+The upload is decoded as a text stream and read with ``csv.reader``, so only
+one batch of rows is held in memory at a time. Each batch of
+``IMPORT_BATCH_SIZE`` valid rows is written with a single ``bulk_create`` in
+its own transaction through ``writes``, which also makes the search index,
+counter, rollup and visit summary updates that the save signals would
+otherwise have made. Invalid rows are skipped and reported with their line
+number.
+
+Treatment rows are linked to patients through a key map built with one
+scan of the hub's patients. A row can name its patient by id
+(``patient_id``), or by name plus date of birth. A name alone is enough when
+it is unique in the hub.
+
+Column headers may be the model field names or the headers written by the
+CSV export, so an exported file can be imported again.
+"""
+import csv
+import datetime
+import io
+import uuid
+
+from . import writes
+from .exports import PATIENT_RECORD_EXPORT_COLUMNS, TREATMENT_EXPORT_COLUMNS
+from .models import PatientRecord, Treatment
+
+IMPORT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 200
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on', 'active'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', 'inactive'}
+
+
+class ImportResult:
+    """Outcome of one import: rows created and per-row errors."""
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def errors_truncated(self):
+        return self.failed > len(self.errors)
+
+
+class RowError(ValueError):
+    """A CSV row that cannot be imported."""
+
+
+def _header_map(columns, extra=()):
+    mapping = {}
+    for field, header in columns:
+        mapping[field.lower()] = field
+        mapping[header.lower()] = field
+    for header, field in extra:
+        mapping[header.lower()] = field
+    return mapping
+
+
+PATIENT_RECORD_HEADERS = _header_map(
+    PATIENT_RECORD_EXPORT_COLUMNS + [('medical_notes', 'Medical Notes')],
+)
+TREATMENT_HEADERS = _header_map(
+    TREATMENT_EXPORT_COLUMNS + [('notes', 'Notes')],
+    extra=[
+        ('patient', 'patient__patient_name'),
+        ('patient_name', 'patient__patient_name'),
+        ('patient name', 'patient__patient_name'),
+        ('patient_id', 'patient_id'),
+        ('patient id', 'patient_id'),
+        ('patient_date_of_birth', 'patient__date_of_birth'),
+        ('date of birth', 'patient__date_of_birth'),
+    ],
+)
+
+
+def _text(row, field, max_length=None, required=False):
+    value = (row.get(field) or '').strip()
+    if required and not value:
+        raise RowError(f'{field} is required')
+    if max_length and len(value) > max_length:
+        raise RowError(f'{field} is longer than {max_length} characters')
+    return value
+
+
+def _date(row, field, required=False):
+    value = (row.get(field) or '').strip()
+    if not value:
+        if required:
+            raise RowError(f'{field} is required')
+        return None
+    try:
+        return datetime.date.fromisoformat(value[:10])
+    except ValueError:
+        raise RowError(f'{field} is not a YYYY-MM-DD date: {value!r}')
+
+
+def _bool(row, field, default=True):
+    value = (row.get(field) or '').strip().lower()
+    if not value:
+        return default
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f'{field} is not a yes/no value: {value!r}')
+
+
+def _uuid(row, field):
+    value = (row.get(field) or '').strip()
+    if not value:
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise RowError(f'{field} is not a valid id: {value!r}')
+
+
+def _rows(fileobj, headers):
+    """Yield ``(line_number, {field: value})`` with headers normalised to field names.
+
+    A line that cannot be read is yielded as ``(line_number, RowError)``. A
+    malformed CSV line is skipped; text that is not UTF-8, or an unreadable
+    header, ends the file.
+    """
+    if isinstance(fileobj, io.TextIOBase):
+        text = fileobj
+    else:
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    fields = None
+    while True:
+        error = None
+        try:
+            values = next(reader)
+            # PostgreSQL text cannot hold NUL; csv only rejects it before Python 3.11.
+            if any('\0' in value for value in values):
+                error = RowError('line contains a NUL byte')
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            yield reader.line_num + 1, RowError('the file is not UTF-8 text; this line and the rest were not read')
+            return
+        except csv.Error as exc:
+            error = RowError(f'malformed CSV line: {exc}')
+        if error is not None:
+            yield reader.line_num, error
+            if fields is None:
+                # Without a header row no other line can be mapped to fields.
+                return
+            continue
+        if fields is None:
+            fields = [headers.get(header.strip().lower()) for header in values]
+            continue
+        if not any(value.strip() for value in values):
+            continue
+        yield reader.line_num, {field: value for field, value in zip(fields, values) if field}
+
+
+def _batches(rows, size=IMPORT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _build_patient(hub_id, user_id, row):
+    return PatientRecord(
+        hub_id=hub_id,
+        created_by=user_id,
+        patient_name=_text(row, 'patient_name', 255, required=True),
+        date_of_birth=_date(row, 'date_of_birth'),
+        gender=_text(row, 'gender', 20),
+        blood_type=_text(row, 'blood_type', 5),
+        allergies=_text(row, 'allergies'),
+        medical_notes=_text(row, 'medical_notes'),
+        is_active=_bool(row, 'is_active'),
+    )
+
+
+class PatientKeyMap:
+    """Resolve a treatment row's patient reference to a patient id in memory."""
+
+    AMBIGUOUS = object()
+
+    def __init__(self, hub_id):
+        self.ids = set()
+        self.by_name_dob = {}
+        self.by_name = {}
+        rows = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False).values_list(
+            'id', 'patient_name', 'date_of_birth',
+        )
+        for pk, name, date_of_birth in rows.iterator(chunk_size=IMPORT_BATCH_SIZE):
+            self.add(pk, name, date_of_birth)
+
+    @staticmethod
+    def _name(name):
+        return ' '.join(name.lower().split())
+
+    def add(self, pk, name, date_of_birth):
+        self.ids.add(pk)
+        name = self._name(name)
+        self.by_name_dob[(name, date_of_birth)] = pk
+        self.by_name[name] = self.AMBIGUOUS if name in self.by_name else pk
+
+    def resolve(self, row):
+        patient_id = _uuid(row, 'patient_id')
+        if patient_id is not None:
+            if patient_id not in self.ids:
+                raise RowError(f'patient {patient_id} does not exist')
+            return patient_id
+        name = self._name(row.get('patient__patient_name') or '')
+        if not name:
+            raise RowError('patient_id or patient_name is required')
+        date_of_birth = _date(row, 'patient__date_of_birth')
+        if date_of_birth is not None:
+            pk = self.by_name_dob.get((name, date_of_birth))
+        else:
+            pk = self.by_name.get(name)
+        if pk is self.AMBIGUOUS:
+            raise RowError(f'several patients are named {name!r}; add patient_date_of_birth or patient_id')
+        if pk is None:
+            raise RowError(f'no patient named {name!r}')
+        return pk
+
+
+def _build_treatment(hub_id, user_id, row, patients):
+    return Treatment(
+        hub_id=hub_id,
+        created_by=user_id,
+        patient_id=patients.resolve(row),
+        date=_date(row, 'date', required=True),
+        description=_text(row, 'description', required=True),
+        diagnosis=_text(row, 'diagnosis'),
+        prescription=_text(row, 'prescription'),
+        practitioner_id=_uuid(row, 'practitioner_id'),
+        notes=_text(row, 'notes'),
+    )
+
+
+def _import(fileobj, headers, build, write, hub_id):
+    result = ImportResult()
+    for batch in _batches(_rows(fileobj, headers)):
+        objs = []
+        for line, row in batch:
+            if isinstance(row, RowError):
+                result.add_error(line, str(row))
+                continue
+            try:
+                objs.append(build(row))
+            except RowError as exc:
+                result.add_error(line, str(exc))
+        if objs:
+            write(hub_id, objs)
+            result.created += len(objs)
+    return result
+
+
+def import_patient_records(hub_id, fileobj, user_id=None):
+    """Import patients from a CSV byte or text stream; returns an ``ImportResult``."""
+    return _import(
+        fileobj, PATIENT_RECORD_HEADERS,
+        lambda row: _build_patient(hub_id, user_id, row), writes.create_patient_records, hub_id,
+    )
+
+
+def import_treatments(hub_id, fileobj, user_id=None):
+    """Import treatments from a CSV byte or text stream; returns an ``ImportResult``."""
+    patients = PatientKeyMap(hub_id)
+    return _import(
+        fileobj, TREATMENT_HEADERS,
+        lambda row: _build_treatment(hub_id, user_id, row, patients), writes.create_treatments, hub_id,
+    )
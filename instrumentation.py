@@ -0,0 +1,205 @@
+"""
+Per-endpoint request metrics for the module's views and AI tools.
+
+``instrumented(endpoint)`` wraps a view (outermost, above ``login_required``)
+and ``instrumented_tool`` wraps an AI tool's ``execute``. Each call records:
+
+* the number of SQL queries and the time spent in them, counted with a
+  ``connection.execute_wrapper`` (works with ``DEBUG`` off);
+* the total wall time, and the app time (total minus DB time: view code
+  plus template rendering, which ``htmx_view`` does not expose separately);
+* the response size in bytes.
+
+The last ``WINDOW`` samples of each endpoint are kept in memory for rolling
+percentiles, plus cumulative totals for Prometheus. Recording a sample is a
+few ``perf_counter`` calls and a ``deque.append``, so it stays on in
+production. Metrics are per process: each worker reports its own.
+"""
+import functools
+import json
+import threading
+import time
+from collections import deque
+
+from django.db import connection
+
+WINDOW = 500
+QUANTILES = {'p50': 0.5, 'p95': 0.95, 'p99': 0.99}
+
+# Sample tuple layout.
+TOTAL, DB, APP, QUERIES, BYTES = range(5)
+METRICS = {
+    'total_ms': TOTAL,
+    'db_ms': DB,
+    'app_ms': APP,
+    'queries': QUERIES,
+    'bytes': BYTES,
+}
+
+
+class EndpointStats:
+    """Rolling samples and cumulative totals of one endpoint."""
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.count = 0
+        self.errors = 0
+        self.sums = [0.0, 0.0, 0.0, 0, 0]
+        self.lock = threading.Lock()
+
+    def add(self, sample, failed=False):
+        with self.lock:
+            self.samples.append(sample)
+            self.count += 1
+            self.errors += failed
+            for index, value in enumerate(sample):
+                self.sums[index] += value
+
+    def percentiles(self):
+        """``{metric: {'p50': value, ...}}`` over the current window."""
+        with self.lock:
+            samples = list(self.samples)
+        result = {}
+        for metric, index in METRICS.items():
+            values = sorted(sample[index] for sample in samples)
+            result[metric] = {
+                label: values[min(len(values) - 1, int(quantile * len(values)))] if values else 0
+                for label, quantile in QUANTILES.items()
+            }
+        return result
+
+
+_endpoints = {}
+_lock = threading.Lock()
+
+
+def _stats(endpoint):
+    stats = _endpoints.get(endpoint)
+    if stats is None:
+        with _lock:
+            stats = _endpoints.setdefault(endpoint, EndpointStats())
+    return stats
+
+
+class _QueryTimer:
+    """``execute_wrapper`` that counts queries and sums their time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def _measure(endpoint, call, size):
+    timer = _QueryTimer()
+    start = time.perf_counter()
+    failed = True
+    result = None
+    try:
+        with connection.execute_wrapper(timer):
+            result = call()
+        failed = False
+        return result
+    finally:
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = timer.seconds * 1000
+        _stats(endpoint).add(
+            (total_ms, db_ms, total_ms - db_ms, timer.queries, 0 if failed else size(result)),
+            failed=failed,
+        )
+
+
+def _response_size(response):
+    if getattr(response, 'streaming', False):
+        # Streaming bodies are produced after the view returns; count what is known.
+        return int(response.get('Content-Length') or 0)
+    return len(getattr(response, 'content', b''))
+
+
+def _tool_result_size(result):
+    return len(json.dumps(result, default=str))
+
+
+def instrumented(endpoint):
+    """Record metrics for every request to the decorated view under ``endpoint``."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return _measure(endpoint, lambda: view(request, *args, **kwargs), _response_size)
+        return wrapper
+
+    return decorator
+
+
+def instrumented_tool(tool_class):
+    """Record metrics for an AI tool's ``execute`` under ``tool:<name>``."""
+    execute = tool_class.execute
+    endpoint = f'tool:{tool_class.name}'
+
+    @functools.wraps(execute)
+    def wrapper(self, args, request):
+        return _measure(endpoint, lambda: execute(self, args, request), _tool_result_size)
+
+    tool_class.execute = wrapper
+    return tool_class
+
+
+def snapshot():
+    """Rows for display: one dict per endpoint, sorted by name."""
+    rows = []
+    for endpoint, stats in sorted(_endpoints.items()):
+        rows.append({
+            'endpoint': endpoint,
+            'count': stats.count,
+            'errors': stats.errors,
+            'window': len(stats.samples),
+            **stats.percentiles(),
+        })
+    return rows
+
+
+def reset():
+    """Forget every sample; used by tests."""
+    with _lock:
+        _endpoints.clear()
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text():
+    """The metrics in the Prometheus text exposition format (version 0.0.4)."""
+    families = [
+        ('request_duration_seconds', 'Wall time per request.', 'total_ms', 1000),
+        ('request_db_seconds', 'Time spent in SQL queries per request.', 'db_ms', 1000),
+        ('request_app_seconds', 'Time outside SQL (view code and rendering) per request.', 'app_ms', 1000),
+        ('request_queries', 'SQL queries per request.', 'queries', 1),
+        ('response_bytes', 'Response size in bytes.', 'bytes', 1),
+    ]
+    items = [(endpoint, stats, stats.percentiles()) for endpoint, stats in sorted(_endpoints.items())]
+    lines = []
+    for name, help_text, key, scale in families:
+        metric = f'patient_records_{name}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} summary')
+        for endpoint, stats, percentiles in items:
+            label = f'endpoint="{_label(endpoint)}"'
+            for label_name, quantile in QUANTILES.items():
+                value = percentiles[key][label_name]
+                lines.append(f'{metric}{{{label},quantile="{quantile}"}} {value / scale:g}')
+            lines.append(f'{metric}_sum{{{label}}} {stats.sums[METRICS[key]] / scale:g}')
+            lines.append(f'{metric}_count{{{label}}} {stats.count}')
+    lines.append('# HELP patient_records_request_errors_total Requests that raised an exception.')
+    lines.append('# TYPE patient_records_request_errors_total counter')
+    for endpoint, stats, _percentiles in items:
+        lines.append(f'patient_records_request_errors_total{{endpoint="{_label(endpoint)}"}} {stats.errors}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from patient_records import archive
+from patient_records.models import PatientRecord
+
+
+class Command(BaseCommand):
+    help = 'Move old soft-deleted and long-inactive patients (with their treatments) to the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub', dest='hub_id', help='Only archive this hub.')
+        parser.add_argument('--batch-size', type=int, default=archive.ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['hub_id']:
+            hub_ids = [options['hub_id']]
+        else:
+            hub_ids = PatientRecord.all_objects.exclude(hub_id=None).values_list('hub_id', flat=True).distinct()
+        for hub_id in hub_ids:
+            patients, treatments = archive.archive_hub(hub_id, batch_size=options['batch_size'])
+            self.stdout.write(f'{hub_id}: archived {patients} patient(s), {treatments} treatment(s)')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from patient_records.export_jobs import cleanup_expired_exports
+
+
+class Command(BaseCommand):
+    help = 'Delete expired background export files and jobs.'
+
+    def handle(self, *args, **options):
+        deleted = cleanup_expired_exports()
+        self.stdout.write(f'Removed {deleted} expired export job(s).')
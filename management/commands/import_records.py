@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from patient_records.imports import import_patient_records, import_treatments
+
+IMPORTERS = {
+    'patient_records': import_patient_records,
+    'treatments': import_treatments,
+}
+
+
+class Command(BaseCommand):
+    help = 'Import patients or treatments for a hub from a CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--hub', dest='hub_id', required=True)
+
+    def handle(self, *args, **options):
+        try:
+            fileobj = open(options['path'], 'rb')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with fileobj:
+            result = IMPORTERS[options['resource']](options['hub_id'], fileobj)
+        for line, message in result.errors:
+            self.stderr.write(f'line {line}: {message}')
+        self.stdout.write(f'Imported {result.created} row(s), skipped {result.failed}.')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from patient_records import retention
+from patient_records.models import PatientRecordsSettings
+
+
+class Command(BaseCommand):
+    help = 'Hard-delete soft-deleted patients and treatments older than each hub\'s retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub', dest='hub_id', help='Only purge this hub.')
+        parser.add_argument('--days', type=int, help='Retention in days; defaults to the hub setting.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed.')
+        parser.add_argument('--batch-size', type=int, default=retention.PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=retention.PURGE_PAUSE, help='Seconds between batches.')
+
+    def handle(self, *args, **options):
+        batching = {'batch_size': options['batch_size'], 'pause': options['pause']}
+        if options['hub_id']:
+            days = options['days'] or PatientRecordsSettings.for_hub(options['hub_id']).retention_days
+            if days is None:
+                raise CommandError('The hub has no retention period; pass --days.')
+            if days < retention.MIN_RETENTION_DAYS:
+                raise CommandError(f'--days must be at least {retention.MIN_RETENTION_DAYS}.')
+            reports = {options['hub_id']: retention.purge_hub(options['hub_id'], days, options['dry_run'], **batching)}
+        else:
+            if options['days']:
+                raise CommandError('--days needs --hub.')
+            reports = retention.purge_all(options['dry_run'], **batching)
+        verb = 'would remove' if options['dry_run'] else 'removed'
+        for hub_id, report in reports.items():
+            counts = ', '.join(f'{rows} {table}' for table, rows in report.items())
+            self.stdout.write(f'{hub_id}: {verb} {counts}')
+        self.stdout.write(f'Processed {len(reports)} hub(s).')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from patient_records.models import ArchivedPatientRecord, ArchivedTreatment, PatientRecord, Treatment
+from patient_records.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for patients and treatments, live and archived.'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        for model in (PatientRecord, Treatment, ArchivedPatientRecord, ArchivedTreatment):
+            with transaction.atomic():
+                backend.rebuild(model)
+            self.stdout.write(f'Reindexed {model._meta.verbose_name_plural}.')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from patient_records import rollups, visits
+from patient_records.models import Treatment
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-day treatment rollups and the per-patient visit summaries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub', dest='hub_id', help='Only rebuild this hub.')
+
+    def handle(self, *args, **options):
+        if options['hub_id']:
+            hub_ids = [options['hub_id']]
+        else:
+            hub_ids = Treatment.all_objects.exclude(hub_id=None).values_list('hub_id', flat=True).distinct()
+        total = 0
+        for hub_id in hub_ids:
+            rows = rollups.rebuild(hub_id)
+            patients = visits.rebuild(hub_id)
+            total += 1
+            self.stdout.write(f'{hub_id}: {rows} rollup row(s), {patients} patient(s)')
+        self.stdout.write(f'Rebuilt treatment rollups for {total} hub(s).')
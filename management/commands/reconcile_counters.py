@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from patient_records import stats
+from patient_records.models import PatientRecord, Treatment
+
+
+class Command(BaseCommand):
+    help = 'Recount the cached dashboard counters for every hub.'
+
+    def handle(self, *args, **options):
+        hub_ids = set(PatientRecord.all_objects.values_list('hub_id', flat=True).distinct())
+        hub_ids |= set(Treatment.all_objects.values_list('hub_id', flat=True).distinct())
+        for hub_id in hub_ids:
+            stats.reconcile(hub_id)
+        self.stdout.write(f'Reconciled counters for {len(hub_ids)} hub(s).')
@@ -0,0 +1,171 @@
+"""
+Merging duplicate patients.
+
+``merge_patients`` moves every treatment of the merged records to the
+survivor with one ``UPDATE``, after logging each moved ``(treatment,
+previous patient)`` pair with one ``INSERT ... SELECT``. Treatments never pass
+through Python, so a patient with thousands of visits merges in constant
+memory. Allergies and medical notes are combined on the survivor, and the
+merged records are soft-deleted. ``undo_merge`` uses the log to put the
+treatments and records back, and reverts each survivor text that has not been
+edited since the merge.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from . import generations, stats, visits
+from .models import PatientMerge, PatientMergeTreatment, PatientRecord, Treatment
+
+
+class MergeError(Exception):
+    """The requested merge or undo is not possible."""
+
+
+def merge_allergies(values):
+    """Combine comma/semicolon/line separated allergy lists, keeping the first spelling of each."""
+    seen = {}
+    for value in values:
+        for item in re.split(r'[,;\n]', value or ''):
+            item = item.strip()
+            if item and item.lower() not in seen:
+                seen[item.lower()] = item
+    return ', '.join(seen.values())
+
+
+def merge_notes(values):
+    """Join the distinct non-empty notes, in order, separated by blank lines."""
+    notes = []
+    for value in values:
+        value = (value or '').strip()
+        if value and value not in notes:
+            notes.append(value)
+    return '\n\n'.join(notes)
+
+
+def _log_moved_treatments(merge, hub_id, loser_ids):
+    log_table = connection.ops.quote_name(PatientMergeTreatment._meta.db_table)
+    treatment_table = connection.ops.quote_name(Treatment._meta.db_table)
+    uuid_field = PatientRecord._meta.pk
+    placeholders = ', '.join(['%s'] * len(loser_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {log_table} (merge_id, treatment_id, from_patient_id) '
+            f'SELECT %s, id, patient_id FROM {treatment_table} '
+            f'WHERE hub_id = %s AND patient_id IN ({placeholders})',
+            [
+                uuid_field.get_db_prep_value(merge.pk, connection),
+                uuid_field.get_db_prep_value(hub_id, connection),
+                *(uuid_field.get_db_prep_value(pk, connection) for pk in loser_ids),
+            ],
+        )
+
+
+def merge_patients(hub_id, survivor_id, loser_ids, user_id=None):
+    """Merge ``loser_ids`` into ``survivor_id`` and return the ``PatientMerge`` log entry."""
+    loser_ids = [pk for pk in dict.fromkeys(str(pk) for pk in loser_ids) if pk != str(survivor_id)]
+    if not loser_ids:
+        raise MergeError('Select at least one record to merge into the survivor.')
+
+    with transaction.atomic():
+        patients = {
+            str(patient.pk): patient
+            for patient in PatientRecord.objects.select_for_update(of=('self',)).select_related('detail').filter(
+                hub_id=hub_id, is_deleted=False, pk__in=[survivor_id, *loser_ids],
+            )
+        }
+        survivor = patients.get(str(survivor_id))
+        losers = [patients[pk] for pk in loser_ids if pk in patients]
+        if survivor is None or len(losers) != len(loser_ids):
+            raise MergeError('Some of the selected patients no longer exist.')
+
+        merge = PatientMerge.objects.create(
+            hub_id=hub_id,
+            created_by=user_id,
+            survivor=survivor,
+            merged_ids=loser_ids,
+            survivor_allergies=survivor.allergies,
+            survivor_medical_notes=survivor.medical_notes,
+        )
+        _log_moved_treatments(merge, hub_id, [loser.pk for loser in losers])
+        now = timezone.now()
+        moved = Treatment.all_objects.filter(hub_id=hub_id, patient_id__in=[loser.pk for loser in losers]).update(
+            patient_id=survivor.pk, updated_at=now,
+        )
+        PatientMerge.objects.filter(pk=merge.pk).update(treatments_moved=moved)
+        merge.treatments_moved = moved
+        visits.refresh([survivor.pk, *(loser.pk for loser in losers)])
+
+        survivor.allergies = merge_allergies([survivor.allergies, *(loser.allergies for loser in losers)])
+        survivor.medical_notes = merge_notes([survivor.medical_notes, *(loser.medical_notes for loser in losers)])
+        survivor.updated_by = user_id
+        survivor.save(update_fields=['allergies', 'medical_notes', 'updated_by', 'updated_at'])
+        merge.merged_allergies = survivor.allergies
+        merge.merged_medical_notes = survivor.medical_notes
+        merge.save(update_fields=['merged_allergies', 'merged_medical_notes', 'updated_at'])
+
+        PatientRecord.objects.filter(pk__in=[loser.pk for loser in losers]).update(is_deleted=True, deleted_at=now)
+        stats.apply_deltas(hub_id, {
+            'patient_records': -len(losers),
+            'active_patient_records': -sum(1 for loser in losers if loser.is_active),
+        })
+        generations.bump(hub_id)
+    return merge
+
+
+# (survivor field, text before the merge, text written by the merge)
+MERGED_TEXTS = [
+    ('allergies', 'survivor_allergies', 'merged_allergies'),
+    ('medical_notes', 'survivor_medical_notes', 'merged_medical_notes'),
+]
+
+
+def undo_merge(hub_id, merge_id):
+    """Reverse a merge: restore the merged records, their treatments and the survivor's texts.
+
+    A survivor text edited after the merge is kept; its field names are listed
+    in ``kept_fields`` on the returned merge.
+    """
+    with transaction.atomic():
+        try:
+            merge = PatientMerge.objects.select_for_update().get(pk=merge_id, hub_id=hub_id)
+        except PatientMerge.DoesNotExist:
+            raise MergeError('Merge not found.')
+        if merge.reversed_at is not None:
+            raise MergeError('This merge has already been undone.')
+
+        now = timezone.now()
+        log = PatientMergeTreatment.objects.filter(merge=merge)
+        # Only treatments still on the survivor go back; later edits elsewhere win.
+        Treatment.all_objects.filter(
+            patient_id=merge.survivor_id, pk__in=log.values('treatment_id'),
+        ).update(
+            patient_id=Subquery(log.filter(treatment_id=OuterRef('pk')).values('from_patient_id')[:1]),
+            updated_at=now,
+        )
+        visits.refresh([merge.survivor_id, *merge.merged_ids])
+
+        restored = PatientRecord.all_objects.filter(hub_id=hub_id, pk__in=merge.merged_ids, is_deleted=True)
+        active = restored.filter(is_active=True).count()
+        count = restored.update(is_deleted=False, deleted_at=None, updated_at=now)
+        stats.apply_deltas(hub_id, {'patient_records': count, 'active_patient_records': active})
+
+        survivor = PatientRecord.all_objects.select_for_update(of=('self',)).select_related('detail').get(
+            pk=merge.survivor_id,
+        )
+        reverted, merge.kept_fields = [], []
+        for field, before, merged in MERGED_TEXTS:
+            if getattr(survivor, field) == getattr(merge, merged):
+                setattr(survivor, field, getattr(merge, before))
+                reverted.append(field)
+            else:
+                merge.kept_fields.append(field)
+        if reverted:
+            survivor.save(update_fields=[*reverted, 'updated_at'])
+
+        merge.reversed_at = now
+        merge.save(update_fields=['reversed_at', 'updated_at'])
+        generations.bump(hub_id)
+    return merge
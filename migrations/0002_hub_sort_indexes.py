@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'is_active'], name='pr_patient_hub_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'patient_name'], name='pr_patient_hub_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'date_of_birth'], name='pr_patient_hub_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'created_at'], name='pr_patient_hub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'patient'], name='pr_treat_hub_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'date'], name='pr_treat_hub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'practitioner_id'], name='pr_treat_hub_pract_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'created_at'], name='pr_treat_hub_created_idx'),
+        ),
+    ]
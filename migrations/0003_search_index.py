@@ -0,0 +1,67 @@
+from django.db import migrations
+
+PATIENT_RECORD_TABLE = 'patient_records_patientrecord'
+TREATMENT_TABLE = 'patient_records_treatment'
+
+PATIENT_RECORD_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(patient_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(allergies, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(gender, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(blood_type, '')), 'C')"
+)
+TREATMENT_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(diagnosis, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(prescription, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(notes, '')), 'C')"
+)
+
+PATIENT_RECORD_COLUMNS = 'patient_name, allergies, gender, blood_type'
+TREATMENT_COLUMNS = 'description, diagnosis, prescription, notes'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, vector, index in (
+            (PATIENT_RECORD_TABLE, PATIENT_RECORD_VECTOR, 'pr_patient_search_idx'),
+            (TREATMENT_TABLE, TREATMENT_VECTOR, 'pr_treat_search_idx'),
+        ):
+            schema_editor.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector')
+            schema_editor.execute(f'UPDATE {table} SET search_vector = {vector}')
+            schema_editor.execute(f'CREATE INDEX {index} ON {table} USING GIN (search_vector)')
+        schema_editor.execute(
+            f'CREATE INDEX pr_patient_name_trgm_idx ON {PATIENT_RECORD_TABLE} USING GIN (patient_name gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        for table, columns in (
+            (PATIENT_RECORD_TABLE, PATIENT_RECORD_COLUMNS),
+            (TREATMENT_TABLE, TREATMENT_COLUMNS),
+        ):
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {table}_fts USING fts5({columns}, tokenize='unicode61 remove_diacritics 2')"
+            )
+            schema_editor.execute(f'INSERT INTO {table}_fts (rowid, {columns}) SELECT rowid, {columns} FROM {table}')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS pr_patient_name_trgm_idx')
+        for table in (PATIENT_RECORD_TABLE, TREATMENT_TABLE):
+            schema_editor.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        for table in (PATIENT_RECORD_TABLE, TREATMENT_TABLE):
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0002_hub_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+import uuid
+from django.db import migrations, models
+from django.db.models import Count
+
+UNASSIGNED = uuid.UUID(int=0)
+
+
+def backfill_rollups(apps, schema_editor):
+    Treatment = apps.get_model('patient_records', 'Treatment')
+    TreatmentDailyStat = apps.get_model('patient_records', 'TreatmentDailyStat')
+    rows = (
+        Treatment.objects.filter(is_deleted=False, hub_id__isnull=False)
+        .values('hub_id', 'date', 'practitioner_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    buckets = {}
+    for row in rows.iterator():
+        key = (row['hub_id'], row['date'], row['practitioner_id'] or UNASSIGNED)
+        buckets[key] = buckets.get(key, 0) + row['total']
+    TreatmentDailyStat.objects.bulk_create(
+        [
+            TreatmentDailyStat(hub_id=hub_id, day=day, practitioner_id=practitioner_id, treatment_count=total)
+            for (hub_id, day, practitioner_id), total in buckets.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0004_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TreatmentDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_id', models.UUIDField(verbose_name='Hub Id')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('practitioner_id', models.UUIDField(verbose_name='Practitioner Id')),
+                ('treatment_count', models.IntegerField(default=0, verbose_name='Treatment Count')),
+            ],
+            options={
+                'db_table': 'patient_records_treatmentdailystat',
+                'constraints': [models.UniqueConstraint(fields=('hub_id', 'day', 'practitioner_id'), name='pr_daily_stat_key')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
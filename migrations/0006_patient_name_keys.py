@@ -0,0 +1,83 @@
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Frozen copies of the patient_records.names key functions as of this migration.
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def name_tokens(name):
+    folded = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii')
+    return re.findall(r'[a-z0-9]+', folded.lower())
+
+
+def name_key(name):
+    return ' '.join(sorted(name_tokens(name)))[:255]
+
+
+def soundex(token):
+    if not token or not token[0].isalpha():
+        return token[:4]
+    code = token[0].upper()
+    previous = SOUNDEX_CODES.get(token[0], '')
+    for char in token[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def phonetic_key(name):
+    return ' '.join(sorted(soundex(token) for token in name_tokens(name)))[:64]
+
+
+def backfill_name_keys(apps, schema_editor):
+    PatientRecord = apps.get_model('patient_records', 'PatientRecord')
+    batch = []
+    for patient in PatientRecord.objects.only('id', 'patient_name').order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        patient.name_key = name_key(patient.patient_name)
+        patient.phonetic_key = phonetic_key(patient.patient_name)
+        batch.append(patient)
+        if len(batch) == BATCH_SIZE:
+            PatientRecord.objects.bulk_update(batch, ['name_key', 'phonetic_key'])
+            batch = []
+    PatientRecord.objects.bulk_update(batch, ['name_key', 'phonetic_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0005_treatmentdailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientrecord',
+            name='name_key',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Name Key'),
+        ),
+        migrations.AddField(
+            model_name='patientrecord',
+            name='phonetic_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Phonetic Key'),
+        ),
+        migrations.RunPython(backfill_name_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'phonetic_key'], name='pr_patient_hub_phonetic_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+import uuid
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0006_patient_name_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientMerge',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+                ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+                ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('merged_ids', models.JSONField(default=list, verbose_name='Merged Ids')),
+                ('survivor_allergies', models.TextField(blank=True, verbose_name='Survivor Allergies')),
+                ('survivor_medical_notes', models.TextField(blank=True, verbose_name='Survivor Medical Notes')),
+                ('treatments_moved', models.PositiveIntegerField(default=0, verbose_name='Treatments Moved')),
+                ('reversed_at', models.DateTimeField(blank=True, null=True, verbose_name='Reversed At')),
+                ('survivor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merges', to='patient_records.patientrecord')),
+            ],
+            options={
+                'db_table': 'patient_records_patientmerge',
+                'abstract': False,
+                'indexes': [models.Index(fields=['hub_id', 'created_at'], name='pr_merge_hub_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PatientMergeTreatment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('treatment_id', models.UUIDField(verbose_name='Treatment Id')),
+                ('from_patient_id', models.UUIDField(verbose_name='From Patient Id')),
+                ('merge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moved_treatments', to='patient_records.patientmerge')),
+            ],
+            options={
+                'db_table': 'patient_records_patientmergetreatment',
+                'indexes': [models.Index(fields=['merge', 'treatment_id'], name='pr_merge_treatment_idx')],
+            },
+        ),
+    ]
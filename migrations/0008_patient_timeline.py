@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_visit_summary(apps, schema_editor):
+    PatientRecord = apps.get_model('patient_records', 'PatientRecord')
+    Treatment = apps.get_model('patient_records', 'Treatment')
+    live = Treatment.objects.filter(patient=OuterRef('pk'), is_deleted=False).order_by().values('patient')
+    PatientRecord.objects.update(
+        visit_count=Coalesce(
+            Subquery(live.annotate(total=Count('id')).values('total')[:1], output_field=IntegerField()),
+            Value(0),
+        ),
+        last_visit_date=Subquery(live.annotate(last=Max('date')).values('last')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0007_patientmerge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientrecord',
+            name='visit_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Visit Count'),
+        ),
+        migrations.AddField(
+            model_name='patientrecord',
+            name='last_visit_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Last Visit Date'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['patient', '-date', '-id'], name='pr_treat_patient_date_idx'),
+        ),
+        migrations.RunPython(backfill_visit_summary, migrations.RunPython.noop),
+    ]
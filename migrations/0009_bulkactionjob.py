@@ -0,0 +1,39 @@
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0008_patient_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkActionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+                ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+                ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('resource', models.CharField(max_length=30, verbose_name='Resource')),
+                ('action', models.CharField(max_length=20, verbose_name='Action')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Params')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10, verbose_name='Status')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total Rows')),
+                ('rows_processed', models.PositiveIntegerField(default=0, verbose_name='Rows Processed')),
+                ('rows_changed', models.PositiveIntegerField(default=0, verbose_name='Rows Changed')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+            ],
+            options={
+                'db_table': 'patient_records_bulkactionjob',
+                'abstract': False,
+                'indexes': [models.Index(fields=['hub_id', 'status'], name='pr_bulkjob_hub_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,120 @@
+from django.db import migrations, models
+
+ARCHIVED_PATIENT_RECORD_TABLE = 'patient_records_archivedpatientrecord'
+ARCHIVED_TREATMENT_TABLE = 'patient_records_archivedtreatment'
+
+PATIENT_RECORD_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(patient_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(allergies, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(gender, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(blood_type, '')), 'C')"
+)
+TREATMENT_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(diagnosis, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(prescription, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(notes, '')), 'C')"
+)
+
+PATIENT_RECORD_COLUMNS = 'patient_name, allergies, gender, blood_type'
+TREATMENT_COLUMNS = 'description, diagnosis, prescription, notes'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for table, index in (
+            (ARCHIVED_PATIENT_RECORD_TABLE, 'pr_arch_patient_search_idx'),
+            (ARCHIVED_TREATMENT_TABLE, 'pr_arch_treat_search_idx'),
+        ):
+            schema_editor.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector')
+            schema_editor.execute(f'CREATE INDEX {index} ON {table} USING GIN (search_vector)')
+    elif vendor == 'sqlite':
+        for table, columns in (
+            (ARCHIVED_PATIENT_RECORD_TABLE, PATIENT_RECORD_COLUMNS),
+            (ARCHIVED_TREATMENT_TABLE, TREATMENT_COLUMNS),
+        ):
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {table}_fts USING fts5({columns}, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for table in (ARCHIVED_PATIENT_RECORD_TABLE, ARCHIVED_TREATMENT_TABLE):
+            schema_editor.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        for table in (ARCHIVED_PATIENT_RECORD_TABLE, ARCHIVED_TREATMENT_TABLE):
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0009_bulkactionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPatientRecord',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('created_by', models.UUIDField(blank=True, null=True)),
+                ('updated_by', models.UUIDField(blank=True, null=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('patient_name', models.CharField(max_length=255, verbose_name='Patient Name')),
+                ('date_of_birth', models.DateField(blank=True, null=True, verbose_name='Date Of Birth')),
+                ('gender', models.CharField(blank=True, max_length=20, verbose_name='Gender')),
+                ('blood_type', models.CharField(blank=True, max_length=5, verbose_name='Blood Type')),
+                ('allergies', models.TextField(blank=True, verbose_name='Allergies')),
+                ('medical_notes', models.TextField(blank=True, verbose_name='Medical Notes')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Is Active')),
+                ('name_key', models.CharField(blank=True, max_length=255)),
+                ('phonetic_key', models.CharField(blank=True, max_length=64)),
+                ('visit_count', models.PositiveIntegerField(default=0)),
+                ('last_visit_date', models.DateField(blank=True, null=True, verbose_name='Last Visit Date')),
+                ('archived_at', models.DateTimeField(verbose_name='Archived At')),
+                ('archive_reason', models.CharField(choices=[('deleted', 'Deleted'), ('inactive', 'Inactive')], max_length=10, verbose_name='Reason')),
+            ],
+            options={
+                'db_table': 'patient_records_archivedpatientrecord',
+                'indexes': [
+                    models.Index(fields=['hub_id', 'patient_name'], name='pr_arch_patient_hub_name_idx'),
+                    models.Index(fields=['hub_id', 'archived_at'], name='pr_arch_patient_hub_arch_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTreatment',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('created_by', models.UUIDField(blank=True, null=True)),
+                ('updated_by', models.UUIDField(blank=True, null=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('patient_id', models.UUIDField(verbose_name='Patient Id')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('description', models.TextField(verbose_name='Description')),
+                ('diagnosis', models.TextField(blank=True, verbose_name='Diagnosis')),
+                ('prescription', models.TextField(blank=True, verbose_name='Prescription')),
+                ('practitioner_id', models.UUIDField(blank=True, null=True, verbose_name='Practitioner Id')),
+                ('notes', models.TextField(blank=True, verbose_name='Notes')),
+                ('archived_at', models.DateTimeField(verbose_name='Archived At')),
+            ],
+            options={
+                'db_table': 'patient_records_archivedtreatment',
+                'indexes': [
+                    models.Index(fields=['hub_id', 'patient_id'], name='pr_arch_treat_hub_patient_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
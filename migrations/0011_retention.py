@@ -0,0 +1,46 @@
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0010_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientRecordsSettings',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+                ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+                ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('retention_days', models.PositiveIntegerField(blank=True, null=True, verbose_name='Retention Days')),
+            ],
+            options={
+                'db_table': 'patient_records_settings',
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['hub_id', 'deleted_at', 'id'], name='pr_patient_hub_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['hub_id', 'deleted_at', 'id'], name='pr_treat_hub_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedpatientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['hub_id', 'deleted_at', 'id'], name='pr_arch_patient_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtreatment',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['hub_id', 'deleted_at', 'id'], name='pr_arch_treat_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,120 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+PREVIEW_LENGTH = 120
+
+
+def text_preview(text):
+    # Frozen copy of models.text_preview as of this migration.
+    text = text or ''
+    if len(text) <= PREVIEW_LENGTH:
+        return text
+    return text[:PREVIEW_LENGTH - 1] + '\u2026'
+
+
+# (model, detail model, detail fields, {detail field: preview column})
+DETAILS = [
+    ('PatientRecord', 'PatientRecordDetail', ('allergies', 'medical_notes'), {'allergies': 'allergies_preview'}),
+    ('Treatment', 'TreatmentDetail', ('description', 'diagnosis', 'prescription', 'notes'), {
+        'description': 'description_preview',
+        'diagnosis': 'diagnosis_preview',
+        'prescription': 'prescription_preview',
+    }),
+]
+
+
+def _write_batch(Model, Detail, fields, previews, rows):
+    fk = Detail._meta.pk.attname
+    Detail.objects.bulk_create([Detail(**{fk: pk}, **dict(zip(fields, values))) for pk, *values in rows])
+    Model._base_manager.bulk_update([
+        Model(pk=pk, **{
+            previews[field]: text_preview(value) for field, value in zip(fields, values) if field in previews
+        })
+        for pk, *values in rows
+    ], list(previews.values()))
+
+
+def copy_to_details(apps, schema_editor):
+    for model_name, detail_name, fields, previews in DETAILS:
+        Model = apps.get_model('patient_records', model_name)
+        Detail = apps.get_model('patient_records', detail_name)
+        rows = Model._base_manager.order_by('pk').values_list('pk', *fields).iterator(chunk_size=BATCH_SIZE)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                _write_batch(Model, Detail, fields, previews, batch)
+                batch = []
+        if batch:
+            _write_batch(Model, Detail, fields, previews, batch)
+
+
+def copy_from_details(apps, schema_editor):
+    for model_name, detail_name, fields, _previews in DETAILS:
+        Model = apps.get_model('patient_records', model_name)
+        Detail = apps.get_model('patient_records', detail_name)
+        fk = Detail._meta.pk.attname
+        rows = Detail.objects.order_by('pk').values_list(fk, *fields).iterator(chunk_size=BATCH_SIZE)
+        batch = []
+        for pk, *values in rows:
+            batch.append(Model(pk=pk, **dict(zip(fields, values))))
+            if len(batch) == BATCH_SIZE:
+                Model._base_manager.bulk_update(batch, list(fields))
+                batch = []
+        Model._base_manager.bulk_update(batch, list(fields))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0011_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientRecordDetail',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='detail', serialize=False, to='patient_records.patientrecord')),
+                ('allergies', models.TextField(blank=True, verbose_name='Allergies')),
+                ('medical_notes', models.TextField(blank=True, verbose_name='Medical Notes')),
+            ],
+            options={
+                'db_table': 'patient_records_patientrecorddetail',
+            },
+        ),
+        migrations.CreateModel(
+            name='TreatmentDetail',
+            fields=[
+                ('treatment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='detail', serialize=False, to='patient_records.treatment')),
+                ('description', models.TextField(verbose_name='Description')),
+                ('diagnosis', models.TextField(blank=True, verbose_name='Diagnosis')),
+                ('prescription', models.TextField(blank=True, verbose_name='Prescription')),
+                ('notes', models.TextField(blank=True, verbose_name='Notes')),
+            ],
+            options={
+                'db_table': 'patient_records_treatmentdetail',
+            },
+        ),
+        migrations.AddField(
+            model_name='patientrecord',
+            name='allergies_preview',
+            field=models.CharField(blank=True, editable=False, max_length=120, verbose_name='Allergies'),
+        ),
+        migrations.AddField(
+            model_name='treatment',
+            name='description_preview',
+            field=models.CharField(blank=True, editable=False, max_length=120, verbose_name='Description'),
+        ),
+        migrations.AddField(
+            model_name='treatment',
+            name='diagnosis_preview',
+            field=models.CharField(blank=True, editable=False, max_length=120, verbose_name='Diagnosis'),
+        ),
+        migrations.AddField(
+            model_name='treatment',
+            name='prescription_preview',
+            field=models.CharField(blank=True, editable=False, max_length=120, verbose_name='Prescription'),
+        ),
+        migrations.RunPython(copy_to_details, copy_from_details),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0012_detail_tables'),
+    ]
+
+    operations = [
+        # blank=True so that reversing re-adds the column with an empty default.
+        migrations.AlterField(
+            model_name='treatment',
+            name='description',
+            field=models.TextField(blank=True, verbose_name='Description'),
+        ),
+        # Dropping columns remakes the tables on SQLite and renumbers their
+        # rowids; 0015_search_fts_ids rebuilds the FTS tables keyed on id.
+        migrations.RemoveField(
+            model_name='patientrecord',
+            name='allergies',
+        ),
+        migrations.RemoveField(
+            model_name='patientrecord',
+            name='medical_notes',
+        ),
+        migrations.RemoveField(
+            model_name='treatment',
+            name='description',
+        ),
+        migrations.RemoveField(
+            model_name='treatment',
+            name='diagnosis',
+        ),
+        migrations.RemoveField(
+            model_name='treatment',
+            name='prescription',
+        ),
+        migrations.RemoveField(
+            model_name='treatment',
+            name='notes',
+        ),
+    ]
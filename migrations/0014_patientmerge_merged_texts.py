@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0013_drop_inline_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientmerge',
+            name='merged_allergies',
+            field=models.TextField(blank=True, verbose_name='Merged Allergies'),
+        ),
+        migrations.AddField(
+            model_name='patientmerge',
+            name='merged_medical_notes',
+            field=models.TextField(blank=True, verbose_name='Merged Medical Notes'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+TOKENIZE = "tokenize='unicode61 remove_diacritics 2'"
+
+PATIENT_RECORD_COLUMNS = 'patient_name, allergies, gender, blood_type'
+TREATMENT_COLUMNS = 'description, diagnosis, prescription, notes'
+
+# (source table, FTS columns, SELECT of the indexed text keyed by ``key``)
+FTS_TABLES = [
+    (
+        'patient_records_patientrecord', PATIENT_RECORD_COLUMNS,
+        'SELECT p.{key}, p.patient_name, d.allergies, p.gender, p.blood_type '
+        'FROM patient_records_patientrecord p '
+        'LEFT JOIN patient_records_patientrecorddetail d ON d.patient_id = p.id',
+    ),
+    (
+        'patient_records_treatment', TREATMENT_COLUMNS,
+        'SELECT t.{key}, d.description, d.diagnosis, d.prescription, d.notes '
+        'FROM patient_records_treatment t '
+        'LEFT JOIN patient_records_treatmentdetail d ON d.treatment_id = t.id',
+    ),
+    (
+        'patient_records_archivedpatientrecord', PATIENT_RECORD_COLUMNS,
+        f'SELECT {{key}}, {PATIENT_RECORD_COLUMNS} FROM patient_records_archivedpatientrecord',
+    ),
+    (
+        'patient_records_archivedtreatment', TREATMENT_COLUMNS,
+        f'SELECT {{key}}, {TREATMENT_COLUMNS} FROM patient_records_archivedtreatment',
+    ),
+]
+
+
+def key_fts_on_id(apps, schema_editor):
+    # Table remakes (and VACUUM) renumber implicit rowids, so the FTS tables
+    # store the row id in an unindexed column instead of mirroring the rowid.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, columns, select in FTS_TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {table}_fts USING fts5(id UNINDEXED, {columns}, {TOKENIZE})')
+        schema_editor.execute(f'INSERT INTO {table}_fts (id, {columns}) {select.format(key="id")}')
+
+
+def key_fts_on_rowid(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, columns, select in FTS_TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {table}_fts USING fts5({columns}, {TOKENIZE})')
+        schema_editor.execute(f'INSERT INTO {table}_fts (rowid, {columns}) {select.format(key="rowid")}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0014_patientmerge_merged_texts'),
+    ]
+
+    operations = [
+        migrations.RunPython(key_fts_on_id, key_fts_on_rowid),
+    ]
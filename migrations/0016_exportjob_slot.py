@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0015_search_fts_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='slot',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='Slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='exportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('hub_id', 'slot'), name='pr_exportjob_hub_slot'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+TOKENIZE = "tokenize='unicode61 remove_diacritics 2'"
+
+PATIENT_RECORD_COLUMNS = 'patient_name, allergies, gender, blood_type'
+TREATMENT_COLUMNS = 'description, diagnosis, prescription, notes'
+
+# (source table, FTS columns, FROM clause with the source aliased ``s``, indexed text)
+FTS_TABLES = [
+    (
+        'patient_records_patientrecord', PATIENT_RECORD_COLUMNS,
+        'patient_records_patientrecord s '
+        'LEFT JOIN patient_records_patientrecorddetail d ON d.patient_id = s.id',
+        's.patient_name, d.allergies, s.gender, s.blood_type',
+    ),
+    (
+        'patient_records_treatment', TREATMENT_COLUMNS,
+        'patient_records_treatment s '
+        'LEFT JOIN patient_records_treatmentdetail d ON d.treatment_id = s.id',
+        'd.description, d.diagnosis, d.prescription, d.notes',
+    ),
+    (
+        'patient_records_archivedpatientrecord', PATIENT_RECORD_COLUMNS,
+        'patient_records_archivedpatientrecord s',
+        's.patient_name, s.allergies, s.gender, s.blood_type',
+    ),
+    (
+        'patient_records_archivedtreatment', TREATMENT_COLUMNS,
+        'patient_records_archivedtreatment s',
+        's.description, s.diagnosis, s.prescription, s.notes',
+    ),
+]
+
+
+def key_fts_on_rowid(apps, schema_editor):
+    # A map of row ids to stable integers keys each FTS table on rowid, so
+    # updates seek by rowid instead of scanning an unindexed id column.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, columns, source, values in FTS_TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        schema_editor.execute(
+            f'CREATE TABLE {table}_fts_keys (rowid INTEGER PRIMARY KEY, id char(32) NOT NULL UNIQUE)'
+        )
+        schema_editor.execute(f'INSERT INTO {table}_fts_keys (id) SELECT id FROM {table}')
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {table}_fts USING fts5({columns}, {TOKENIZE})')
+        schema_editor.execute(
+            f'INSERT INTO {table}_fts (rowid, {columns}) SELECT k.rowid, {values} '
+            f'FROM {source} JOIN {table}_fts_keys k ON k.id = s.id'
+        )
+
+
+def key_fts_on_id(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, columns, source, values in FTS_TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts_keys')
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {table}_fts USING fts5(id UNINDEXED, {columns}, {TOKENIZE})')
+        schema_editor.execute(f'INSERT INTO {table}_fts (id, {columns}) SELECT s.id, {values} FROM {source}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0016_exportjob_slot'),
+    ]
+
+    operations = [
+        migrations.RunPython(key_fts_on_rowid, key_fts_on_id),
+    ]
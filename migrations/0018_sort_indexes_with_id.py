@@ -0,0 +1,91 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0017_search_fts_keys'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='patientrecord',
+            name='pr_patient_hub_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'is_active', 'id'], name='pr_patient_hub_active_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='patientrecord',
+            name='pr_patient_hub_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'patient_name', 'id'], name='pr_patient_hub_name_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='patientrecord',
+            name='pr_patient_hub_dob_idx',
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'date_of_birth', 'id'], name='pr_patient_hub_dob_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='patientrecord',
+            name='pr_patient_hub_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'created_at', 'id'], name='pr_patient_hub_created_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='treatment',
+            name='pr_treat_hub_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'date', 'id'], name='pr_treat_hub_date_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='treatment',
+            name='pr_treat_hub_pract_idx',
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'practitioner_id', 'id'], name='pr_treat_hub_pract_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='treatment',
+            name='pr_treat_hub_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'created_at', 'id'], name='pr_treat_hub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'gender', 'id'], name='pr_patient_hub_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'blood_type', 'id'], name='pr_patient_hub_blood_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'allergies_preview', 'id'], name='pr_patient_hub_allergy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'description_preview', 'id'], name='pr_treat_hub_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'diagnosis_preview', 'id'], name='pr_treat_hub_diag_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'prescription_preview', 'id'], name='pr_treat_hub_presc_idx'),
+        ),
+    ]
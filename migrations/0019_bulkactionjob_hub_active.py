@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+ACTIVE = ['queued', 'running']
+
+
+def fail_duplicate_jobs(apps, schema_editor):
+    """Keep only the newest active job per hub so the constraint can be added."""
+    BulkActionJob = apps.get_model('patient_records', 'BulkActionJob')
+    seen = set()
+    duplicates = []
+    active = BulkActionJob.objects.filter(status__in=ACTIVE).order_by('hub_id', '-created_at')
+    for pk, hub_id in active.values_list('pk', 'hub_id'):
+        if hub_id in seen:
+            duplicates.append(pk)
+        seen.add(hub_id)
+    BulkActionJob.objects.filter(pk__in=duplicates).update(
+        status='failed', error='Bulk action did not finish', finished_at=timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient_records', '0018_sort_indexes_with_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bulkactionjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('hub_id',), name='pr_bulkjob_hub_active'),
+        ),
+    ]
@@ -1,36 +1,530 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
 from apps.core.models.base import HubBaseModel
 
-class PatientRecord(HubBaseModel):
+from .names import name_key, phonetic_key
+
+
+class TrackedFieldsMixin:
+    """Remember the database values of ``TRACKED_FIELDS`` so signal handlers can see what changed."""
+
+    TRACKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_tracking()
+        return instance
+
+    def reset_tracking(self):
+        # Deferred fields are absent from __dict__ and stay unknown.
+        self._loaded_values = {
+            field: self.__dict__[field] for field in self.TRACKED_FIELDS if field in self.__dict__
+        }
+
+    def load_missing_tracking(self):
+        """Read tracked values that were not loaded (deferred fields) from the stored row."""
+        missing = [field for field in self.TRACKED_FIELDS if not self.is_tracked(field)]
+        if not missing or self._state.adding:
+            return
+        row = type(self)._base_manager.filter(pk=self.pk).values(*missing).first()
+        if row is not None:
+            self._loaded_values = {**getattr(self, '_loaded_values', {}), **row}
+
+    def loaded_value(self, field, default=None):
+        return getattr(self, '_loaded_values', {}).get(field, default)
+
+    def is_tracked(self, field):
+        return field in getattr(self, '_loaded_values', {})
+
+
+PREVIEW_LENGTH = 120
+
+
+def text_preview(text):
+    """The datatable preview of ``text``: at most ``PREVIEW_LENGTH`` characters."""
+    text = text or ''
+    if len(text) <= PREVIEW_LENGTH:
+        return text
+    return text[:PREVIEW_LENGTH - 1] + '\u2026'
+
+
+def detail_text(name):
+    """Attribute for the ``name`` text of the record's detail row, keeping its preview in step."""
+
+    def getter(self):
+        return getattr(self.get_detail(), name)
+
+    def setter(self, value):
+        setattr(self.get_detail(), name, value)
+        self._detail_changed = {*getattr(self, '_detail_changed', ()), name}
+        preview = self.PREVIEW_FIELDS.get(name)
+        if preview:
+            setattr(self, preview, text_preview(value))
+
+    return property(getter, setter)
+
+
+class DetailFieldsMixin:
+    """Keep long clinical text in a one-to-one ``detail`` row, off the hot table.
+
+    ``DETAIL_FIELDS`` are read and written like plain fields (and accepted by
+    the constructor); the detail row is loaded on first access, so views that
+    need the text should ``select_related('detail')``. ``PREVIEW_FIELDS`` maps
+    the texts the datatables show to a short preview column on the hot row.
+    ``save`` writes the detail row first, in the same transaction.
+    """
+
+    DETAIL_FIELDS = ()
+    PREVIEW_FIELDS = {}
+
+    def get_detail(self):
+        rel = self._meta.get_field('detail')
+        if rel.is_cached(self):
+            # ``select_related`` caches ``None`` for a record without a detail row.
+            detail = rel.get_cached_value(self)
+        else:
+            detail = None if self._state.adding else rel.related_model.objects.filter(pk=self.pk).first()
+            if detail is not None:
+                self.detail = detail
+        if detail is None:
+            detail = rel.related_model(**{rel.field.name: self})
+            self.detail = detail
+        return detail
+
+    def reset_tracking(self):
+        super().reset_tracking()
+        self._detail_changed = set()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        rel = self._meta.get_field('detail')
+        if rel.is_cached(self):
+            rel.delete_cached_value(self)
+        self._detail_changed = set()
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding or kwargs.get('force_insert')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            changed = getattr(self, '_detail_changed', ())
+            detail_fields = set(self.DETAIL_FIELDS) if adding or changed else set()
+        else:
+            detail_fields = {field for field in update_fields if field in self.DETAIL_FIELDS}
+            update_fields = {field for field in update_fields if field not in self.DETAIL_FIELDS}
+            if detail_fields:
+                update_fields |= {self.PREVIEW_FIELDS[field] for field in detail_fields if field in self.PREVIEW_FIELDS}
+                update_fields.add('updated_at')
+            kwargs['update_fields'] = update_fields
+        # Read by the save signal to decide whether to reindex.
+        self.saved_detail_fields = detail_fields
+        with transaction.atomic(using=kwargs.get('using')):
+            if detail_fields:
+                detail = self.get_detail()
+                if detail._state.adding:
+                    detail.save(force_insert=True)
+                else:
+                    detail.save(update_fields=None if update_fields is None else detail_fields)
+            super().save(*args, **kwargs)
+        self._detail_changed = set()
+
+
+class PatientRecord(DetailFieldsMixin, TrackedFieldsMixin, HubBaseModel):
     patient_name = models.CharField(max_length=255, verbose_name=_('Patient Name'))
     date_of_birth = models.DateField(null=True, blank=True, verbose_name=_('Date Of Birth'))
     gender = models.CharField(max_length=20, blank=True, verbose_name=_('Gender'))
     blood_type = models.CharField(max_length=5, blank=True, verbose_name=_('Blood Type'))
-    allergies = models.TextField(blank=True, verbose_name=_('Allergies'))
-    medical_notes = models.TextField(blank=True, verbose_name=_('Medical Notes'))
     is_active = models.BooleanField(default=True, verbose_name=_('Is Active'))
+    allergies_preview = models.CharField(
+        max_length=PREVIEW_LENGTH, blank=True, editable=False, verbose_name=_('Allergies'),
+    )
+    # Blocking keys for duplicate detection, derived from patient_name on save.
+    name_key = models.CharField(max_length=255, blank=True, editable=False, verbose_name=_('Name Key'))
+    phonetic_key = models.CharField(max_length=64, blank=True, editable=False, verbose_name=_('Phonetic Key'))
+    # Visit summary of live treatments, maintained by ``visits.refresh``.
+    visit_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Visit Count'))
+    last_visit_date = models.DateField(null=True, blank=True, editable=False, verbose_name=_('Last Visit Date'))
+
+    allergies = detail_text('allergies')
+    medical_notes = detail_text('medical_notes')
+
+    TRACKED_FIELDS = ('is_deleted', 'is_active')
+    DERIVED_FIELDS = ('visit_count', 'last_visit_date')
+    DETAIL_FIELDS = ('allergies', 'medical_notes')
+    PREVIEW_FIELDS = {'allergies': 'allergies_preview'}
 
     class Meta(HubBaseModel.Meta):
         db_table = 'patient_records_patientrecord'
+        indexes = [
+            # One per list sort; the trailing id matches the (column, pk) ordering
+            # and keyset cursors, and serves both directions.
+            models.Index(fields=['hub_id', 'is_active', 'id'], condition=Q(is_deleted=False), name='pr_patient_hub_active_idx'),
+            models.Index(fields=['hub_id', 'patient_name', 'id'], condition=Q(is_deleted=False), name='pr_patient_hub_name_idx'),
+            models.Index(fields=['hub_id', 'date_of_birth', 'id'], condition=Q(is_deleted=False), name='pr_patient_hub_dob_idx'),
+            models.Index(fields=['hub_id', 'gender', 'id'], condition=Q(is_deleted=False), name='pr_patient_hub_gender_idx'),
+            models.Index(fields=['hub_id', 'blood_type', 'id'], condition=Q(is_deleted=False), name='pr_patient_hub_blood_idx'),
+            models.Index(fields=['hub_id', 'allergies_preview', 'id'], condition=Q(is_deleted=False), name='pr_patient_hub_allergy_idx'),
+            models.Index(fields=['hub_id', 'created_at', 'id'], condition=Q(is_deleted=False), name='pr_patient_hub_created_idx'),
+            models.Index(fields=['hub_id', 'phonetic_key'], condition=Q(is_deleted=False), name='pr_patient_hub_phonetic_idx'),
+            # Archive and purge candidates (``archive``, ``retention``).
+            models.Index(fields=['hub_id', 'deleted_at', 'id'], condition=Q(is_deleted=True), name='pr_patient_hub_deleted_idx'),
+        ]
 
     def __str__(self):
-        return str(self.id)
+        return self.patient_name
+
+    def set_name_keys(self):
+        self.name_key = name_key(self.patient_name)
+        self.phonetic_key = phonetic_key(self.patient_name)
 
+    def save(self, *args, **kwargs):
+        self.set_name_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Never write back a stale visit summary (or load deferred fields).
+            skipped = {*self.DERIVED_FIELDS, *self.get_deferred_fields()}
+            update_fields = [
+                *(field.name for field in self._meta.concrete_fields
+                  if not field.primary_key and field.attname not in skipped),
+                *getattr(self, '_detail_changed', ()),
+            ]
+        if update_fields is not None:
+            if 'patient_name' in update_fields:
+                update_fields = {*update_fields, 'name_key', 'phonetic_key'}
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 
-class Treatment(HubBaseModel):
+
+class Treatment(DetailFieldsMixin, TrackedFieldsMixin, HubBaseModel):
     patient = models.ForeignKey('PatientRecord', on_delete=models.CASCADE, related_name='treatments')
     date = models.DateField(verbose_name=_('Date'))
+    description_preview = models.CharField(
+        max_length=PREVIEW_LENGTH, blank=True, editable=False, verbose_name=_('Description'),
+    )
+    diagnosis_preview = models.CharField(
+        max_length=PREVIEW_LENGTH, blank=True, editable=False, verbose_name=_('Diagnosis'),
+    )
+    prescription_preview = models.CharField(
+        max_length=PREVIEW_LENGTH, blank=True, editable=False, verbose_name=_('Prescription'),
+    )
+    practitioner_id = models.UUIDField(null=True, blank=True, verbose_name=_('Practitioner Id'))
+
+    description = detail_text('description')
+    diagnosis = detail_text('diagnosis')
+    prescription = detail_text('prescription')
+    notes = detail_text('notes')
+
+    TRACKED_FIELDS = ('is_deleted', 'date', 'practitioner_id', 'patient_id')
+    DETAIL_FIELDS = ('description', 'diagnosis', 'prescription', 'notes')
+    PREVIEW_FIELDS = {
+        'description': 'description_preview',
+        'diagnosis': 'diagnosis_preview',
+        'prescription': 'prescription_preview',
+    }
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'patient_records_treatment'
+        indexes = [
+            models.Index(fields=['hub_id', 'patient'], condition=Q(is_deleted=False), name='pr_treat_hub_patient_idx'),
+            # One per list sort, with the trailing id (see PatientRecord).
+            models.Index(fields=['hub_id', 'date', 'id'], condition=Q(is_deleted=False), name='pr_treat_hub_date_idx'),
+            models.Index(fields=['hub_id', 'description_preview', 'id'], condition=Q(is_deleted=False), name='pr_treat_hub_desc_idx'),
+            models.Index(fields=['hub_id', 'diagnosis_preview', 'id'], condition=Q(is_deleted=False), name='pr_treat_hub_diag_idx'),
+            models.Index(fields=['hub_id', 'prescription_preview', 'id'], condition=Q(is_deleted=False), name='pr_treat_hub_presc_idx'),
+            models.Index(fields=['hub_id', 'practitioner_id', 'id'], condition=Q(is_deleted=False), name='pr_treat_hub_pract_idx'),
+            models.Index(fields=['hub_id', 'created_at', 'id'], condition=Q(is_deleted=False), name='pr_treat_hub_created_idx'),
+            models.Index(fields=['patient', '-date', '-id'], condition=Q(is_deleted=False), name='pr_treat_patient_date_idx'),
+            models.Index(fields=['hub_id', 'deleted_at', 'id'], condition=Q(is_deleted=True), name='pr_treat_hub_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.id)
+
+
+class PatientRecordDetail(models.Model):
+    """Long-form clinical text of a ``PatientRecord``, split off its hot row."""
+
+    patient = models.OneToOneField(
+        'PatientRecord', on_delete=models.CASCADE, primary_key=True, related_name='detail',
+    )
+    allergies = models.TextField(blank=True, verbose_name=_('Allergies'))
+    medical_notes = models.TextField(blank=True, verbose_name=_('Medical Notes'))
+
+    class Meta:
+        db_table = 'patient_records_patientrecorddetail'
+
+    def __str__(self):
+        return str(self.pk)
+
+
+class TreatmentDetail(models.Model):
+    """Long-form clinical text of a ``Treatment``, split off its hot row."""
+
+    treatment = models.OneToOneField(
+        'Treatment', on_delete=models.CASCADE, primary_key=True, related_name='detail',
+    )
     description = models.TextField(verbose_name=_('Description'))
     diagnosis = models.TextField(blank=True, verbose_name=_('Diagnosis'))
     prescription = models.TextField(blank=True, verbose_name=_('Prescription'))
-    practitioner_id = models.UUIDField(null=True, blank=True, verbose_name=_('Practitioner Id'))
     notes = models.TextField(blank=True, verbose_name=_('Notes'))
 
+    class Meta:
+        db_table = 'patient_records_treatmentdetail'
+
+    def __str__(self):
+        return str(self.pk)
+
+
+class TreatmentDailyStat(models.Model):
+    """Live treatments per hub, day and practitioner; maintained by ``rollups``."""
+
+    hub_id = models.UUIDField(verbose_name=_('Hub Id'))
+    day = models.DateField(verbose_name=_('Day'))
+    # Nil UUID for treatments without a practitioner, so the key stays unique.
+    practitioner_id = models.UUIDField(verbose_name=_('Practitioner Id'))
+    treatment_count = models.IntegerField(default=0, verbose_name=_('Treatment Count'))
+
+    class Meta:
+        db_table = 'patient_records_treatmentdailystat'
+        constraints = [
+            models.UniqueConstraint(fields=['hub_id', 'day', 'practitioner_id'], name='pr_daily_stat_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.practitioner_id}: {self.treatment_count}'
+
+
+class ExportJob(HubBaseModel):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    ]
+    FORMAT_CHOICES = [('csv', 'CSV'), ('excel', 'Excel')]
+
+    resource = models.CharField(max_length=30, verbose_name=_('Resource'))
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, verbose_name=_('Format'))
+    params = models.JSONField(default=dict, blank=True, verbose_name=_('Params'))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name=_('Status'))
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Total Rows'))
+    rows_processed = models.PositiveIntegerField(default=0, verbose_name=_('Rows Processed'))
+    file_path = models.CharField(max_length=500, blank=True, verbose_name=_('File Path'))
+    error = models.TextField(blank=True, verbose_name=_('Error'))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Finished At'))
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Expires At'))
+    # One of the hub's ``MAX_JOBS_PER_HUB`` slots, held while queued or running.
+    slot = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, verbose_name=_('Slot'))
+
     class Meta(HubBaseModel.Meta):
-        db_table = 'patient_records_treatment'
+        db_table = 'patient_records_exportjob'
+        indexes = [
+            models.Index(fields=['hub_id', 'status'], name='pr_exportjob_hub_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hub_id', 'slot'], condition=Q(status__in=['queued', 'running']), name='pr_exportjob_hub_slot',
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.id)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def percent(self):
+        if not self.total_rows:
+            return 100 if self.status == self.DONE else 0
+        return min(100, self.rows_processed * 100 // self.total_rows)
+
+
+class BulkActionJob(HubBaseModel):
+    """A bulk action applied to every row matching a list filter, in chunks."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    ]
+
+    resource = models.CharField(max_length=30, verbose_name=_('Resource'))
+    action = models.CharField(max_length=20, verbose_name=_('Action'))
+    params = models.JSONField(default=dict, blank=True, verbose_name=_('Params'))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name=_('Status'))
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Total Rows'))
+    rows_processed = models.PositiveIntegerField(default=0, verbose_name=_('Rows Processed'))
+    rows_changed = models.PositiveIntegerField(default=0, verbose_name=_('Rows Changed'))
+    error = models.TextField(blank=True, verbose_name=_('Error'))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Finished At'))
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'patient_records_bulkactionjob'
+        indexes = [
+            models.Index(fields=['hub_id', 'status'], name='pr_bulkjob_hub_status_idx'),
+        ]
+        constraints = [
+            # One queued or running job per hub.
+            models.UniqueConstraint(
+                fields=['hub_id'], condition=Q(status__in=['queued', 'running']), name='pr_bulkjob_hub_active',
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.id)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def percent(self):
+        if not self.total_rows:
+            return 100 if self.status == self.DONE else 0
+        return min(100, self.rows_processed * 100 // self.total_rows)
+
+
+class PatientMerge(HubBaseModel):
+    """One merge of ``merged_ids`` into ``survivor``; kept so the merge can be undone."""
+
+    survivor = models.ForeignKey('PatientRecord', on_delete=models.CASCADE, related_name='merges')
+    merged_ids = models.JSONField(default=list, verbose_name=_('Merged Ids'))
+    survivor_allergies = models.TextField(blank=True, verbose_name=_('Survivor Allergies'))
+    survivor_medical_notes = models.TextField(blank=True, verbose_name=_('Survivor Medical Notes'))
+    merged_allergies = models.TextField(blank=True, verbose_name=_('Merged Allergies'))
+    merged_medical_notes = models.TextField(blank=True, verbose_name=_('Merged Medical Notes'))
+    treatments_moved = models.PositiveIntegerField(default=0, verbose_name=_('Treatments Moved'))
+    reversed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Reversed At'))
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'patient_records_patientmerge'
+        indexes = [
+            models.Index(fields=['hub_id', 'created_at'], name='pr_merge_hub_created_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.id)
+
+
+class PatientMergeTreatment(models.Model):
+    """A treatment moved by a merge and the patient it was moved from."""
+
+    merge = models.ForeignKey('PatientMerge', on_delete=models.CASCADE, related_name='moved_treatments')
+    treatment_id = models.UUIDField(verbose_name=_('Treatment Id'))
+    from_patient_id = models.UUIDField(verbose_name=_('From Patient Id'))
+
+    class Meta:
+        db_table = 'patient_records_patientmergetreatment'
+        indexes = [
+            models.Index(fields=['merge', 'treatment_id'], name='pr_merge_treatment_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.treatment_id} <- {self.from_patient_id}'
+
+
+class ArchivedPatientRecord(models.Model):
+    """A patient moved out of the hot table by ``archive``; its columns plus the detail text inline."""
+
+    DELETED = 'deleted'
+    INACTIVE = 'inactive'
+    REASON_CHOICES = [
+        (DELETED, _('Deleted')),
+        (INACTIVE, _('Inactive')),
+    ]
+
+    id = models.UUIDField(primary_key=True)
+    hub_id = models.UUIDField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    created_by = models.UUIDField(null=True, blank=True)
+    updated_by = models.UUIDField(null=True, blank=True)
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    patient_name = models.CharField(max_length=255, verbose_name=_('Patient Name'))
+    date_of_birth = models.DateField(null=True, blank=True, verbose_name=_('Date Of Birth'))
+    gender = models.CharField(max_length=20, blank=True, verbose_name=_('Gender'))
+    blood_type = models.CharField(max_length=5, blank=True, verbose_name=_('Blood Type'))
+    allergies = models.TextField(blank=True, verbose_name=_('Allergies'))
+    medical_notes = models.TextField(blank=True, verbose_name=_('Medical Notes'))
+    is_active = models.BooleanField(default=True, verbose_name=_('Is Active'))
+    name_key = models.CharField(max_length=255, blank=True)
+    phonetic_key = models.CharField(max_length=64, blank=True)
+    visit_count = models.PositiveIntegerField(default=0)
+    last_visit_date = models.DateField(null=True, blank=True, verbose_name=_('Last Visit Date'))
+    archived_at = models.DateTimeField(verbose_name=_('Archived At'))
+    archive_reason = models.CharField(max_length=10, choices=REASON_CHOICES, verbose_name=_('Reason'))
+
+    class Meta:
+        db_table = 'patient_records_archivedpatientrecord'
+        indexes = [
+            models.Index(fields=['hub_id', 'patient_name'], name='pr_arch_patient_hub_name_idx'),
+            models.Index(fields=['hub_id', 'archived_at'], name='pr_arch_patient_hub_arch_idx'),
+            models.Index(fields=['hub_id', 'deleted_at', 'id'], condition=Q(is_deleted=True), name='pr_arch_patient_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return self.patient_name
+
+
+class ArchivedTreatment(models.Model):
+    """A treatment moved out of the hot table by ``archive``; its columns plus the detail text inline."""
+
+    id = models.UUIDField(primary_key=True)
+    hub_id = models.UUIDField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    created_by = models.UUIDField(null=True, blank=True)
+    updated_by = models.UUIDField(null=True, blank=True)
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # Not a foreign key: the patient may be live or archived.
+    patient_id = models.UUIDField(verbose_name=_('Patient Id'))
+    date = models.DateField(verbose_name=_('Date'))
+    description = models.TextField(verbose_name=_('Description'))
+    diagnosis = models.TextField(blank=True, verbose_name=_('Diagnosis'))
+    prescription = models.TextField(blank=True, verbose_name=_('Prescription'))
+    practitioner_id = models.UUIDField(null=True, blank=True, verbose_name=_('Practitioner Id'))
+    notes = models.TextField(blank=True, verbose_name=_('Notes'))
+    archived_at = models.DateTimeField(verbose_name=_('Archived At'))
+
+    class Meta:
+        db_table = 'patient_records_archivedtreatment'
+        indexes = [
+            models.Index(fields=['hub_id', 'patient_id'], name='pr_arch_treat_hub_patient_idx'),
+            models.Index(fields=['hub_id', 'deleted_at', 'id'], condition=Q(is_deleted=True), name='pr_arch_treat_deleted_idx'),
+        ]
 
     def __str__(self):
         return str(self.id)
 
+
+class PatientRecordsSettings(HubBaseModel):
+    """Per-hub settings of the module, edited on the settings page."""
+
+    # Soft-deleted rows older than this are hard-deleted by ``retention``; empty keeps them forever.
+    retention_days = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Retention Days'))
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'patient_records_settings'
+
+    def __str__(self):
+        return str(self.hub_id)
+
+    @classmethod
+    def for_hub(cls, hub_id):
+        obj = cls.objects.filter(hub_id=hub_id).first()
+        return obj or cls(hub_id=hub_id)
@@ -0,0 +1,53 @@
+"""
+Name normalisation and blocking keys for duplicate patient detection.
+
+``name_key`` folds case, accents, punctuation and word order, so
+"García, Ana" and "ana garcia" share a key. ``phonetic_key`` is the sorted
+Soundex codes of the name's words, so spelling variants such as "Ana
+Garcia" and "Anna Garsia" land in the same block. Both are stored on
+``PatientRecord`` and indexed per hub.
+"""
+import re
+import unicodedata
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+PHONETIC_KEY_LENGTH = 64
+
+
+def name_tokens(name):
+    """Lowercase ASCII word tokens of ``name``."""
+    folded = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii')
+    return re.findall(r'[a-z0-9]+', folded.lower())
+
+
+def name_key(name):
+    return ' '.join(sorted(name_tokens(name)))[:255]
+
+
+def soundex(token):
+    """American Soundex code of one token (digits are kept as-is)."""
+    if not token or not token[0].isalpha():
+        return token[:4]
+    code = token[0].upper()
+    previous = SOUNDEX_CODES.get(token[0], '')
+    for char in token[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def phonetic_key(name):
+    return ' '.join(sorted(soundex(token) for token in name_tokens(name)))[:PHONETIC_KEY_LENGTH]
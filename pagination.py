@@ -0,0 +1,205 @@
+"""
+Pagination helpers for the Patient Records datatables.
+
+``paginate_offset`` is the classic numbered paginator. ``paginate_keyset``
+is the opt-in cursor mode: rows are ordered by ``(sort column, id)`` and the
+last/first row of a page is encoded into an opaque ``cursor`` token, so a page
+costs one indexed range scan no matter how deep it is and no ``COUNT(*)`` is
+issued.
+"""
+import base64
+import binascii
+import datetime
+import json
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+
+class CountedPaginator(Paginator):
+    """A ``Paginator`` whose row count is supplied instead of queried."""
+
+    def __init__(self, object_list, per_page, count, approximate=False):
+        super().__init__(object_list, per_page)
+        self._count = count
+        self.approximate = approximate
+
+    @cached_property
+    def count(self):
+        return self._count
+
+
+def paginate_offset(qs, per_page, page_number, count=None, approximate=False):
+    """Numbered page of ``per_page`` rows.
+
+    A known ``count`` (see ``counting.list_count``) replaces the paginator's
+    own ``COUNT(*)``. ``page.page_links`` holds the elided page numbers to
+    render.
+    """
+    if count is None:
+        paginator = Paginator(qs, per_page)
+    else:
+        paginator = CountedPaginator(qs, per_page, count, approximate)
+    page = paginator.get_page(page_number)
+    page.page_links = list(paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1))
+    return page
+
+
+class CursorPage:
+    """One keyset page plus the tokens for its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _serialize(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(sort_key, sort_dir, value, pk, direction):
+    payload = json.dumps(
+        {'s': sort_key, 'd': sort_dir, 'v': _serialize(value), 'k': str(pk), 'p': direction},
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the cursor payload dict, or ``None`` for a missing/malformed token."""
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(payload, dict) or not {'s', 'd', 'v', 'k', 'p'} <= payload.keys():
+        return None
+    return payload
+
+
+def _ordering(column, descending):
+    if descending:
+        return [F(column).desc(), F('id').desc()]
+    return [F(column).asc(), F('id').asc()]
+
+
+def _after(column, value, pk, descending, nulls_last):
+    """Rows strictly after ``(value, pk)`` in the ``(column, id)`` ordering."""
+    op = 'lt' if descending else 'gt'
+    tail = Q(**{f'id__{op}': pk})
+    if value is None:
+        condition = Q(**{f'{column}__isnull': True}) & tail
+        if not nulls_last:
+            condition |= Q(**{f'{column}__isnull': False})
+        return condition
+    condition = Q(**{f'{column}__{op}': value}) | (Q(**{column: value}) & tail)
+    if nulls_last:
+        condition |= Q(**{f'{column}__isnull': True})
+    return condition
+
+
+def _field(model, column):
+    """The model field ``column`` names, following ``__`` relations."""
+    *relations, name = column.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _value(row, column):
+    value = row
+    for name in column.split('__'):
+        value = getattr(value, name, None)
+    return value
+
+
+def _position(payload, model, column, sort_key, sort_dir):
+    """``(value, pk, backwards)`` from a cursor payload, or ``None`` if it is unusable.
+
+    The whole payload is checked before any of it is trusted: a cursor for
+    another sort, an unknown direction or a value the column cannot hold
+    restarts from the first page.
+    """
+    if not payload or payload['s'] != sort_key or payload['d'] != sort_dir:
+        return None
+    if payload['p'] not in ('next', 'prev'):
+        return None
+    try:
+        value = _field(model, column).to_python(payload['v']) if payload['v'] is not None else None
+        pk = model._meta.pk.to_python(payload['k'])
+    except (ValidationError, TypeError, ValueError):
+        return None
+    if pk is None:
+        return None
+    return value, pk, payload['p'] == 'prev'
+
+
+def paginate_keyset(qs, column, sort_key, sort_dir, cursor, per_page):
+    """Return a ``CursorPage`` of ``qs`` ordered by ``column`` then ``id``.
+
+    ``qs`` must not be ordered yet; it may be a ``values()`` queryset as long
+    as ``id`` and ``column`` are among its fields. ``column`` may follow a
+    relation (``patient__patient_name``). ``sort_key`` is the public
+    sort name the cursor is bound to; a cursor issued for another sort is
+    ignored.
+    """
+    position = _position(decode_cursor(cursor), qs.model, column, sort_key, sort_dir)
+
+    descending = sort_dir == 'desc'
+    backwards = position is not None and position[2]
+    scan_descending = descending != backwards
+    # NULLs sort as the largest value on PostgreSQL and the smallest on SQLite.
+    nulls_last = connection.features.nulls_order_largest != scan_descending
+
+    qs = qs.order_by(*_ordering(column, scan_descending))
+    if position is not None:
+        value, pk, _ = position
+        qs = qs.filter(_after(column, value, pk, scan_descending, nulls_last))
+
+    rows = list(qs[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return CursorPage(rows)
+
+    def token(row, direction):
+        if isinstance(row, dict):
+            return encode_cursor(sort_key, sort_dir, row[column], row['id'], direction)
+        return encode_cursor(sort_key, sort_dir, _value(row, column), row.pk, direction)
+
+    has_next = has_more if not backwards else True
+    has_previous = position is not None if not backwards else has_more
+    return CursorPage(
+        rows,
+        next_cursor=token(rows[-1], 'next') if has_next else None,
+        previous_cursor=token(rows[0], 'prev') if has_previous else None,
+    )
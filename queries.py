@@ -0,0 +1,93 @@
+"""
+List querysets for the Patient Records datatables.
+
+Each datatable loads only the columns its rows render (plus its sort
+columns). Clinical text lives in the detail tables and is not read here:
+rows render, and sort on, the short ``*_preview`` columns. The treatment
+list joins the patient name instead of issuing one query per row.
+``updated_at`` is loaded for the row fragment cache key. Views, exports and
+jobs share these builders so search and sort behave identically everywhere.
+
+Every sort ends with ``pk`` so equal values keep a stable order across pages.
+Without a chosen sort, a search is ordered by relevance and a plain list by
+its default sort and direction (newest treatments first). Sorting treatments
+by patient name joins the patient table and cannot be served by an index, so
+it is only used when picked explicitly.
+"""
+from .models import PatientRecord, Treatment
+from .search import get_search_backend
+
+PATIENT_RECORD_SORT_FIELDS = {
+    'is_active': 'is_active',
+    'patient_name': 'patient_name',
+    'date_of_birth': 'date_of_birth',
+    'gender': 'gender',
+    'blood_type': 'blood_type',
+    'allergies': 'allergies_preview',
+    'created_at': 'created_at',
+}
+PATIENT_RECORD_DEFAULT_SORT = 'is_active'
+PATIENT_RECORD_DEFAULT_DIR = 'asc'
+
+PATIENT_RECORD_LIST_FIELDS = (
+    'id', 'hub_id', 'is_active', 'patient_name', 'date_of_birth',
+    'gender', 'blood_type', 'allergies_preview', 'created_at', 'updated_at',
+)
+
+TREATMENT_SORT_FIELDS = {
+    'patient': 'patient__patient_name',
+    'date': 'date',
+    'description': 'description_preview',
+    'diagnosis': 'diagnosis_preview',
+    'prescription': 'prescription_preview',
+    'practitioner_id': 'practitioner_id',
+    'created_at': 'created_at',
+}
+TREATMENT_DEFAULT_SORT = 'date'
+TREATMENT_DEFAULT_DIR = 'desc'
+
+TREATMENT_LIST_FIELDS = (
+    'id', 'hub_id', 'patient', 'date', 'description_preview', 'diagnosis_preview',
+    'prescription_preview', 'practitioner_id', 'created_at', 'updated_at', 'patient__patient_name',
+)
+
+
+def resolve_sort(sort_fields, default_sort, default_dir, sort_field, sort_dir):
+    """``(sort key, direction)`` to apply: the chosen sort, else the default one."""
+    if sort_field in sort_fields:
+        return sort_field, sort_dir
+    return default_sort, default_dir
+
+
+def _ordered(qs, sort_fields, default_sort, default_dir, search_query, sort_field, sort_dir):
+    if sort_field not in sort_fields and search_query:
+        return qs.order_by('-search_rank', 'pk')
+    sort_field, sort_dir = resolve_sort(sort_fields, default_sort, default_dir, sort_field, sort_dir)
+    order_by = sort_fields[sort_field]
+    if sort_dir == 'desc':
+        return qs.order_by(f'-{order_by}', '-pk')
+    return qs.order_by(order_by, 'pk')
+
+
+def patient_records_queryset(hub_id, search_query='', sort_field='', sort_dir='asc'):
+    qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False).only(*PATIENT_RECORD_LIST_FIELDS)
+    if search_query:
+        qs = get_search_backend().search(qs, search_query)
+    return _ordered(
+        qs, PATIENT_RECORD_SORT_FIELDS, PATIENT_RECORD_DEFAULT_SORT, PATIENT_RECORD_DEFAULT_DIR,
+        search_query, sort_field, sort_dir,
+    )
+
+
+def treatments_queryset(hub_id, search_query='', sort_field='', sort_dir='asc'):
+    qs = (
+        Treatment.objects.filter(hub_id=hub_id, is_deleted=False)
+        .select_related('patient')
+        .only(*TREATMENT_LIST_FIELDS)
+    )
+    if search_query:
+        qs = get_search_backend().search(qs, search_query)
+    return _ordered(
+        qs, TREATMENT_SORT_FIELDS, TREATMENT_DEFAULT_SORT, TREATMENT_DEFAULT_DIR,
+        search_query, sort_field, sort_dir,
+    )
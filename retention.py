@@ -0,0 +1,123 @@
+"""
+Retention policy: hard-delete soft-deleted rows once they are old enough.
+
+A hub's ``PatientRecordsSettings.retention_days`` sets how long soft-deleted
+patients and treatments are kept (empty keeps them forever). ``purge_hub``
+removes rows whose ``deleted_at`` is older than that, from the hot tables
+and from the archive, walking ``(deleted_at, id)`` keyset batches of
+``PURGE_BATCH_SIZE`` on the ``*_deleted_idx`` partial indexes. Each batch is
+one short ``DELETE`` transaction, followed by a ``PURGE_PAUSE`` sleep so
+the purge never holds locks for long or starves other writers.
+
+Treatments go first. A deleted patient is kept while it still has
+treatments in the hot table (its live visits stay visible) and while a
+merge refers to it. A purged patient, live or archived, takes its
+archived treatments with it. Only deleted rows are removed, so counters,
+rollups and visit summaries do not change.
+
+``dry_run=True`` walks the same batches and reports what would be removed
+without deleting anything.
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import search
+from .archive import delete_rows, protected_patient_ids
+from .models import ArchivedPatientRecord, ArchivedTreatment, PatientRecord, PatientRecordsSettings, Treatment
+
+PURGE_BATCH_SIZE = 500
+PURGE_PAUSE = 0.5
+MIN_RETENTION_DAYS = 30
+
+
+def _batches(qs, batch_size):
+    """Yield lists of ``(pk, deleted_at)`` in ``(deleted_at, pk)`` keyset order."""
+    qs = qs.order_by('deleted_at', 'pk')
+    last = None
+    while True:
+        chunk = qs
+        if last is not None:
+            chunk = qs.filter(Q(deleted_at__gt=last[1]) | Q(deleted_at=last[1], pk__gt=last[0]))
+        rows = list(chunk.values_list('pk', 'deleted_at')[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]
+
+
+def _purge(qs, model, batch_size, pause, dry_run, cascade=None):
+    """Hard-delete every row of ``qs`` batch by batch; returns ``(rows, cascaded rows)``."""
+    removed = cascaded = 0
+    for index, rows in enumerate(_batches(qs, batch_size)):
+        ids = [pk for pk, _deleted_at in rows]
+        if index and pause and not dry_run:
+            time.sleep(pause)
+        if cascade is not None:
+            dependent_ids = list(cascade(ids))
+            cascaded += len(dependent_ids)
+        removed += len(ids)
+        if dry_run:
+            continue
+        with transaction.atomic():
+            if cascade is not None and dependent_ids:
+                search.remove_records(ArchivedTreatment, dependent_ids)
+                delete_rows(ArchivedTreatment, dependent_ids)
+            search.remove_records(model, ids)
+            delete_rows(model, ids)
+    return removed, cascaded
+
+
+def purge_hub(hub_id, retention_days, dry_run=False, now=None, batch_size=PURGE_BATCH_SIZE, pause=PURGE_PAUSE):
+    """Hard-delete ``hub_id``'s rows soft-deleted more than ``retention_days`` ago.
+
+    Returns ``{table: rows}`` removed (or, with ``dry_run``, that would be).
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    expired = {'hub_id': hub_id, 'is_deleted': True, 'deleted_at__lt': cutoff}
+    report = {}
+
+    def archived_treatments(patient_ids):
+        # Archived treatments of purged patients go with them; expired ones are left to (and
+        # counted by) the archived treatment pass.
+        return ArchivedTreatment.objects.filter(patient_id__in=patient_ids).exclude(
+            is_deleted=True, deleted_at__lt=cutoff,
+        ).values_list('pk', flat=True)
+
+    report['treatments'], _ = _purge(
+        Treatment.all_objects.filter(**expired), Treatment, batch_size, pause, dry_run,
+    )
+    # Any treatment left after the pass above (live, or deleted too recently) keeps its patient.
+    remaining = Treatment.all_objects.filter(
+        Q(is_deleted=False) | Q(deleted_at__isnull=True) | Q(deleted_at__gte=cutoff), patient=OuterRef('pk'),
+    )
+    patients = PatientRecord.all_objects.filter(**expired).exclude(
+        pk__in=protected_patient_ids(hub_id),
+    ).filter(~Exists(remaining))
+    report['patient_records'], cascaded = _purge(
+        patients, PatientRecord, batch_size, pause, dry_run, cascade=archived_treatments,
+    )
+
+    report['archived_treatments'], _ = _purge(
+        ArchivedTreatment.objects.filter(**expired), ArchivedTreatment, batch_size, pause, dry_run,
+    )
+    report['archived_patient_records'], archived_cascaded = _purge(
+        ArchivedPatientRecord.objects.filter(**expired), ArchivedPatientRecord, batch_size, pause, dry_run,
+        cascade=archived_treatments,
+    )
+    report['archived_treatments'] += cascaded + archived_cascaded
+    return report
+
+
+def purge_all(dry_run=False, now=None, batch_size=PURGE_BATCH_SIZE, pause=PURGE_PAUSE):
+    """Apply every hub's retention policy; returns ``{hub_id: report}`` for hubs that have one."""
+    reports = {}
+    policies = PatientRecordsSettings.objects.filter(retention_days__isnull=False).values_list(
+        'hub_id', 'retention_days',
+    )
+    for hub_id, retention_days in policies:
+        reports[hub_id] = purge_hub(hub_id, retention_days, dry_run, now, batch_size, pause)
+    return reports
@@ -0,0 +1,160 @@
+"""
+Pre-aggregated treatment activity for the dashboard charts.
+
+``TreatmentDailyStat`` holds the number of live treatments per
+``(hub_id, day, practitioner_id)``. It is adjusted inside the writing
+transaction by the save/delete signals and by bulk write paths (see
+``apply``), so dashboard queries scan one row per day and practitioner in the
+requested range instead of the treatment table. ``rebuild`` recomputes a
+hub from scratch (``rebuild_treatment_rollups`` command).
+"""
+import datetime
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from . import generations
+from .models import Treatment, TreatmentDailyStat
+
+UNASSIGNED = uuid.UUID(int=0)
+
+
+def _practitioner(value):
+    if not value:
+        return UNASSIGNED
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return UNASSIGNED
+
+
+def _day(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, str):
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+def apply(hub_id, deltas):
+    """Add ``{(day, practitioner_id): delta}`` to the rollup rows of ``hub_id``."""
+    for (day, practitioner_id), delta in deltas.items():
+        day, practitioner_id = _day(day), _practitioner(practitioner_id)
+        if not delta or hub_id is None or day is None:
+            continue
+        key = {'hub_id': hub_id, 'day': day, 'practitioner_id': practitioner_id}
+        updated = TreatmentDailyStat.objects.filter(**key).update(treatment_count=F('treatment_count') + delta)
+        if updated or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                TreatmentDailyStat.objects.create(treatment_count=delta, **key)
+        except IntegrityError:
+            # Created concurrently; add to that row instead.
+            TreatmentDailyStat.objects.filter(**key).update(treatment_count=F('treatment_count') + delta)
+
+
+def treatment_deltas(instance, created=False, deleted=False):
+    """Rollup changes caused by saving (or hard-deleting) ``instance``.
+
+    Returns ``{(day, practitioner_id): delta}``, or ``None`` when the previous
+    state is unknown. The ``pre_save`` signal loads deferred tracked fields, so
+    that only happens if the row was removed before the save.
+    """
+    current = (_day(instance.date), _practitioner(instance.practitioner_id))
+    live = not instance.is_deleted
+    if created:
+        return {current: 1} if live else {}
+    if deleted:
+        return {current: -1} if live else {}
+    if not all(instance.is_tracked(field) for field in ('is_deleted', 'date', 'practitioner_id')):
+        return None
+    before = (_day(instance.loaded_value('date')), _practitioner(instance.loaded_value('practitioner_id')))
+    was_live = not instance.loaded_value('is_deleted')
+    deltas = {}
+    if was_live:
+        deltas[before] = deltas.get(before, 0) - 1
+    if live:
+        deltas[current] = deltas.get(current, 0) + 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def queryset_deltas(qs):
+    """Rollup changes for removing every live treatment in ``qs``; call before the update."""
+    rows = qs.filter(is_deleted=False).values('date', 'practitioner_id').annotate(total=Count('id')).order_by()
+    deltas = {}
+    for row in rows:
+        key = (row['date'], _practitioner(row['practitioner_id']))
+        deltas[key] = deltas.get(key, 0) - row['total']
+    return deltas
+
+
+def rebuild(hub_id):
+    """Recompute every rollup row for ``hub_id`` from the treatment table."""
+    rows = (
+        Treatment.objects.filter(hub_id=hub_id, is_deleted=False)
+        .values('date', 'practitioner_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    buckets = {}
+    for row in rows.iterator():
+        key = (row['date'], _practitioner(row['practitioner_id']))
+        buckets[key] = buckets.get(key, 0) + row['total']
+    with transaction.atomic():
+        TreatmentDailyStat.objects.filter(hub_id=hub_id).delete()
+        TreatmentDailyStat.objects.bulk_create(
+            [
+                TreatmentDailyStat(hub_id=hub_id, day=day, practitioner_id=practitioner_id, treatment_count=total)
+                for (day, practitioner_id), total in buckets.items()
+            ],
+            batch_size=1000,
+        )
+        generations.bump(hub_id)
+    return len(buckets)
+
+
+def _range(hub_id, start, end):
+    return TreatmentDailyStat.objects.filter(hub_id=hub_id, day__gte=start, day__lte=end)
+
+
+def daily_series(hub_id, start, end):
+    """``[(day, treatments)]`` for every day in ``start..end``, zero-filled."""
+    totals = dict(_range(hub_id, start, end).values('day').annotate(total=Sum('treatment_count')).values_list('day', 'total'))
+    days = (end - start).days + 1
+    return [(day, totals.get(day, 0)) for day in (start + datetime.timedelta(n) for n in range(days))]
+
+
+def monthly_series(hub_id, start, end):
+    """``[(first day of month, treatments)]`` for every month in ``start..end``, zero-filled."""
+    rows = (
+        _range(hub_id, start, end)
+        .annotate(month=TruncMonth('day'))
+        .values('month')
+        .annotate(total=Sum('treatment_count'))
+        .values_list('month', 'total')
+    )
+    totals = {_day(month): total for month, total in rows}
+    series = []
+    month = start.replace(day=1)
+    while month <= end:
+        series.append((month, totals.get(month, 0)))
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+    return series
+
+
+def practitioner_totals(hub_id, start, end, limit=10):
+    """``[(practitioner_id or None, treatments)]`` ordered by volume."""
+    rows = (
+        _range(hub_id, start, end)
+        .values('practitioner_id')
+        .annotate(total=Sum('treatment_count'))
+        .filter(total__gt=0)
+        .order_by('-total')[:limit]
+    )
+    return [(None if row['practitioner_id'] == UNASSIGNED else row['practitioner_id'], row['total']) for row in rows]
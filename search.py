@@ -0,0 +1,241 @@
+"""
+Full-text search backends for the Patient Records datatables.
+
+PostgreSQL keeps a GIN-indexed ``search_vector`` tsvector column on each
+table (plus a trigram index on ``patient_name`` for partial names); SQLite
+keeps an FTS5 table per model whose rowid comes from a ``{table}_fts_keys``
+map of row ids (see ``0017_search_fts_keys``). Both are created by migration
+``0003_search_index`` and kept current through
+``index_records`` / ``remove_records``, which the save signals and the bulk
+write paths call. Text kept in a detail table (``details``) is read through
+the record's detail row.
+
+Use ``get_search_backend()`` rather than instantiating a backend directly;
+``settings.PATIENT_RECORDS_SEARCH_BACKEND`` may point to a custom class.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from . import details
+from .models import ArchivedPatientRecord, ArchivedTreatment, PatientRecord, Treatment
+
+# Searchable columns per model with their PostgreSQL rank weight.
+SEARCH_FIELDS = {
+    PatientRecord: [('patient_name', 'A'), ('allergies', 'B'), ('gender', 'C'), ('blood_type', 'C')],
+    Treatment: [('description', 'A'), ('diagnosis', 'B'), ('prescription', 'C'), ('notes', 'C')],
+}
+# Archive tables (migration ``0010_archive``) are indexed the same way.
+SEARCH_FIELDS[ArchivedPatientRecord] = SEARCH_FIELDS[PatientRecord]
+SEARCH_FIELDS[ArchivedTreatment] = SEARCH_FIELDS[Treatment]
+
+# Columns that also get substring (trigram) matching for partial names.
+TRIGRAM_FIELDS = {
+    PatientRecord: 'patient_name',
+}
+
+# bm25() column weights used by SQLite for each PostgreSQL weight class.
+BM25_WEIGHTS = {'A': 10.0, 'B': 5.0, 'C': 1.0}
+
+MAX_TERMS = 8
+ID_BATCH_SIZE = 500
+
+
+def search_terms(query):
+    """Split a free-text query into lowercase word tokens."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _chunks(items, size=ID_BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BaseSearchBackend:
+    """Interface shared by all search backends."""
+
+    def search(self, qs, query):
+        """Restrict ``qs`` to rows matching ``query`` and alias ``search_rank`` (higher is better)."""
+        raise NotImplementedError
+
+    def index_records(self, model, ids):
+        """(Re)index the rows of ``model`` with the given primary keys."""
+
+    def remove_records(self, model, ids):
+        """Drop index entries for rows about to be hard-deleted."""
+
+    def rebuild(self, model):
+        """Reindex every row of ``model``."""
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """Unindexed fallback for databases without a native full-text engine."""
+
+    def search(self, qs, query):
+        condition = Q()
+        for field, _weight in SEARCH_FIELDS[qs.model]:
+            condition |= Q(**{f'{details.lookup(qs.model, field)}__icontains': query})
+        return qs.filter(condition).alias(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector + GIN search with a pg_trgm fallback for partial names."""
+
+    def _vector_sql(self, model):
+        return ' || '.join(
+            f"setweight(to_tsvector('simple', coalesce({details.column_sql(model, field)}, '')), '{weight}')"
+            for field, weight in SEARCH_FIELDS[model]
+        )
+
+    def search(self, qs, query):
+        terms = search_terms(query)
+        if not terms:
+            return IContainsSearchBackend().search(qs, query)
+        qn = connection.ops.quote_name
+        table = qn(qs.model._meta.db_table)
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        condition = f"{table}.search_vector @@ to_tsquery('simple', %s)"
+        condition_params = [tsquery]
+        rank = f"ts_rank({table}.search_vector, to_tsquery('simple', %s))"
+        rank_params = [tsquery]
+        trigram_field = TRIGRAM_FIELDS.get(qs.model)
+        if trigram_field:
+            column = f'{table}.{qn(trigram_field)}'
+            like = '%' + re.sub(r'([\\%_])', r'\\\1', query) + '%'
+            condition = f'({condition} OR {column} ILIKE %s)'
+            condition_params.append(like)
+            rank = f'{rank} + similarity({column}, %s)'
+            rank_params.append(query)
+        return qs.filter(
+            RawSQL(condition, condition_params, output_field=BooleanField()),
+        ).alias(search_rank=RawSQL(rank, rank_params, output_field=FloatField()))
+
+    def index_records(self, model, ids):
+        table = connection.ops.quote_name(model._meta.db_table)
+        sql = f'UPDATE {table} SET search_vector = {self._vector_sql(model)} WHERE id = ANY(%s::uuid[])'
+        with connection.cursor() as cursor:
+            for chunk in _chunks(str(pk) for pk in ids):
+                cursor.execute(sql, [chunk])
+
+    def rebuild(self, model):
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {table} SET search_vector = {self._vector_sql(model)}')
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 search keyed on rowid through a ``{table}_fts_keys`` map.
+
+    The map gives each source ``id`` a stable integer that is the FTS rowid,
+    so index updates are rowid seeks and survive table remakes and ``VACUUM``
+    (which renumber the source table's own rowids). A search runs ``MATCH``
+    once, joined to the source rows, and ranks with ``bm25`` in the same query.
+    """
+
+    def _fts_table(self, model):
+        return f'{model._meta.db_table}_fts'
+
+    def _keys_table(self, model):
+        return f'{model._meta.db_table}_fts_keys'
+
+    def _columns(self, model):
+        return ', '.join(connection.ops.quote_name(field) for field, _weight in SEARCH_FIELDS[model])
+
+    def _select_columns(self, model):
+        return ', '.join(details.column_sql(model, field) for field, _weight in SEARCH_FIELDS[model])
+
+    def _bm25(self, model):
+        fts = connection.ops.quote_name(self._fts_table(model))
+        weights = ', '.join(str(BM25_WEIGHTS[weight]) for _field, weight in SEARCH_FIELDS[model])
+        return f'bm25({fts}, {weights})'
+
+    def _db_ids(self, model, ids):
+        return [model._meta.pk.get_db_prep_value(pk, connection) for pk in ids]
+
+    def search(self, qs, query):
+        terms = search_terms(query)
+        if not terms:
+            return IContainsSearchBackend().search(qs, query)
+        qn = connection.ops.quote_name
+        table = qn(qs.model._meta.db_table)
+        fts, keys = self._fts_table(qs.model), self._keys_table(qs.model)
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return qs.extra(
+            tables=[keys, fts],
+            where=[f'{qn(keys)}.id = {table}.id', f'{qn(fts)}.rowid = {qn(keys)}.rowid', f'{qn(fts)} MATCH %s'],
+            params=[match],
+        ).alias(search_rank=RawSQL(f'-{self._bm25(qs.model)}', [], output_field=FloatField()))
+
+    def _delete(self, cursor, model, placeholders, chunk):
+        fts, keys = (connection.ops.quote_name(name) for name in (self._fts_table(model), self._keys_table(model)))
+        cursor.execute(f'DELETE FROM {fts} WHERE rowid IN (SELECT rowid FROM {keys} WHERE id IN ({placeholders}))', chunk)
+
+    def index_records(self, model, ids):
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        fts, keys = qn(self._fts_table(model)), qn(self._keys_table(model))
+        columns = self._columns(model)
+        with connection.cursor() as cursor:
+            for chunk in _chunks(self._db_ids(model, ids)):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                self._delete(cursor, model, placeholders, chunk)
+                cursor.execute(
+                    f'INSERT OR IGNORE INTO {keys} (id) SELECT id FROM {table} WHERE id IN ({placeholders})', chunk,
+                )
+                cursor.execute(
+                    f'INSERT INTO {fts} (rowid, {columns}) '
+                    f'SELECT {keys}.rowid, {self._select_columns(model)} FROM {table} '
+                    f'JOIN {keys} ON {keys}.id = {table}.id WHERE {table}.id IN ({placeholders})',
+                    chunk,
+                )
+
+    def remove_records(self, model, ids):
+        keys = connection.ops.quote_name(self._keys_table(model))
+        with connection.cursor() as cursor:
+            for chunk in _chunks(self._db_ids(model, ids)):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                self._delete(cursor, model, placeholders, chunk)
+                cursor.execute(f'DELETE FROM {keys} WHERE id IN ({placeholders})', chunk)
+
+    def rebuild(self, model):
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        fts, keys = qn(self._fts_table(model)), qn(self._keys_table(model))
+        columns = self._columns(model)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {fts}')
+            cursor.execute(f'DELETE FROM {keys}')
+            cursor.execute(f'INSERT INTO {keys} (id) SELECT id FROM {table}')
+            cursor.execute(
+                f'INSERT INTO {fts} (rowid, {columns}) SELECT {keys}.rowid, {self._select_columns(model)} '
+                f'FROM {table} JOIN {keys} ON {keys}.id = {table}.id'
+            )
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the search backend for the default database connection."""
+    custom = getattr(settings, 'PATIENT_RECORDS_SEARCH_BACKEND', None)
+    if custom:
+        return import_string(custom)()
+    return BACKENDS.get(connection.vendor, IContainsSearchBackend)()
+
+
+def index_records(model, ids):
+    if ids:
+        get_search_backend().index_records(model, ids)
+
+
+def remove_records(model, ids):
+    if ids:
+        get_search_backend().remove_records(model, ids)
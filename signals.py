@@ -0,0 +1,71 @@
+"""
+Signal handlers that keep derived data in sync with PatientRecord / Treatment.
+
+Bulk write paths (``QuerySet.update`` / ``bulk_create``) do not send these
+signals and must call the same helpers explicitly.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import generations, rollups, search, stats, visits
+from .models import PatientRecord, Treatment
+
+
+def _refresh_visits(instance, patient_ids):
+    if patient_ids is None:
+        patient_ids = {instance.patient_id}
+    visits.refresh(patient_ids)
+
+
+def _touches(instance, update_fields, model):
+    if update_fields is None:
+        return True
+    # Detail text is saved alongside the row but is not in ``update_fields``.
+    fields = {*update_fields, *getattr(instance, 'saved_detail_fields', ())}
+    return any(field in fields for field, _weight in search.SEARCH_FIELDS[model])
+
+
+@receiver(pre_save, sender=PatientRecord)
+@receiver(pre_save, sender=Treatment)
+def record_saving(sender, instance, raw=False, **kwargs):
+    # Deltas need the stored values of deferred tracked fields; one pk lookup
+    # is far cheaper than recomputing the hub's counters or rollups.
+    if not raw:
+        instance.load_missing_tracking()
+
+
+@receiver(post_save, sender=PatientRecord)
+@receiver(post_save, sender=Treatment)
+def record_saved(sender, instance, created, update_fields=None, **kwargs):
+    if _touches(instance, update_fields, sender):
+        search.index_records(sender, [instance.pk])
+
+    deltas = stats.counter_deltas(instance, created=created)
+    if deltas is None:
+        stats.invalidate(instance.hub_id)
+    else:
+        stats.apply_deltas(instance.hub_id, deltas)
+
+    if sender is Treatment:
+        # ``None`` only if the row vanished before the save; nothing to move.
+        rollups.apply(instance.hub_id, rollups.treatment_deltas(instance, created=created) or {})
+        _refresh_visits(instance, visits.treatment_patients(instance, created=created))
+
+    generations.bump(instance.hub_id)
+    instance.reset_tracking()
+
+
+@receiver(pre_delete, sender=PatientRecord)
+@receiver(pre_delete, sender=Treatment)
+def record_deleting(sender, instance, **kwargs):
+    search.remove_records(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=PatientRecord)
+@receiver(post_delete, sender=Treatment)
+def record_deleted(sender, instance, **kwargs):
+    stats.apply_deltas(instance.hub_id, stats.counter_deltas(instance, deleted=True))
+    if sender is Treatment:
+        rollups.apply(instance.hub_id, rollups.treatment_deltas(instance, deleted=True))
+        _refresh_visits(instance, visits.treatment_patients(instance, deleted=True))
+    generations.bump(instance.hub_id)
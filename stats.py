@@ -0,0 +1,104 @@
+"""
+Per-hub dashboard counters kept in the Django cache.
+
+Counters are adjusted incrementally by the save/delete signals and by the
+bulk ``update()`` paths (see ``adjust``). A full recount runs when the
+counters are missing or older than ``RECONCILE_INTERVAL`` seconds, and the
+``reconcile_counters`` command recounts every hub on demand.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import PatientRecord, Treatment
+
+RECONCILE_INTERVAL = 60 * 60
+
+# Counter name -> (model, extra filter on live rows).
+COUNTERS = {
+    'patient_records': (PatientRecord, {}),
+    'active_patient_records': (PatientRecord, {'is_active': True}),
+    'treatments': (Treatment, {}),
+}
+
+
+def _key(hub_id, name):
+    return f'patient_records:count:{hub_id}:{name}'
+
+
+def _fresh_key(hub_id):
+    return f'patient_records:count:{hub_id}:fresh'
+
+
+def reconcile(hub_id):
+    """Recount every counter for ``hub_id`` and store the result."""
+    counts = {
+        name: model.objects.filter(hub_id=hub_id, is_deleted=False, **filters).count()
+        for name, (model, filters) in COUNTERS.items()
+    }
+    cache.set_many({_key(hub_id, name): value for name, value in counts.items()}, timeout=None)
+    cache.set(_fresh_key(hub_id), True, timeout=RECONCILE_INTERVAL)
+    return counts
+
+
+def get_counts(hub_id):
+    """Return ``{counter: value}`` for ``hub_id`` without touching the tables when cached."""
+    keys = {name: _key(hub_id, name) for name in COUNTERS}
+    if cache.get(_fresh_key(hub_id)):
+        values = cache.get_many(keys.values())
+        if len(values) == len(keys):
+            return {name: values[key] for name, key in keys.items()}
+    return reconcile(hub_id)
+
+
+def invalidate(hub_id):
+    """Force a recount on the next read."""
+    cache.delete(_fresh_key(hub_id))
+
+
+def adjust(hub_id, name, delta):
+    """Add ``delta`` to a counter once the current transaction commits."""
+    if not delta:
+        return
+
+    def apply():
+        try:
+            cache.incr(_key(hub_id, name), delta)
+        except ValueError:
+            # Counter not cached; the next read recounts.
+            invalidate(hub_id)
+
+    transaction.on_commit(apply)
+
+
+def _member(values, filters):
+    return not values['is_deleted'] and all(values[field] == value for field, value in filters.items())
+
+
+def counter_deltas(instance, created=False, deleted=False):
+    """Counter changes caused by saving (or hard-deleting) ``instance``.
+
+    Returns ``{counter: delta}``, or ``None`` when the previous state is
+    unknown (a tracked field was deferred when the row was loaded).
+    """
+    deltas = {}
+    for name, (model, filters) in COUNTERS.items():
+        if not isinstance(instance, model):
+            continue
+        fields = ['is_deleted', *filters]
+        current = {field: getattr(instance, field) for field in fields}
+        if created:
+            before, after = False, _member(current, filters)
+        elif deleted:
+            before, after = _member(current, filters), False
+        elif all(instance.is_tracked(field) for field in fields):
+            loaded = {field: instance.loaded_value(field) for field in fields}
+            before, after = _member(loaded, filters), _member(current, filters)
+        else:
+            return None
+        deltas[name] = int(after) - int(before)
+    return deltas
+
+
+def apply_deltas(hub_id, deltas):
+    for name, delta in deltas.items():
+        adjust(hub_id, name, delta)
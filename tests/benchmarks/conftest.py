@@ -0,0 +1,113 @@
+"""
+Fixtures for the benchmark suite.
+
+The benchmarks only run when ``PATIENT_RECORDS_BENCHMARK`` names a hub size
+(``10k``, ``100k`` or ``1m``); otherwise this directory is not collected.
+The hub is seeded once per session with ``synthetic.seed_hub``.
+
+Each case records wall time (pytest-benchmark), query count and peak Python
+allocations, and is compared with ``baseline.json``. Set
+``PATIENT_RECORDS_BENCHMARK_UPDATE=1`` to record the current results as the
+new baseline instead.
+"""
+import json
+import os
+import tracemalloc
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from . import synthetic
+
+SIZE = os.environ.get('PATIENT_RECORDS_BENCHMARK', '').lower()
+UPDATE_BASELINE = os.environ.get('PATIENT_RECORDS_BENCHMARK_UPDATE') == '1'
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+ROUNDS = int(os.environ.get('PATIENT_RECORDS_BENCHMARK_ROUNDS', 5))
+TIME_TOLERANCE = float(os.environ.get('PATIENT_RECORDS_BENCHMARK_TIME_TOLERANCE', 0.25))
+MEMORY_TOLERANCE = 0.25
+
+if SIZE not in synthetic.SIZES:
+    collect_ignore_glob = ['test_*.py']
+
+
+class Baseline:
+    """Stored results keyed by ``<size>/<test name>``."""
+
+    def __init__(self, path):
+        self.path = path
+        self.results = json.loads(path.read_text()) if path.exists() else {}
+        self.changed = False
+
+    def check(self, key, result):
+        """Record ``result`` in update mode, else return how it regressed against the baseline."""
+        if UPDATE_BASELINE:
+            self.results[key] = result
+            self.changed = True
+            return []
+        expected = self.results.get(key)
+        if expected is None:
+            return []
+        problems = []
+        if result['mean_ms'] > expected['mean_ms'] * (1 + TIME_TOLERANCE):
+            problems.append(f"mean {result['mean_ms']:.1f} ms > baseline {expected['mean_ms']:.1f} ms")
+        if result['queries'] > expected['queries']:
+            problems.append(f"{result['queries']} queries > baseline {expected['queries']}")
+        if result['peak_kb'] > expected['peak_kb'] * (1 + MEMORY_TOLERANCE):
+            problems.append(f"peak {result['peak_kb']} KiB > baseline {expected['peak_kb']} KiB")
+        return problems
+
+    def save(self):
+        if self.changed:
+            self.path.write_text(json.dumps(self.results, indent=2, sort_keys=True) + '\n')
+
+
+@pytest.fixture(scope='session')
+def baseline():
+    store = Baseline(BASELINE_PATH)
+    yield store
+    store.save()
+
+
+@pytest.fixture(scope='session')
+def seeded_hub(django_db_setup, django_db_blocker):
+    """The synthetic hub for ``PATIENT_RECORDS_BENCHMARK``, seeded once per session."""
+    hub_id = synthetic.hub_for_size(SIZE)
+    with django_db_blocker.unblock():
+        synthetic.seed_hub(hub_id, synthetic.SIZES[SIZE])
+    return hub_id
+
+
+@pytest.fixture
+def hub_id(seeded_hub):
+    """Point the shared fixtures (``admin_user``, ``auth_client``) at the seeded hub."""
+    return seeded_hub
+
+
+@pytest.fixture
+def measure(benchmark, baseline, request):
+    """Benchmark ``func`` and check wall time, query count and peak memory against the baseline."""
+
+    def run(func):
+        result = benchmark.pedantic(func, rounds=ROUNDS, iterations=1, warmup_rounds=1)
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            try:
+                func()
+                _current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        stats = benchmark.stats.stats if benchmark.stats else None
+        measured = {
+            'mean_ms': round(stats.mean * 1000, 2) if stats else 0.0,
+            'queries': len(queries.captured_queries),
+            'peak_kb': peak // 1024,
+        }
+        benchmark.extra_info.update(measured)
+        problems = baseline.check(f'{SIZE}/{request.node.name}', measured)
+        if problems:
+            pytest.fail('Regression against baseline: ' + '; '.join(problems))
+        return result
+
+    return run
@@ -0,0 +1,120 @@
+"""
+Deterministic synthetic data for the benchmark suite.
+
+``seed_hub`` fills one hub with ``patients`` patients and, on average,
+``TREATMENTS_PER_PATIENT`` treatments each. Names, free-text lengths, dates
+and practitioners are drawn from a ``random.Random`` seeded per hub size, so
+every run (and every machine) benchmarks the same rows. Rows go through
+``writes`` so the search index, counters, rollups and visit summaries match
+what the app would hold for the same data.
+"""
+import datetime
+import random
+import uuid
+
+from patient_records import writes
+from patient_records.models import PatientRecord, Treatment
+
+SIZES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+TREATMENTS_PER_PATIENT = 4
+BATCH_SIZE = 2000
+ANCHOR_DATE = datetime.date(2026, 1, 1)
+
+FIRST_NAMES = [
+    'Ana', 'Beatriz', 'Carlos', 'Daniel', 'Elena', 'Fernando', 'Gloria', 'Hugo', 'Irene', 'Javier',
+    'Laura', 'Manuel', 'Nuria', 'Oscar', 'Paula', 'Raquel', 'Sergio', 'Teresa', 'Victor', 'Yolanda',
+    'John', 'Mary', 'Peter', 'Sarah', 'David', 'Emma', 'James', 'Olivia', 'Thomas', 'Sophie',
+]
+LAST_NAMES = [
+    'Garcia', 'Martinez', 'Lopez', 'Sanchez', 'Perez', 'Gomez', 'Martin', 'Jimenez', 'Ruiz', 'Hernandez',
+    'Diaz', 'Moreno', 'Alvarez', 'Romero', 'Navarro', 'Torres', 'Dominguez', 'Vazquez', 'Ramos', 'Gil',
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Miller', 'Davis', 'Wilson', 'Taylor', 'Clark',
+]
+GENDERS = ['female', 'male', 'other', '']
+BLOOD_TYPES = ['O+', 'O-', 'A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', '']
+ALLERGENS = ['penicillin', 'latex', 'pollen', 'peanuts', 'shellfish', 'aspirin', 'ibuprofen', 'dust mites', 'sulfa']
+WORDS = (
+    'patient reports mild moderate severe pain in the lower upper back knee shoulder neck since last '
+    'week month year follow up recommended blood pressure hypertension diabetes asthma chronic acute '
+    'infection fever cough headache fatigue prescribed daily twice with meals rest physiotherapy review '
+    'results normal elevated stable improving worsening referral specialist dose tablet mg ml after before'
+).split()
+
+
+def hub_for_size(size):
+    """The fixed hub id benchmarks of ``size`` run against."""
+    return uuid.uuid5(uuid.NAMESPACE_URL, f'patient-records-benchmark/{size}')
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _text(rng, min_words, max_words):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize()
+
+
+def _date(rng, max_days_ago):
+    return ANCHOR_DATE - datetime.timedelta(days=rng.randint(0, max_days_ago))
+
+
+def build_patient(rng, hub_id):
+    """One unsaved ``PatientRecord`` with realistic field lengths."""
+    return PatientRecord(
+        id=_uuid(rng),
+        hub_id=hub_id,
+        patient_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}',
+        date_of_birth=None if rng.random() < 0.05 else _date(rng, 95 * 365),
+        gender=rng.choice(GENDERS),
+        blood_type=rng.choice(BLOOD_TYPES),
+        allergies=', '.join(rng.sample(ALLERGENS, rng.choice([0, 0, 0, 1, 1, 2, 3]))),
+        medical_notes=_text(rng, 0, 300),
+        is_active=rng.random() < 0.85,
+    )
+
+
+def build_treatment(rng, hub_id, patient_id, practitioners):
+    """One unsaved ``Treatment`` of ``patient_id`` with realistic field lengths."""
+    return Treatment(
+        id=_uuid(rng),
+        hub_id=hub_id,
+        patient_id=patient_id,
+        date=_date(rng, 5 * 365),
+        description=_text(rng, 5, 40),
+        diagnosis=_text(rng, 2, 12),
+        prescription=_text(rng, 0, 25),
+        practitioner_id=None if rng.random() < 0.1 else rng.choice(practitioners),
+        notes=_text(rng, 0, 150),
+    )
+
+
+def seed_hub(hub_id, patients, seed=0, batch_size=BATCH_SIZE):
+    """Create ``patients`` patients and their treatments in ``hub_id``; returns the treatment count.
+
+    A hub that already holds patients is left as it is, so a reused test
+    database is only seeded once.
+    """
+    if PatientRecord.all_objects.filter(hub_id=hub_id).exists():
+        return Treatment.all_objects.filter(hub_id=hub_id).count()
+    rng = random.Random(f'{seed}:{patients}')
+    practitioners = [_uuid(rng) for _ in range(12)]
+    treatments = 0
+    for start in range(0, patients, batch_size):
+        batch = [build_patient(rng, hub_id) for _ in range(min(batch_size, patients - start))]
+        writes.create_patient_records(hub_id, batch)
+        pending = []
+        for patient in batch:
+            for _ in range(rng.randint(0, 2 * TREATMENTS_PER_PATIENT)):
+                pending.append(build_treatment(rng, hub_id, patient.pk, practitioners))
+            if len(pending) >= batch_size:
+                writes.create_treatments(hub_id, pending)
+                treatments += len(pending)
+                pending = []
+        if pending:
+            writes.create_treatments(hub_id, pending)
+            treatments += len(pending)
+    return treatments
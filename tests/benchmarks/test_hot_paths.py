@@ -0,0 +1,103 @@
+"""Benchmarks for the Patient Records hot paths on a synthetic hub."""
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+
+from patient_records.ai_tools import ListPatients, ListTreatments
+from patient_records.queries import PATIENT_RECORD_SORT_FIELDS, TREATMENT_SORT_FIELDS
+
+pytest.importorskip('pytest_benchmark')
+
+SEARCH_QUERIES = ['garcia', 'penicillin', 'ana smith']
+
+
+def _get(client, url, **params):
+    response = client.get(url, params, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+    assert response.status_code == 200
+    return response
+
+
+def _download(client, url, **params):
+    response = client.get(url, params)
+    assert response.status_code == 200
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def _tool_request(hub_id):
+    request = RequestFactory().get('/')
+    request.session = {'hub_id': str(hub_id)}
+    return request
+
+
+@pytest.mark.django_db
+class TestPatientRecordsList:
+    """patient_records_list benchmarks."""
+
+    @pytest.mark.parametrize('sort_dir', ['asc', 'desc'])
+    @pytest.mark.parametrize('sort_key', sorted(PATIENT_RECORD_SORT_FIELDS))
+    def test_sort(self, auth_client, measure, sort_key, sort_dir):
+        """Benchmark the first page for each sort."""
+        url = reverse('patient_records:patient_records_list')
+        measure(lambda: _get(auth_client, url, sort=sort_key, dir=sort_dir))
+
+    @pytest.mark.parametrize('query', SEARCH_QUERIES)
+    def test_search(self, auth_client, measure, query):
+        """Benchmark the first page of a search."""
+        url = reverse('patient_records:patient_records_list')
+        measure(lambda: _get(auth_client, url, q=query))
+
+
+@pytest.mark.django_db
+class TestTreatmentsList:
+    """treatments_list benchmarks."""
+
+    @pytest.mark.parametrize('sort_dir', ['asc', 'desc'])
+    @pytest.mark.parametrize('sort_key', sorted(TREATMENT_SORT_FIELDS))
+    def test_sort(self, auth_client, measure, sort_key, sort_dir):
+        """Benchmark the first page for each sort."""
+        url = reverse('patient_records:treatments_list')
+        measure(lambda: _get(auth_client, url, sort=sort_key, dir=sort_dir))
+
+    @pytest.mark.parametrize('query', SEARCH_QUERIES)
+    def test_search(self, auth_client, measure, query):
+        """Benchmark the first page of a search."""
+        url = reverse('patient_records:treatments_list')
+        measure(lambda: _get(auth_client, url, q=query))
+
+
+@pytest.mark.django_db
+class TestExports:
+    """Streaming export benchmarks."""
+
+    @pytest.mark.parametrize('export_format', ['csv', 'excel'])
+    @pytest.mark.parametrize('url_name', ['patient_records_list', 'treatments_list'])
+    def test_export(self, auth_client, measure, url_name, export_format):
+        """Benchmark a full export of the hub."""
+        url = reverse(f'patient_records:{url_name}')
+        measure(lambda: _download(auth_client, url, export=export_format))
+
+
+@pytest.mark.django_db
+class TestDashboard:
+    """dashboard benchmarks."""
+
+    def test_dashboard(self, auth_client, measure):
+        """Benchmark the dashboard."""
+        url = reverse('patient_records:dashboard')
+        measure(lambda: auth_client.get(url))
+
+
+@pytest.mark.django_db
+class TestAITools:
+    """AI list tool benchmarks."""
+
+    @pytest.mark.parametrize('args', [{}, {'search': 'garcia'}], ids=['all', 'search'])
+    def test_list_patients(self, hub_id, measure, args):
+        """Benchmark one list_patients page."""
+        request = _tool_request(hub_id)
+        measure(lambda: ListPatients().execute(args, request))
+
+    def test_list_treatments(self, hub_id, measure):
+        """Benchmark one list_treatments page."""
+        request = _tool_request(hub_id)
+        measure(lambda: ListTreatments().execute({}, request))
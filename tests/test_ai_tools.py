@@ -0,0 +1,154 @@
+"""Tests for the Patient Records AI tools."""
+import datetime
+import uuid
+
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from patient_records import ai_tools, writes
+from patient_records.ai_tools import ListPatients, ListTreatments
+from patient_records.models import PatientRecord, Treatment
+
+
+def _request(hub_id):
+    request = RequestFactory().get('/')
+    request.session = {'hub_id': str(hub_id)}
+    return request
+
+
+def _walk(tool, request, **args):
+    """Follow next_cursor to the end; return every item and the number of calls."""
+    items, calls, cursor = [], 0, None
+    while True:
+        result = tool.execute({**args, 'cursor': cursor} if cursor else args, request)
+        calls += 1
+        items += result.get('patients', result.get('treatments', []))
+        cursor = result['next_cursor']
+        if not cursor:
+            return items, calls
+
+
+@pytest.mark.django_db
+class TestListPatients:
+    """list_patients tool tests."""
+
+    def test_scoped_to_hub_and_live_rows(self, hub_id):
+        """Test other hubs' and deleted patients are never returned."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Gone', is_deleted=True)
+        PatientRecord.objects.create(hub_id=uuid.uuid4(), patient_name='Other hub')
+        result = ListPatients().execute({}, _request(hub_id))
+        assert [p['patient_name'] for p in result['patients']] == ['Ana']
+        assert result['next_cursor'] is None
+
+    def test_limit_is_capped(self, hub_id):
+        """Test a huge limit is clamped and the rest is reachable by cursor."""
+        PatientRecord.objects.bulk_create([
+            PatientRecord(hub_id=hub_id, patient_name=f'Patient {i:04d}') for i in range(ai_tools.MAX_LIST_LIMIT + 30)
+        ])
+        result = ListPatients().execute({'limit': 100_000}, _request(hub_id))
+        assert len(result['patients']) == ai_tools.MAX_LIST_LIMIT
+        assert result['next_cursor']
+        items, _calls = _walk(ListPatients(), _request(hub_id), limit=100_000)
+        names = [p['patient_name'] for p in items]
+        assert len(names) == ai_tools.MAX_LIST_LIMIT + 30
+        assert names == sorted(names)
+
+    def test_byte_budget(self, hub_id, monkeypatch):
+        """Test a page stops at the byte budget and resumes where it stopped."""
+        monkeypatch.setattr(ai_tools, 'MAX_LIST_BYTES', 2000)
+        writes.create_patient_records(hub_id, [
+            PatientRecord(hub_id=hub_id, patient_name=f'Patient {i:02d}', allergies='x' * 1000) for i in range(10)
+        ])
+        result = ListPatients().execute({'limit': 10}, _request(hub_id))
+        assert 0 < len(result['patients']) < 10
+        assert all(len(p['allergies']) <= ai_tools.MAX_TEXT_CHARS + 1 for p in result['patients'])
+        items, calls = _walk(ListPatients(), _request(hub_id), limit=10)
+        assert len({p['id'] for p in items}) == 10
+        assert calls > 1
+
+
+@pytest.mark.django_db
+class TestListTreatments:
+    """list_treatments tool tests."""
+
+    def test_newest_first_with_constant_queries(self, hub_id):
+        """Test treatments are paged newest first with one query per page."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        day = datetime.date(2026, 1, 1)
+        Treatment.objects.bulk_create([
+            Treatment(hub_id=hub_id, patient=patient, date=day + datetime.timedelta(days=i), description=f'Visit {i}')
+            for i in range(45)
+        ])
+        Treatment.objects.create(hub_id=uuid.uuid4(), date=day, description='Other hub')
+        with CaptureQueriesContext(connection) as ctx:
+            result = ListTreatments().execute({'patient_id': str(patient.pk), 'limit': 20}, _request(hub_id))
+        assert len(ctx.captured_queries) == 1
+        assert result['treatments'][0]['patient'] == 'Ana'
+        items, calls = _walk(ListTreatments(), _request(hub_id), limit=20)
+        assert len(items) == 45
+        assert calls == 3
+        assert [t['date'] for t in items] == sorted((t['date'] for t in items), reverse=True)
+
+    def test_invalid_patient_id(self, hub_id):
+        """Test a malformed patient id is reported instead of raising."""
+        assert ListTreatments().execute({'patient_id': 'nope'}, _request(hub_id)) == {"error": "Invalid patient_id"}
+
+
+@pytest.mark.django_db
+class TestBatchTools:
+    """Batch create/update tool tests."""
+
+    def test_create_treatments_batch(self, hub_id):
+        """Test a 50-visit batch is written with a bounded number of queries and derived data."""
+        from patient_records import stats
+        from patient_records.ai_tools import CreateTreatmentsBatch
+        from patient_records.models import TreatmentDailyStat
+        patients = [PatientRecord.objects.create(hub_id=hub_id, patient_name=f'P{i}') for i in range(5)]
+        day = '2026-03-02'
+        items = [
+            {'patient_id': str(patients[i % 5].pk), 'date': day, 'description': f'Visit {i}'}
+            for i in range(50)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            result = CreateTreatmentsBatch().execute({'items': items}, _request(hub_id))
+        assert result['created'] == 50
+        assert [r['index'] for r in result['results']] == list(range(50))
+        assert len(ctx.captured_queries) < 15
+        patients[0].refresh_from_db()
+        assert patients[0].visit_count == 10
+        assert stats.get_counts(hub_id)['treatments'] == 50
+        assert TreatmentDailyStat.objects.get(hub_id=hub_id).treatment_count == 50
+
+    def test_invalid_item_writes_nothing(self, hub_id):
+        """Test one invalid item rejects the whole batch with per-item errors."""
+        from patient_records.ai_tools import CreateTreatmentsBatch
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        other_hub = PatientRecord.objects.create(hub_id=uuid.uuid4(), patient_name='Ben')
+        items = [
+            {'patient_id': str(patient.pk), 'date': '2026-03-02', 'description': 'Ok'},
+            {'patient_id': str(patient.pk), 'date': 'yesterday', 'description': 'Bad date'},
+            {'patient_id': str(other_hub.pk), 'date': '2026-03-02', 'description': 'Other hub'},
+        ]
+        result = CreateTreatmentsBatch().execute({'items': items}, _request(hub_id))
+        assert result['created'] == 0
+        assert [e['index'] for e in result['errors']] == [1, 2]
+        assert not Treatment.objects.exists()
+
+    def test_update_visits_batch(self, hub_id):
+        """Test batch updates move rollups and visit summaries like single saves."""
+        from patient_records.ai_tools import UpdatePatientVisitsBatch
+        from patient_records.models import TreatmentDailyStat
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        old, new = datetime.date(2026, 3, 1), datetime.date(2026, 3, 9)
+        treatments = [Treatment.objects.create(hub_id=hub_id, patient=patient, date=old, description='V') for _ in range(3)]
+        items = [{'treatment_id': str(t.pk), 'date': new.isoformat(), 'diagnosis': 'Flu'} for t in treatments[:2]]
+        result = UpdatePatientVisitsBatch().execute({'items': items}, _request(hub_id))
+        assert result['updated'] == 2
+        assert Treatment.objects.filter(date=new, diagnosis='Flu').count() == 2
+        counts = dict(TreatmentDailyStat.objects.filter(hub_id=hub_id).values_list('day', 'treatment_count'))
+        assert counts == {old: 1, new: 2}
+        patient.refresh_from_db()
+        assert patient.last_visit_date == new
@@ -0,0 +1,144 @@
+"""Tests for the archive tier."""
+import datetime
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from patient_records import archive, stats
+from patient_records.merge import merge_patients
+from patient_records.models import (
+    ArchivedPatientRecord, ArchivedTreatment, PatientRecord, Treatment, TreatmentDailyStat,
+)
+
+LATER = timezone.now() + datetime.timedelta(days=3 * 365)
+DAY = datetime.date(2024, 3, 1)
+
+
+def _patient(hub_id, name, treatments=0, **fields):
+    patient = PatientRecord.objects.create(hub_id=hub_id, patient_name=name, **fields)
+    for i in range(treatments):
+        Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY, description=f'{name} visit {i}')
+    return patient
+
+
+def _delete(obj):
+    obj.is_deleted = True
+    obj.deleted_at = timezone.now()
+    obj.save()
+
+
+@pytest.mark.django_db
+class TestArchive:
+    """Archive and restore tests."""
+
+    def test_archive_hub(self, hub_id):
+        """Test old deleted and inactive patients move with their treatments; the rest stays."""
+        deleted = _patient(hub_id, 'Deleted Dora', treatments=2)
+        _delete(deleted)
+        inactive = _patient(hub_id, 'Inactive Ines', treatments=1, is_active=False)
+        active = _patient(hub_id, 'Active Ana', treatments=3)
+        stale_visit = Treatment.objects.filter(patient=active).first()
+        _delete(stale_visit)
+
+        patients, treatments = archive.archive_hub(hub_id, now=LATER, batch_size=1)
+
+        assert (patients, treatments) == (2, 4)
+        assert list(PatientRecord.all_objects.filter(hub_id=hub_id)) == [active]
+        assert Treatment.all_objects.filter(hub_id=hub_id).count() == 2
+        reasons = dict(ArchivedPatientRecord.objects.values_list('pk', 'archive_reason'))
+        assert reasons == {deleted.pk: ArchivedPatientRecord.DELETED, inactive.pk: ArchivedPatientRecord.INACTIVE}
+        assert ArchivedTreatment.objects.filter(pk=stale_visit.pk).exists()
+        assert stats.get_counts(hub_id)['patient_records'] == 1
+        assert stats.get_counts(hub_id)['treatments'] == 2
+        assert TreatmentDailyStat.objects.get(hub_id=hub_id, day=DAY).treatment_count == 2
+
+    def test_recent_rows_stay(self, hub_id):
+        """Test rows deleted or deactivated recently are not archived."""
+        _delete(_patient(hub_id, 'Dora'))
+        _patient(hub_id, 'Ines', is_active=False)
+        assert archive.archive_hub(hub_id) == (0, 0)
+
+    def test_merged_patients_stay(self, hub_id):
+        """Test merge survivors and merged records stay in the hot table for undo."""
+        survivor = _patient(hub_id, 'Ana Garcia')
+        loser = _patient(hub_id, 'Ana Garcia', treatments=1)
+        merge_patients(hub_id, survivor.pk, [loser.pk])
+        PatientRecord.objects.filter(pk=survivor.pk).update(is_active=False)
+        assert archive.archive_hub(hub_id, now=LATER) == (0, 0)
+
+    def test_search_and_restore(self, hub_id):
+        """Test an archived patient is found by search and restored with its treatments."""
+        patient = _patient(hub_id, 'Zoe Archived', treatments=2, is_active=False)
+        archive.archive_hub(hub_id, now=LATER)
+
+        assert [row.pk for row in archive.search_archive(hub_id, 'zoe')] == [patient.pk]
+        assert not archive.search_archive(hub_id, 'nobody').exists()
+
+        restored = archive.restore_patient(hub_id, patient.pk)
+        assert not ArchivedPatientRecord.objects.exists()
+        assert not ArchivedTreatment.objects.exists()
+        assert restored.visit_count == 2
+        assert restored.created_at == patient.created_at
+        assert Treatment.objects.filter(patient=restored).count() == 2
+        assert TreatmentDailyStat.objects.get(hub_id=hub_id, day=DAY).treatment_count == 2
+        assert PatientRecord.objects.filter(hub_id=hub_id, patient_name__startswith='Zoe').exists()
+
+    def test_restore_unknown(self, hub_id):
+        """Test restoring a patient that is not archived fails cleanly."""
+        with pytest.raises(archive.ArchiveError):
+            archive.restore_patient(hub_id, _patient(hub_id, 'Live').pk)
+
+    def test_search_and_restore_treatment(self, hub_id):
+        """Test a treatment archived on its own is found by search and restored, undeleted."""
+        patient = _patient(hub_id, 'Tess Live', treatments=1)
+        gone = Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY, description='Tetanus booster')
+        _delete(gone)
+        archive.archive_hub(hub_id, now=LATER)
+        assert not archive.search_archive(hub_id).exists()
+
+        found = list(archive.search_archived_treatments(hub_id, 'tetanus'))
+        assert [(row.pk, row.patient_name) for row in found] == [(gone.pk, 'Tess Live')]
+        assert not archive.search_archived_treatments(hub_id, 'nobody').exists()
+
+        restored = archive.restore_treatment(hub_id, gone.pk)
+        assert not ArchivedTreatment.objects.exists()
+        assert not restored.is_deleted
+        assert restored.description == 'Tetanus booster'
+        assert Treatment.objects.filter(patient=patient).count() == 2
+        patient.refresh_from_db()
+        assert patient.visit_count == 2
+        assert stats.get_counts(hub_id)['treatments'] == 2
+        assert TreatmentDailyStat.objects.get(hub_id=hub_id, day=DAY).treatment_count == 2
+
+    def test_archived_patient_treatments_are_not_listed(self, hub_id):
+        """Test treatments archived with their patient only come back with the patient."""
+        patient = _patient(hub_id, 'Ines Inactive', treatments=1, is_active=False)
+        archive.archive_hub(hub_id, now=LATER)
+        assert not archive.search_archived_treatments(hub_id).exists()
+        treatment = ArchivedTreatment.objects.get(patient_id=patient.pk)
+        with pytest.raises(archive.ArchiveError):
+            archive.restore_treatment(hub_id, treatment.pk)
+        assert ArchivedTreatment.objects.filter(pk=treatment.pk).exists()
+
+    def test_archive_views(self, auth_client, hub_id):
+        """Test the archive page lists archived patients and restores them."""
+        patient = _patient(hub_id, 'Viewed Vera', is_active=False)
+        archive.archive_hub(hub_id, now=LATER)
+        response = auth_client.get(reverse('patient_records:patient_archive'), {'q': 'vera'})
+        assert 'Viewed Vera' in response.content.decode()
+        response = auth_client.post(reverse('patient_records:patient_archive_restore', args=[patient.pk]))
+        assert 'restored' in response.content.decode()
+        assert PatientRecord.objects.filter(pk=patient.pk).exists()
+
+    def test_treatment_archive_views(self, auth_client, hub_id):
+        """Test the archive page lists archived treatments and restores them."""
+        patient = _patient(hub_id, 'Tomas Live', treatments=1)
+        treatment = Treatment.objects.get(patient=patient)
+        _delete(treatment)
+        archive.archive_hub(hub_id, now=LATER)
+        response = auth_client.get(reverse('patient_records:patient_archive'))
+        assert 'Tomas Live' in response.content.decode()
+        response = auth_client.post(reverse('patient_records:treatment_archive_restore', args=[treatment.pk]))
+        assert 'restored' in response.content.decode()
+        assert Treatment.objects.filter(pk=treatment.pk).exists()
@@ -0,0 +1,84 @@
+"""Tests for filter-based bulk action jobs."""
+import datetime
+
+import pytest
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+
+from patient_records import bulk_actions, stats, writes
+from patient_records.bulk_actions import BulkActionInProgress, run_bulk_action, start_bulk_action
+from patient_records.models import BulkActionJob, PatientRecord, Treatment
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(bulk_actions, 'CHUNK_SIZE', 7)
+
+
+@pytest.mark.django_db
+class TestBulkActionJobs:
+    """Bulk action job tests."""
+
+    def test_deactivate_matching_in_chunks(self, hub_id, small_chunks):
+        """Test every row matching the search is changed, chunk by chunk."""
+        writes.create_patient_records(hub_id,
+            [PatientRecord(hub_id=hub_id, patient_name=f'Smith {i}') for i in range(30)]
+            + [PatientRecord(hub_id=hub_id, patient_name=f'Jones {i}') for i in range(5)]
+        )
+        job = start_bulk_action(hub_id, 'patient_records', 'deactivate', {'search_query': 'Smith'})
+        run_bulk_action(job.pk)
+        job.refresh_from_db()
+        assert job.status == BulkActionJob.DONE
+        assert job.total_rows == 30
+        assert job.rows_processed == 30
+        assert job.rows_changed == 30
+        assert PatientRecord.objects.filter(hub_id=hub_id, is_active=True).count() == 5
+        assert stats.get_counts(hub_id)['active_patient_records'] == 5
+
+    def test_delete_treatments_keeps_derived_data(self, hub_id, small_chunks):
+        """Test a chunked treatment delete updates rollups and visit summaries."""
+        from patient_records.models import TreatmentDailyStat
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        day = datetime.date(2026, 4, 1)
+        for i in range(20):
+            Treatment.objects.create(hub_id=hub_id, patient=patient, date=day, description=f'Visit {i}')
+        job = start_bulk_action(hub_id, 'treatments', 'delete', {'search_query': ''})
+        run_bulk_action(job.pk)
+        assert not Treatment.objects.filter(hub_id=hub_id).exists()
+        assert TreatmentDailyStat.objects.get(hub_id=hub_id, day=day).treatment_count == 0
+        patient.refresh_from_db()
+        assert (patient.visit_count, patient.last_visit_date) == (0, None)
+
+    def test_one_job_per_hub(self, hub_id):
+        """Test a second job is refused while one is in flight."""
+        start_bulk_action(hub_id, 'patient_records', 'activate', {})
+        with pytest.raises(BulkActionInProgress):
+            start_bulk_action(hub_id, 'treatments', 'delete', {})
+
+    def test_constraint_enforces_one_job(self, hub_id):
+        """Test the database rejects a second active job and frees the hub once it finishes."""
+        job = start_bulk_action(hub_id, 'patient_records', 'activate', {})
+        with pytest.raises(IntegrityError), transaction.atomic():
+            BulkActionJob.objects.create(hub_id=hub_id, resource='treatments', action='delete')
+        BulkActionJob.objects.filter(pk=job.pk).update(status=BulkActionJob.DONE)
+        assert start_bulk_action(hub_id, 'treatments', 'delete', {}).pk != job.pk
+
+    def test_unknown_action(self, hub_id):
+        """Test unsupported resource/action pairs are rejected."""
+        with pytest.raises(ValueError):
+            start_bulk_action(hub_id, 'treatments', 'activate', {})
+
+    def test_select_all_views(self, auth_client, hub_id):
+        """Test select=all starts a job and the status endpoint reports it."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        url = reverse('patient_records:patient_records_bulk_action')
+        response = auth_client.post(url, {'select': 'all', 'action': 'deactivate', 'q': 'Ana'})
+        assert response.status_code == 200
+        job = BulkActionJob.objects.get(hub_id=hub_id)
+        assert job.params == {'search_query': 'Ana'}
+        run_bulk_action(job.pk)
+        response = auth_client.get(reverse('patient_records:bulk_job_status', args=[job.pk]))
+        assert response.status_code == 200
+        assert b'hx-trigger="every 1s"' not in response.content
+        response = auth_client.post(url, {'select': 'all', 'action': 'archive'})
+        assert response.status_code == 400
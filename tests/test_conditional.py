@@ -0,0 +1,85 @@
+"""Tests for conditional GETs on the list and dashboard views."""
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from patient_records import generations
+from patient_records.models import PatientRecord, Treatment
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'conditional-tests'}}
+
+URL_NAMES = ['patient_records:dashboard', 'patient_records:patient_records_list', 'patient_records:treatments_list']
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM):
+        yield
+
+
+def _get(client, url, etag=None, **headers):
+    if etag:
+        headers['HTTP_IF_NONE_MATCH'] = etag
+    return client.get(url, HTTP_HX_REQUEST='true', **headers)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalGet:
+    """ETag / 304 tests."""
+
+    @pytest.mark.parametrize('url_name', URL_NAMES)
+    def test_unchanged_hub_returns_304(self, auth_client, hub_id, url_name):
+        """Test revalidating an unchanged view skips the data queries."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        url = reverse(url_name)
+        response = _get(auth_client, url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert 'no-cache' in response['Cache-Control']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = _get(auth_client, url, etag)
+        assert response.status_code == 304
+        tables = (PatientRecord._meta.db_table, Treatment._meta.db_table)
+        assert not [q for q in ctx.captured_queries if any(t in q['sql'] for t in tables)]
+
+    @pytest.mark.parametrize('url_name', URL_NAMES)
+    def test_write_changes_etag(self, auth_client, hub_id, url_name):
+        """Test any write in the hub invalidates the previous ETag."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        url = reverse(url_name)
+        etag = _get(auth_client, url)['ETag']
+        Treatment.objects.create(hub_id=hub_id, patient=patient, date='2026-06-01', description='Visit')
+        response = _get(auth_client, url, etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    @pytest.mark.parametrize('url_name', URL_NAMES[1:])
+    def test_export_ignores_if_none_match(self, auth_client, hub_id, url_name):
+        """Test an export is streamed even when the client revalidates."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        url = reverse(url_name) + '?export=csv'
+        response = auth_client.get(url)
+        assert not response.has_header('ETag')
+        for etag in (_get(auth_client, reverse(url_name))['ETag'], '*'):
+            response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200
+            assert 'text/csv' in response['Content-Type']
+
+    def test_etag_varies_by_target_and_query(self, auth_client, hub_id):
+        """Test the partial, full page and other sorts do not share an ETag."""
+        url = reverse('patient_records:patient_records_list')
+        page = auth_client.get(url)['ETag']
+        partial = _get(auth_client, url, HTTP_HX_TARGET='datatable-body')['ETag']
+        sorted_ = _get(auth_client, url + '?sort=patient_name', HTTP_HX_TARGET='datatable-body')['ETag']
+        assert len({page, partial, sorted_}) == 3
+
+    def test_bulk_paths_bump(self, hub_id):
+        """Test bulk write paths advance the generation after commit."""
+        from patient_records import bulk_actions
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        before = generations.current(hub_id)
+        bulk_actions.apply_action(hub_id, 'patient_records', 'deactivate', PatientRecord.objects.filter(pk=patient.pk))
+        assert generations.current(hub_id) > before
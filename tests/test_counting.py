@@ -0,0 +1,76 @@
+"""Tests for the datatable count strategies."""
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from patient_records import counting, writes
+from patient_records.models import PatientRecord
+from patient_records.queries import patient_records_queryset
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'counting-tests'}}
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM):
+        yield
+
+
+def _seed(hub_id, rows):
+    writes.create_patient_records(hub_id, [PatientRecord(hub_id=hub_id, patient_name=f'Smith {i}') for i in range(rows)])
+
+
+def _count(hub_id, query='Smith'):
+    return counting.list_count(hub_id, 'patient_records', patient_records_queryset(hub_id, query), query)
+
+
+@pytest.mark.django_db
+class TestListCount:
+    """Count strategy tests."""
+
+    def test_unfiltered_uses_counters(self, hub_id):
+        """Test the unfiltered total comes from the cached hub counters."""
+        _seed(hub_id, 5)
+        counting.list_count(hub_id, 'patient_records', patient_records_queryset(hub_id))
+        with CaptureQueriesContext(connection) as ctx:
+            assert counting.list_count(hub_id, 'patient_records', patient_records_queryset(hub_id)) == (5, False)
+        assert len(ctx.captured_queries) == 0
+
+    def test_filtered_exact_and_cached(self, hub_id):
+        """Test a small filtered count is exact and served from the cache on repeat."""
+        _seed(hub_id, 7)
+        assert _count(hub_id) == (7, False)
+        with CaptureQueriesContext(connection) as ctx:
+            assert _count(hub_id) == (7, False)
+        assert len(ctx.captured_queries) == 0
+
+    def test_exact_count_follows_generation(self, hub_id, monkeypatch):
+        """Test a cached exact count is recomputed once the hub generation moves."""
+        _seed(hub_id, 3)
+        assert _count(hub_id) == (3, False)
+        _seed(hub_id, 2)
+        monkeypatch.setattr(counting.generations, 'current', lambda hub: 'next')
+        assert _count(hub_id) == (5, False)
+
+    def test_large_filter(self, hub_id, monkeypatch):
+        """Test counts above the threshold are estimated on PostgreSQL and exact elsewhere."""
+        monkeypatch.setattr(counting, 'EXACT_COUNT_THRESHOLD', 10)
+        _seed(hub_id, 25)
+        value, approximate = _count(hub_id)
+        if connection.vendor == 'postgresql':
+            assert approximate
+            assert value >= 11
+        else:
+            assert (value, approximate) == (25, False)
+
+    def test_template_shows_about(self, auth_client, hub_id, monkeypatch):
+        """Test approximate counts are labelled in the footer."""
+        _seed(hub_id, 3)
+        monkeypatch.setattr(counting, 'filtered_count', lambda *args: (1_234_567, True))
+        url = reverse('patient_records:patient_records_list')
+        response = auth_client.get(url, {'q': 'Smith'}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        content = response.content.decode()
+        assert 'of about 1234567' in content
+        assert content.count('class="pagination-btn') < 15
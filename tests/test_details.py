@@ -0,0 +1,103 @@
+"""Tests for the clinical text kept in the detail tables."""
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from patient_records import archive, writes
+from patient_records.models import (
+    PREVIEW_LENGTH, PatientRecord, PatientRecordDetail, Treatment, TreatmentDetail, text_preview,
+)
+from patient_records.queries import patient_records_queryset, treatments_queryset
+from patient_records.search import get_search_backend
+
+DAY = datetime.date(2024, 3, 1)
+
+
+def _search(model, hub_id, query):
+    return list(get_search_backend().search(model.objects.filter(hub_id=hub_id), query))
+
+
+def test_text_preview():
+    """Test previews keep short text and cut long text to the column length."""
+    assert text_preview('Pollen') == 'Pollen'
+    assert text_preview(None) == ''
+    preview = text_preview('x' * 500)
+    assert len(preview) == PREVIEW_LENGTH
+    assert preview.endswith('…')
+
+
+@pytest.mark.django_db
+class TestDetailFields:
+    """Detail row and preview column tests."""
+
+    def test_create_writes_detail_and_preview(self, hub_id):
+        """Test the text lands in the detail row and its preview on the hot row."""
+        patient = PatientRecord.objects.create(
+            hub_id=hub_id, patient_name='Ana', allergies='Penicillin ' * 50, medical_notes='Asthma',
+        )
+        detail = PatientRecordDetail.objects.get(pk=patient.pk)
+        assert detail.allergies == 'Penicillin ' * 50
+        assert detail.medical_notes == 'Asthma'
+        assert PatientRecord.objects.get(pk=patient.pk).allergies_preview == text_preview('Penicillin ' * 50)
+
+    def test_text_loads_lazily(self, hub_id):
+        """Test list rows never join the detail table and the text loads on first access."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana', allergies='Latex')
+        assert 'patientrecorddetail' not in str(patient_records_queryset(hub_id).query)
+        assert 'treatmentdetail' not in str(treatments_queryset(hub_id).query)
+        patient = PatientRecord.objects.get(hub_id=hub_id)
+        with CaptureQueriesContext(connection) as ctx:
+            assert patient.allergies == 'Latex'
+            assert patient.allergies == 'Latex'
+        assert len(ctx.captured_queries) == 1
+
+    def test_update_fields_save_detail_and_reindex(self, hub_id):
+        """Test saving a detail field through update_fields updates the text, preview and index."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana', allergies='Latex')
+        patient = PatientRecord.objects.get(pk=patient.pk)
+        patient.allergies = 'Penicillin'
+        patient.save(update_fields=['allergies'])
+        patient.refresh_from_db()
+        assert patient.allergies == 'Penicillin'
+        assert patient.allergies_preview == 'Penicillin'
+        assert _search(PatientRecord, hub_id, 'penicillin') == [patient]
+        assert _search(PatientRecord, hub_id, 'latex') == []
+
+    def test_bulk_writes(self, hub_id):
+        """Test the bulk write paths create and update detail rows."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        treatments = writes.create_treatments(hub_id, [
+            Treatment(hub_id=hub_id, patient=patient, date=DAY, description=f'Visit {i}', notes='Fasting')
+            for i in range(3)
+        ])
+        assert TreatmentDetail.objects.filter(treatment__in=treatments, notes='Fasting').count() == 3
+        loaded = list(Treatment.objects.filter(hub_id=hub_id).select_related('detail'))
+        for treatment in loaded:
+            treatment.diagnosis = 'Flu'
+        writes.update_treatments(hub_id, loaded, ['diagnosis'])
+        assert TreatmentDetail.objects.filter(diagnosis='Flu').count() == 3
+        assert set(Treatment.objects.values_list('diagnosis_preview', flat=True)) == {'Flu'}
+        assert len(_search(Treatment, hub_id, 'flu')) == 3
+
+    def test_archive_round_trip_keeps_text(self, hub_id):
+        """Test archiving and restoring a patient keeps its text and rebuilds the previews."""
+        patient = PatientRecord.objects.create(
+            hub_id=hub_id, patient_name='Ana', allergies='Latex', medical_notes='Asthma',
+        )
+        Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY, description='Check-up', notes='Fasting')
+        patient.is_deleted = True
+        patient.deleted_at = timezone.now()
+        patient.save()
+        archive.archive_patients(hub_id, [patient.pk])
+        assert not PatientRecordDetail.objects.filter(pk=patient.pk).exists()
+        assert not TreatmentDetail.objects.exists()
+
+        restored = archive.restore_patient(hub_id, patient.pk)
+        assert (restored.allergies, restored.medical_notes, restored.allergies_preview) == ('Latex', 'Asthma', 'Latex')
+        treatment = Treatment.objects.get(patient=restored)
+        assert (treatment.description, treatment.notes) == ('Check-up', 'Fasting')
+        assert treatment.description_preview == 'Check-up'
+        assert _search(Treatment, hub_id, 'fasting') == [treatment]
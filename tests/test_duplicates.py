@@ -0,0 +1,82 @@
+"""Tests for duplicate patient detection."""
+import datetime
+
+import pytest
+from django.urls import reverse
+
+from patient_records import duplicates
+from patient_records.models import PatientRecord
+from patient_records.names import name_key, phonetic_key, soundex
+
+DOB = datetime.date(1985, 6, 1)
+
+
+def test_name_keys():
+    """Test keys ignore case, accents, punctuation and word order."""
+    assert name_key('García, Ana') == name_key('ana  garcia') == 'ana garcia'
+    assert phonetic_key('Ana Garcia') == phonetic_key('Anna Garsia')
+    assert soundex('robert') == soundex('rupert') == 'R163'
+    assert soundex('ashcraft') == 'A261'
+
+
+@pytest.mark.django_db
+class TestDuplicates:
+    """Duplicate detection tests."""
+
+    def test_keys_follow_name_changes(self, hub_id):
+        """Test saving with update_fields refreshes the blocking keys."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana Garcia')
+        patient.patient_name = 'Ana Lopez'
+        patient.save(update_fields=['patient_name', 'updated_at'])
+        patient.refresh_from_db()
+        assert patient.name_key == 'ana lopez'
+
+    def test_find_duplicates(self, hub_id):
+        """Test spelling variants with the same birth date are found."""
+        ana = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana Garcia', date_of_birth=DOB)
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana Garcia', date_of_birth=datetime.date(1990, 1, 1))
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Luis Perez', date_of_birth=DOB)
+        matches = duplicates.find_duplicates(hub_id, 'Anna Garsia', DOB.isoformat())
+        assert [patient['id'] for _score, patient in matches] == [ana.pk]
+
+    def test_duplicate_groups(self, hub_id):
+        """Test the report clusters matches within blocks."""
+        a = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana Garcia', date_of_birth=DOB)
+        b = PatientRecord.objects.create(hub_id=hub_id, patient_name='Garcia Ana', date_of_birth=DOB)
+        c = PatientRecord.objects.create(hub_id=hub_id, patient_name='Anna Garsia', date_of_birth=DOB)
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Luis Perez', date_of_birth=DOB)
+        groups = duplicates.duplicate_groups(hub_id)
+        assert len(groups) == 1
+        assert {row['id'] for row in groups[0]['patients']} == {a.pk, b.pk, c.pk}
+
+    def test_report_compares_within_blocks_only(self, hub_id, monkeypatch):
+        """Test patients that share no block are never compared."""
+        PatientRecord.objects.bulk_create([
+            PatientRecord(
+                hub_id=hub_id, patient_name=f'Patient {i:05d}', name_key=f'patient {i:05d}',
+                phonetic_key=f'P353 {i:05d}', date_of_birth=DOB + datetime.timedelta(days=i % 3000),
+            )
+            for i in range(3000)
+        ])
+        calls = []
+        original = duplicates.score
+        monkeypatch.setattr(duplicates, 'score', lambda a, b: calls.append(1) or original(a, b))
+        duplicates.duplicate_groups(hub_id)
+        assert len(calls) == 0
+
+    def test_add_warns_before_creating_duplicate(self, auth_client, hub_id):
+        """Test the add view asks for confirmation when a match exists."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana Garcia', date_of_birth=DOB)
+        url = reverse('patient_records:patient_record_add')
+        data = {'patient_name': 'Anna Garsia', 'date_of_birth': DOB.isoformat()}
+        response = auth_client.post(url, data)
+        assert response.status_code == 200
+        assert response.context['duplicates']
+        assert PatientRecord.objects.filter(hub_id=hub_id).count() == 1
+        response = auth_client.post(url, {**data, 'confirm_duplicate': '1'})
+        assert PatientRecord.objects.filter(hub_id=hub_id).count() == 2
+
+    def test_report_view(self, auth_client):
+        """Test the duplicates report loads."""
+        response = auth_client.get(reverse('patient_records:patient_record_duplicates'))
+        assert response.status_code == 200
@@ -0,0 +1,75 @@
+"""Tests for background export jobs."""
+import os
+from datetime import timedelta
+
+import pytest
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from patient_records.export_jobs import (
+    MAX_JOBS_PER_HUB, ExportLimitReached, cleanup_expired_exports, run_export, start_export,
+)
+from patient_records.models import ExportJob
+
+
+@pytest.mark.django_db
+class TestExportJobs:
+    """Background export job tests."""
+
+    def test_run_export_writes_file(self, hub_id, patient_record):
+        """Test a job writes the export and records its progress."""
+        job = start_export(hub_id, 'patient_records', 'csv', {'search_query': 'test'})
+        run_export(job.pk)
+        job.refresh_from_db()
+        assert job.status == ExportJob.DONE
+        assert job.rows_processed == 1
+        assert job.total_rows == 1
+        with open(job.file_path, encoding='utf-8') as fileobj:
+            assert 'Test Patient Name' in fileobj.read()
+        os.remove(job.file_path)
+
+    def test_per_hub_limit(self, hub_id):
+        """Test a hub cannot queue more than the allowed number of jobs."""
+        for _ in range(MAX_JOBS_PER_HUB):
+            start_export(hub_id, 'treatments', 'csv', {})
+        with pytest.raises(ExportLimitReached):
+            start_export(hub_id, 'treatments', 'csv', {})
+
+    def test_slots_enforce_limit(self, hub_id):
+        """Test the database rejects a second active job in a slot and frees it once finished."""
+        job = start_export(hub_id, 'treatments', 'csv', {})
+        with pytest.raises(IntegrityError), transaction.atomic():
+            ExportJob.objects.create(hub_id=hub_id, resource='treatments', export_format='csv', slot=job.slot)
+        ExportJob.objects.filter(pk=job.pk).update(status=ExportJob.DONE)
+        assert start_export(hub_id, 'treatments', 'csv', {}).slot == job.slot
+
+    def test_unknown_resource(self, hub_id):
+        """Test unsupported resources are rejected."""
+        with pytest.raises(ValueError):
+            start_export(hub_id, 'users', 'csv', {})
+
+    def test_cleanup_removes_expired(self, hub_id, patient_record):
+        """Test expired artifacts are deleted with their job."""
+        job = start_export(hub_id, 'patient_records', 'csv', {})
+        run_export(job.pk)
+        job.refresh_from_db()
+        ExportJob.objects.filter(pk=job.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        assert cleanup_expired_exports() == 1
+        assert not os.path.exists(job.file_path)
+
+    def test_start_and_download_views(self, auth_client, hub_id, patient_record):
+        """Test the start, status and download endpoints."""
+        response = auth_client.post(reverse('patient_records:export_job_start'), {
+            'resource': 'patient_records', 'format': 'csv',
+        })
+        assert response.status_code == 200
+        job = ExportJob.objects.get(hub_id=hub_id)
+        run_export(job.pk)
+        response = auth_client.get(reverse('patient_records:export_job_status', args=[job.pk]))
+        assert b'Download' in response.content
+        response = auth_client.get(reverse('patient_records:export_job_download', args=[job.pk]))
+        assert response.status_code == 200
+        assert b'Test Patient Name' in b''.join(response.streaming_content)
+        job.refresh_from_db()
+        os.remove(job.file_path)
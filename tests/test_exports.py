@@ -0,0 +1,100 @@
+"""Tests for streaming patient_records exports."""
+import csv
+import io
+import os
+import tracemalloc
+
+import pytest
+from django.urls import reverse
+
+from patient_records import views
+from patient_records.exports import PATIENT_RECORD_EXPORT_COLUMNS, stream_csv, stream_excel
+from patient_records.models import ExportJob, PatientRecord
+from patient_records.queries import patient_records_queryset
+
+# Override with e.g. PATIENT_RECORDS_EXPORT_BENCH_ROWS=1000,100000,1000000
+BENCH_ROWS = [int(n) for n in os.environ.get('PATIENT_RECORDS_EXPORT_BENCH_ROWS', '1000,20000').split(',')]
+
+
+def _seed(hub_id, rows):
+    batch = []
+    for i in range(rows):
+        batch.append(PatientRecord(hub_id=hub_id, patient_name=f'Patient {i:07d}', allergies='Pollen, dust mites'))
+        if len(batch) == 5000:
+            PatientRecord.objects.bulk_create(batch)
+            batch = []
+    PatientRecord.objects.bulk_create(batch)
+
+
+def _csv_peak(hub_id):
+    response = stream_csv(patient_records_queryset(hub_id), PATIENT_RECORD_EXPORT_COLUMNS, 'patients.csv')
+    tracemalloc.start()
+    lines = sum(1 for _chunk in response.streaming_content)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return lines, peak
+
+
+def _excel_peak(hub_id):
+    tracemalloc.start()
+    response = stream_excel(patient_records_queryset(hub_id), PATIENT_RECORD_EXPORT_COLUMNS, 'patients.xlsx')
+    size = sum(len(chunk) for chunk in response.streaming_content)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    response.close()
+    return size, peak
+
+
+@pytest.mark.django_db
+class TestStreamingExport:
+    """Streaming export tests."""
+
+    def test_csv_respects_search_and_sort(self, auth_client, hub_id):
+        """Test CSV rows follow the active search and sort."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Beta Match')
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Alpha Match')
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Other')
+        url = reverse('patient_records:patient_records_list')
+        response = auth_client.get(url, {'export': 'csv', 'q': 'match', 'sort': 'patient_name', 'dir': 'asc'})
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert rows[0][1] == 'Patient Name'
+        assert [row[1] for row in rows[1:]] == ['Alpha Match', 'Beta Match']
+
+    def test_csv_memory_is_flat(self, hub_id):
+        """Test peak memory does not grow with the number of exported rows."""
+        peaks = []
+        seeded = 0
+        for rows in sorted(BENCH_ROWS):
+            _seed(hub_id, rows - seeded)
+            seeded = rows
+            lines, peak = _csv_peak(hub_id)
+            assert lines == rows + 1
+            peaks.append(peak)
+        assert peaks[-1] < peaks[0] * 2 + 256 * 1024
+
+    def test_excel_memory_is_flat(self, hub_id):
+        """Test the spooled workbook keeps peak memory flat as rows grow."""
+        pytest.importorskip('openpyxl')
+        peaks = []
+        seeded = 0
+        for rows in sorted(BENCH_ROWS):
+            _seed(hub_id, rows - seeded)
+            seeded = rows
+            size, peak = _excel_peak(hub_id)
+            assert size > 0
+            peaks.append(peak)
+        assert peaks[-1] < peaks[0] * 2 + 1024 * 1024
+
+    def test_large_excel_export_runs_in_background(self, auth_client, hub_id, monkeypatch):
+        """Test an Excel export over the streaming limit is queued as a job instead."""
+        monkeypatch.setattr(views, 'EXCEL_STREAM_MAX_ROWS', 1)
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Alpha')
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Beta')
+        url = reverse('patient_records:patient_records_list')
+        response = auth_client.get(url, {'export': 'excel', 'sort': 'patient_name'})
+        assert response.status_code == 200
+        assert b'prepared in the background' in response.content
+        job = ExportJob.objects.get(hub_id=hub_id)
+        assert job.export_format == 'excel'
+        assert job.params['sort_field'] == 'patient_name'
@@ -0,0 +1,126 @@
+"""Tests for bulk CSV imports."""
+import datetime
+import io
+import os
+import time
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from patient_records import stats
+from patient_records.imports import import_patient_records, import_treatments
+from patient_records.models import PatientRecord, Treatment, TreatmentDailyStat
+from patient_records.queries import patient_records_queryset
+
+# Override with e.g. PATIENT_RECORDS_IMPORT_BENCH_ROWS=100000
+BENCH_ROWS = int(os.environ.get('PATIENT_RECORDS_IMPORT_BENCH_ROWS', '5000'))
+
+
+def _csv(lines):
+    return io.BytesIO('\n'.join(lines).encode('utf-8'))
+
+
+@pytest.mark.django_db
+class TestImports:
+    """CSV import tests."""
+
+    def test_patients_with_errors(self, hub_id, django_capture_on_commit_callbacks):
+        """Test valid rows are created and invalid rows reported by line."""
+        data = _csv([
+            'Patient Name,Date Of Birth,Is Active',
+            'Ana,1980-02-03,True',
+            ',1980-02-03,True',
+            'Ben,not-a-date,False',
+            'Cy,,no',
+        ])
+        with django_capture_on_commit_callbacks(execute=True):
+            result = import_patient_records(hub_id, data)
+        assert result.created == 2
+        assert [line for line, _message in result.errors] == [3, 4]
+        assert set(PatientRecord.objects.filter(hub_id=hub_id).values_list('patient_name', flat=True)) == {'Ana', 'Cy'}
+        counts = stats.get_counts(hub_id)
+        assert counts == stats.reconcile(hub_id)
+        assert counts['active_patient_records'] == 1
+
+    def test_treatments_resolve_patients(self, hub_id):
+        """Test treatment rows link to patients by id, name and name plus birth date."""
+        ana = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        ben_1 = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ben', date_of_birth=datetime.date(1990, 1, 1))
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ben', date_of_birth=datetime.date(1991, 1, 1))
+        data = _csv([
+            'patient_id,patient_name,patient_date_of_birth,date,description',
+            f'{ana.pk},,,2026-01-05,Check-up',
+            ',ana,,2026-01-06,Follow-up',
+            ',Ben,1990-01-01,2026-01-06,Vaccine',
+            ',Ben,,2026-01-06,Ambiguous',
+            ',Nobody,,2026-01-06,Missing',
+        ])
+        result = import_treatments(hub_id, data)
+        assert result.created == 3
+        assert [line for line, _message in result.errors] == [5, 6]
+        assert Treatment.objects.filter(patient=ana).count() == 2
+        assert Treatment.objects.filter(patient=ben_1).count() == 1
+        assert sum(TreatmentDailyStat.objects.filter(hub_id=hub_id).values_list('treatment_count', flat=True)) == 3
+
+    def test_imported_rows_are_searchable(self, hub_id):
+        """Test imports update the search index."""
+        import_patient_records(hub_id, _csv(['patient_name,allergies', 'Zed,Penicillin']))
+        assert [p.patient_name for p in patient_records_queryset(hub_id, 'penicillin')] == ['Zed']
+
+    def test_latin1_file_is_reported(self, hub_id):
+        """Test a non UTF-8 file is reported as an error instead of raising."""
+        data = io.BytesIO('patient_name,allergies\nJosé,Polen\n'.encode('latin-1'))
+        result = import_patient_records(hub_id, data)
+        assert result.created == 0
+        assert [line for line, _message in result.errors] == [1]
+        assert 'UTF-8' in result.errors[0][1]
+
+    def test_latin1_after_valid_rows(self, hub_id):
+        """Test rows decoded before a Latin-1 byte are kept and the rest reported once."""
+        lines = ['patient_name'] + [f'Patient {i:04d}' for i in range(2000)]
+        data = io.BytesIO(('\n'.join(lines) + '\nJosé\n').encode('latin-1'))
+        result = import_patient_records(hub_id, data)
+        assert 0 < result.created < 2000
+        assert result.failed == 1
+        assert result.errors[0][0] == result.created + 2
+
+    def test_nul_byte_rows_are_reported(self, hub_id):
+        """Test a line with a NUL byte is reported and the other rows imported."""
+        data = io.BytesIO(b'patient_name,allergies\nAna,Polen\nB\x00en,\nCy,\n')
+        result = import_patient_records(hub_id, data)
+        assert result.created == 2
+        assert [line for line, _message in result.errors] == [3]
+        assert set(PatientRecord.objects.filter(hub_id=hub_id).values_list('patient_name', flat=True)) == {'Ana', 'Cy'}
+
+    def test_nul_byte_header_is_reported(self, hub_id):
+        """Test a header with a NUL byte stops the import with one error."""
+        result = import_patient_records(hub_id, io.BytesIO(b'patient\x00_name\nAna\n'))
+        assert result.created == 0
+        assert [line for line, _message in result.errors] == [1]
+
+    def test_upload_view_latin1(self, auth_client, hub_id):
+        """Test the import view reports an undecodable upload."""
+        upload = SimpleUploadedFile('patients.csv', 'patient_name\nJosé\n'.encode('latin-1'), content_type='text/csv')
+        response = auth_client.post(reverse('patient_records:import', args=['patient_records']), {'file': upload})
+        assert response.status_code == 200
+        assert response.context['result'].created == 0
+        assert response.context['result'].failed == 1
+
+    def test_upload_view(self, auth_client, hub_id):
+        """Test the import view reports the result."""
+        upload = SimpleUploadedFile('patients.csv', b'patient_name\nAna\nBen\n', content_type='text/csv')
+        response = auth_client.post(reverse('patient_records:import', args=['patient_records']), {'file': upload})
+        assert response.status_code == 200
+        assert response.context['result'].created == 2
+
+    def test_throughput(self, hub_id):
+        """Test a large patient file imports at 100k rows per minute or better."""
+        lines = ['patient_name,date_of_birth,allergies']
+        lines += [f'Patient {i:07d},1980-01-{1 + i % 28:02d},Pollen' for i in range(BENCH_ROWS)]
+        data = _csv(lines)
+        started = time.perf_counter()
+        result = import_patient_records(hub_id, data)
+        elapsed = time.perf_counter() - started
+        assert result.created == BENCH_ROWS
+        assert BENCH_ROWS / elapsed >= 100_000 / 60
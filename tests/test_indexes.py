@@ -0,0 +1,131 @@
+"""
+Query-plan tests for the hub-scoped list/sort indexes.
+
+The plans are taken from the list querysets the views ship
+(``patient_records_queryset`` / ``treatments_queryset``), for every indexed
+sort in both directions and for the default sort. ``SEED_ROWS`` rows are
+seeded and analyzed first; set ``PATIENT_RECORDS_INDEX_ROWS`` to check the
+plans at a larger scale.
+"""
+import datetime
+import os
+import random
+import uuid
+
+import pytest
+from django.db import connection
+
+from patient_records.models import PatientRecord, Treatment
+from patient_records.queries import (
+    PATIENT_RECORD_DEFAULT_SORT, TREATMENT_DEFAULT_SORT, patient_records_queryset, treatments_queryset,
+)
+
+SEED_ROWS = int(os.environ.get('PATIENT_RECORDS_INDEX_ROWS', 5_000))
+BATCH_SIZE = 5_000
+
+PATIENT_RECORD_INDEXES = {
+    'is_active': 'pr_patient_hub_active_idx',
+    'patient_name': 'pr_patient_hub_name_idx',
+    'date_of_birth': 'pr_patient_hub_dob_idx',
+    'gender': 'pr_patient_hub_gender_idx',
+    'blood_type': 'pr_patient_hub_blood_idx',
+    'allergies': 'pr_patient_hub_allergy_idx',
+    'created_at': 'pr_patient_hub_created_idx',
+}
+
+# 'patient' sorts on the joined patient name, which no treatment index covers.
+TREATMENT_INDEXES = {
+    'date': 'pr_treat_hub_date_idx',
+    'description': 'pr_treat_hub_desc_idx',
+    'diagnosis': 'pr_treat_hub_diag_idx',
+    'prescription': 'pr_treat_hub_presc_idx',
+    'practitioner_id': 'pr_treat_hub_pract_idx',
+    'created_at': 'pr_treat_hub_created_idx',
+}
+
+
+def _assert_ordered_by_index(qs, index_name, label):
+    """The first page of ``qs`` is read in order from ``index_name``, with no sort step for ties."""
+    plan = qs[:12].explain()
+    assert index_name in plan, f'{label}: {plan}'
+    sort_step = 'TEMP B-TREE' if connection.vendor == 'sqlite' else 'Sort'
+    assert sort_step not in plan, f'{label}: {plan}'
+
+
+def _analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def _seed_patients(hub_id, rows):
+    rng = random.Random(1)
+    other_hub = uuid.uuid4()
+    batch = []
+    for i in range(rows):
+        batch.append(PatientRecord(
+            hub_id=hub_id if i % 10 else other_hub,
+            patient_name=f'Patient {rng.randrange(rows):06d}',
+            date_of_birth=datetime.date(1940, 1, 1) + datetime.timedelta(days=rng.randrange(30000)),
+            is_active=bool(i % 3),
+            is_deleted=i % 50 == 0,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            PatientRecord.objects.bulk_create(batch)
+            batch = []
+    PatientRecord.objects.bulk_create(batch)
+
+
+def _seed_treatments(hub_id, rows):
+    rng = random.Random(2)
+    patients = [PatientRecord(hub_id=hub_id, patient_name=f'Patient {i}') for i in range(200)]
+    PatientRecord.objects.bulk_create(patients)
+    practitioners = [uuid.uuid4() for _ in range(20)]
+    batch = []
+    for i in range(rows):
+        batch.append(Treatment(
+            hub_id=hub_id,
+            patient=patients[rng.randrange(len(patients))],
+            date=datetime.date(2015, 1, 1) + datetime.timedelta(days=rng.randrange(4000)),
+            description='Routine check-up',
+            practitioner_id=rng.choice(practitioners),
+            is_deleted=i % 50 == 0,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            Treatment.objects.bulk_create(batch)
+            batch = []
+    Treatment.objects.bulk_create(batch)
+
+
+@pytest.mark.django_db
+class TestListIndexes:
+    """Every indexed list/sort path must be served by its composite index."""
+
+    def test_patient_record_sorts_use_index(self, hub_id):
+        """Test each PatientRecord list sort, and the default one, is served by its index."""
+        _seed_patients(hub_id, SEED_ROWS)
+        _analyze()
+        for sort_field, index_name in PATIENT_RECORD_INDEXES.items():
+            for sort_dir in ('asc', 'desc'):
+                qs = patient_records_queryset(hub_id, sort_field=sort_field, sort_dir=sort_dir)
+                _assert_ordered_by_index(qs, index_name, f'{sort_field} {sort_dir}')
+        default_index = PATIENT_RECORD_INDEXES[PATIENT_RECORD_DEFAULT_SORT]
+        _assert_ordered_by_index(patient_records_queryset(hub_id), default_index, 'default')
+
+    def test_treatment_sorts_use_index(self, hub_id):
+        """Test each indexed Treatment list sort, and the default one, is served by its index."""
+        _seed_treatments(hub_id, SEED_ROWS)
+        _analyze()
+        for sort_field, index_name in TREATMENT_INDEXES.items():
+            for sort_dir in ('asc', 'desc'):
+                qs = treatments_queryset(hub_id, sort_field=sort_field, sort_dir=sort_dir)
+                _assert_ordered_by_index(qs, index_name, f'{sort_field} {sort_dir}')
+        _assert_ordered_by_index(treatments_queryset(hub_id), TREATMENT_INDEXES[TREATMENT_DEFAULT_SORT], 'default')
+
+    def test_patient_timeline_uses_index(self, hub_id):
+        """Test one patient's newest-first timeline is read from the (patient, -date, -id) index."""
+        _seed_treatments(hub_id, SEED_ROWS)
+        _analyze()
+        patient_id = Treatment.objects.filter(hub_id=hub_id).values_list('patient_id', flat=True).first()
+        qs = Treatment.objects.filter(hub_id=hub_id, patient_id=patient_id, is_deleted=False).order_by('-date', '-id')[:26]
+        plan = qs.explain()
+        assert 'pr_treat_patient_date_idx' in plan, plan
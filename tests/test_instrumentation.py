@@ -0,0 +1,73 @@
+"""Tests for the per-endpoint request metrics."""
+import pytest
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from patient_records import instrumentation
+from patient_records.ai_tools import ListPatients
+from patient_records.models import PatientRecord
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+
+
+def _row(endpoint):
+    return next(row for row in instrumentation.snapshot() if row['endpoint'] == endpoint)
+
+
+@pytest.mark.django_db
+class TestInstrumentation:
+    """Instrumentation tests."""
+
+    def test_view_records_queries_and_size(self, auth_client, hub_id):
+        """Test a list request records its query count, DB time and response size."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        response = auth_client.get(reverse('patient_records:patient_records_list'))
+        row = _row('patient_records_list')
+        assert row['count'] == 1
+        assert row['errors'] == 0
+        assert row['queries']['p50'] > 0
+        assert row['bytes']['p50'] == len(response.content)
+        assert row['total_ms']['p50'] >= row['db_ms']['p50']
+
+    def test_window_percentiles(self):
+        """Test percentiles come from the rolling window while counts stay cumulative."""
+        stats = instrumentation._stats('example')
+        for value in range(instrumentation.WINDOW + 100):
+            stats.add((float(value), 0.0, float(value), 1, 10))
+        row = _row('example')
+        assert row['count'] == instrumentation.WINDOW + 100
+        assert row['window'] == instrumentation.WINDOW
+        assert row['total_ms']['p50'] == 100 + instrumentation.WINDOW // 2
+
+    def test_tool_metrics(self, hub_id):
+        """Test AI tool calls are recorded under tool:<name>."""
+        request = RequestFactory().get('/')
+        request.session = {'hub_id': str(hub_id)}
+        ListPatients().execute({}, request)
+        assert _row('tool:list_patients')['count'] == 1
+
+    def test_settings_page_lists_endpoints(self, auth_client):
+        """Test the settings page shows the recorded endpoints."""
+        auth_client.get(reverse('patient_records:dashboard'))
+        response = auth_client.get(reverse('patient_records:settings'))
+        assert response.status_code == 200
+        assert 'dashboard' in response.content.decode()
+
+    def test_prometheus_endpoint(self, auth_client, client):
+        """Test the Prometheus text output and its token access."""
+        auth_client.get(reverse('patient_records:dashboard'))
+        url = reverse('patient_records:metrics')
+        content = auth_client.get(url).content.decode()
+        assert '# TYPE patient_records_request_duration_seconds summary' in content
+        assert 'patient_records_request_queries_count{endpoint="dashboard"} 1' in content
+
+        client.logout()
+        assert client.get(url).status_code != 200
+        with override_settings(PATIENT_RECORDS_METRICS_TOKEN='secret'):
+            assert client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code != 200
+            assert client.get(url, HTTP_AUTHORIZATION='Bearer secret').status_code == 200
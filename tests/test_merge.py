@@ -0,0 +1,101 @@
+"""Tests for merging duplicate patients."""
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from patient_records import stats
+from patient_records.merge import MergeError, merge_allergies, merge_patients, undo_merge
+from patient_records.models import PatientRecord, Treatment
+
+DAY = datetime.date(2026, 1, 10)
+
+
+def test_merge_allergies():
+    """Test allergy lists are combined without repeats."""
+    assert merge_allergies(['Pollen, dust', 'pollen; Penicillin', '']) == 'Pollen, dust, Penicillin'
+
+
+@pytest.fixture
+def duplicates(db, hub_id):
+    survivor = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana Garcia', allergies='Pollen', medical_notes='Asthma')
+    losers = [
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Anna Garcia', allergies='Penicillin', medical_notes='Asthma'),
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='A. Garcia', allergies='pollen', is_active=False),
+    ]
+    Treatment.objects.create(hub_id=hub_id, patient=survivor, date=DAY, description='Own')
+    for loser in losers:
+        Treatment.objects.bulk_create([
+            Treatment(hub_id=hub_id, patient=loser, date=DAY, description=f'Visit {i}') for i in range(50)
+        ])
+    return survivor, losers
+
+
+@pytest.mark.django_db
+class TestMerge:
+    """Patient merge tests."""
+
+    def test_merge_moves_treatments_in_constant_queries(self, hub_id, duplicates):
+        """Test treatments move with set-based statements regardless of their number."""
+        survivor, losers = duplicates
+        with CaptureQueriesContext(connection) as ctx:
+            merge = merge_patients(hub_id, survivor.pk, [loser.pk for loser in losers])
+        assert len(ctx.captured_queries) < 20
+        assert merge.treatments_moved == 100
+        assert Treatment.objects.filter(patient=survivor).count() == 101
+        survivor.refresh_from_db()
+        assert survivor.allergies == 'Pollen, Penicillin'
+        assert survivor.medical_notes == 'Asthma'
+        assert not PatientRecord.objects.filter(pk__in=[loser.pk for loser in losers]).exists()
+
+    def test_undo_restores_everything(self, hub_id, duplicates, django_capture_on_commit_callbacks):
+        """Test undoing a merge puts treatments, texts and records back."""
+        survivor, losers = duplicates
+        stats.reconcile(hub_id)
+        with django_capture_on_commit_callbacks(execute=True):
+            merge = merge_patients(hub_id, survivor.pk, [loser.pk for loser in losers])
+            undo_merge(hub_id, merge.pk)
+        for loser in losers:
+            assert Treatment.objects.filter(patient=loser).count() == 50
+        survivor.refresh_from_db()
+        assert survivor.allergies == 'Pollen'
+        assert PatientRecord.objects.filter(hub_id=hub_id).count() == 3
+        assert stats.get_counts(hub_id) == stats.reconcile(hub_id)
+        with pytest.raises(MergeError):
+            undo_merge(hub_id, merge.pk)
+
+    def test_undo_keeps_texts_edited_after_merge(self, hub_id, duplicates):
+        """Test undo only reverts survivor texts that still hold the merged value."""
+        survivor, losers = duplicates
+        merge = merge_patients(hub_id, survivor.pk, [loser.pk for loser in losers])
+        survivor = PatientRecord.objects.get(pk=survivor.pk)
+        survivor.medical_notes = 'Asthma, controlled'
+        survivor.save()
+
+        merge = undo_merge(hub_id, merge.pk)
+        assert merge.kept_fields == ['medical_notes']
+        survivor = PatientRecord.objects.get(pk=survivor.pk)
+        assert survivor.allergies == 'Pollen'
+        assert survivor.medical_notes == 'Asthma, controlled'
+
+    def test_merge_requires_live_records(self, hub_id, duplicates):
+        """Test merging into a missing record fails without changes."""
+        survivor, losers = duplicates
+        losers[0].is_deleted = True
+        losers[0].save()
+        with pytest.raises(MergeError):
+            merge_patients(hub_id, survivor.pk, [loser.pk for loser in losers])
+        assert Treatment.objects.filter(patient=losers[1]).count() == 50
+
+    def test_merge_view(self, auth_client, duplicates):
+        """Test the merge page lists the selection and merges on POST."""
+        survivor, losers = duplicates
+        ids = ','.join(str(patient.pk) for patient in [survivor, *losers])
+        url = reverse('patient_records:patient_records_merge')
+        response = auth_client.get(url, {'ids': ids})
+        assert response.status_code == 200
+        assert len(response.context['patients']) == 3
+        response = auth_client.post(url, {'ids': ids, 'survivor': str(survivor.pk)})
+        assert response.context['merge'].treatments_moved == 100
@@ -0,0 +1,182 @@
+"""Tests for keyset (cursor) pagination."""
+import base64
+import datetime
+import json
+
+import pytest
+from django.urls import reverse
+
+from patient_records.models import PatientRecord, Treatment
+from patient_records.pagination import decode_cursor, encode_cursor, paginate_keyset
+from patient_records.queries import treatments_queryset
+from patient_records.views import PATIENT_RECORD_SORT_FIELDS
+
+
+@pytest.fixture
+def patients(db, hub_id):
+    """Patients with duplicate and NULL sort values."""
+    rows = []
+    for i in range(23):
+        rows.append(PatientRecord.objects.create(
+            hub_id=hub_id,
+            patient_name=f'Patient {i % 7}',
+            date_of_birth=None if i % 4 == 0 else datetime.date(1980, 1, 1 + i % 5),
+            gender=['f', 'm', ''][i % 3],
+            is_active=bool(i % 2),
+        ))
+    return rows
+
+
+def _token(**payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def _walk(qs, column, sort_key, sort_dir, per_page):
+    pages = []
+    cursor = None
+    while True:
+        page = paginate_keyset(qs, column, sort_key, sort_dir, cursor, per_page)
+        pages.append([row.pk for row in page])
+        if not page.has_next:
+            return pages, page
+        cursor = page.next_cursor
+
+
+def test_cursor_round_trip():
+    """Test cursor tokens decode to their payload."""
+    token = encode_cursor('date_of_birth', 'asc', datetime.date(2000, 1, 2), 'abc', 'next')
+    assert decode_cursor(token) == {'s': 'date_of_birth', 'd': 'asc', 'v': '2000-01-02', 'k': 'abc', 'p': 'next'}
+
+
+def test_malformed_cursor_is_ignored():
+    """Test garbage tokens decode to None."""
+    assert decode_cursor('not-a-cursor!') is None
+    assert decode_cursor('') is None
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    """Keyset pagination tests."""
+
+    @pytest.mark.parametrize('sort_key', list(PATIENT_RECORD_SORT_FIELDS))
+    @pytest.mark.parametrize('sort_dir', ['asc', 'desc'])
+    def test_forward_walk_matches_full_ordering(self, hub_id, patients, sort_key, sort_dir):
+        """Test walking every page forwards yields each row once, in order."""
+        column = PATIENT_RECORD_SORT_FIELDS[sort_key]
+        qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+        expected = [row.pk for row in paginate_keyset(qs, column, sort_key, sort_dir, None, 1000)]
+        pages, _last = _walk(qs, column, sort_key, sort_dir, 5)
+        assert [pk for page in pages for pk in page] == expected
+        assert len(expected) == len(patients)
+
+    @pytest.mark.parametrize('sort_key', ['date_of_birth', 'patient_name'])
+    @pytest.mark.parametrize('sort_dir', ['asc', 'desc'])
+    def test_backward_walk(self, hub_id, patients, sort_key, sort_dir):
+        """Test previous cursors return the preceding pages."""
+        column = PATIENT_RECORD_SORT_FIELDS[sort_key]
+        qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+        pages, page = _walk(qs, column, sort_key, sort_dir, 5)
+        for expected in reversed(pages[:-1]):
+            page = paginate_keyset(qs, column, sort_key, sort_dir, page.previous_cursor, 5)
+            assert [row.pk for row in page] == expected
+        assert not page.has_previous
+
+    @pytest.mark.parametrize('sort_dir', ['asc', 'desc'])
+    def test_treatments_by_patient_name(self, hub_id, patients, sort_dir):
+        """Test treatments page through the joined patient name, ties broken by id."""
+        for patient in patients:
+            Treatment.objects.create(hub_id=hub_id, patient=patient, date=datetime.date(2026, 1, 1))
+        qs = treatments_queryset(hub_id, sort_field='patient', sort_dir=sort_dir)
+        expected = [row.pk for row in qs]
+        pages, _last = _walk(qs, 'patient__patient_name', 'patient', sort_dir, 5)
+        assert [pk for page in pages for pk in page] == expected
+        names = [Treatment.objects.get(pk=pk).patient.patient_name for pk in expected]
+        assert names == sorted(names, reverse=sort_dir == 'desc')
+
+    def test_cursor_for_other_sort_restarts(self, hub_id, patients):
+        """Test a cursor bound to another sort is ignored."""
+        qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+        first = paginate_keyset(qs, 'patient_name', 'patient_name', 'asc', None, 5)
+        other = paginate_keyset(qs, 'created_at', 'created_at', 'asc', first.next_cursor, 5)
+        assert not other.has_previous
+
+    @pytest.mark.parametrize('direction', ['next', 'prev'])
+    @pytest.mark.parametrize('tampered', [
+        {'v': {'year': 1980}},
+        {'v': [1980, 1, 1]},
+        {'v': '1980-13-45'},
+        {'k': ['not', 'a', 'uuid']},
+        {'k': 'not-a-uuid'},
+        {'k': None},
+    ])
+    def test_tampered_cursor_restarts(self, hub_id, patients, direction, tampered):
+        """Test a cursor with an invalid value or id returns the first page."""
+        qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+        first = paginate_keyset(qs, 'date_of_birth', 'date_of_birth', 'asc', None, 5)
+        payload = {'s': 'date_of_birth', 'd': 'asc', 'v': '1980-01-02', 'k': str(patients[0].pk), 'p': direction}
+        cursor = _token(**{**payload, **tampered})
+        page = paginate_keyset(qs, 'date_of_birth', 'date_of_birth', 'asc', cursor, 5)
+        assert [row.pk for row in page] == [row.pk for row in first]
+        assert not page.has_previous
+
+    @pytest.mark.parametrize('cursor', [
+        _token(s='patient_name', d='asc', v='Patient 1', k='00000000-0000-0000-0000-000000000000', p='sideways'),
+        _token(s='patient_name', d='asc', v='Patient 1', k='00000000-0000-0000-0000-000000000000', p=['prev']),
+        _token(s='patient_name', d='asc', v='Patient 1', k='00000000-0000-0000-0000-000000000000'),
+        _token(s='patient_name', d='sideways', v='Patient 1', k='00000000-0000-0000-0000-000000000000', p='prev'),
+        _token(s=['patient_name'], d='asc', v='Patient 1', k='00000000-0000-0000-0000-000000000000', p='prev'),
+        'not-a-cursor!',
+        _token(),
+    ])
+    def test_malformed_cursor_restarts(self, hub_id, patients, cursor):
+        """Test a malformed prev/next cursor returns the first page, unreversed."""
+        qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+        first = paginate_keyset(qs, 'patient_name', 'patient_name', 'asc', None, 5)
+        page = paginate_keyset(qs, 'patient_name', 'patient_name', 'asc', cursor, 5)
+        assert [row.pk for row in page] == [row.pk for row in first]
+        assert not page.has_previous
+        assert page.has_next
+
+    def test_list_view_tampered_cursor(self, auth_client, patients):
+        """Test the list view ignores a cursor it cannot decode into a position."""
+        url = reverse('patient_records:patient_records_list')
+        cursor = _token(s='date_of_birth', d='asc', v={'year': 1980}, k=[1], p='prev')
+        response = auth_client.get(url, {'paginate': 'cursor', 'sort': 'date_of_birth', 'cursor': cursor})
+        assert response.status_code == 200
+
+    def test_list_view_cursor_mode(self, auth_client, patients):
+        """Test the list view renders in cursor mode without a total."""
+        url = reverse('patient_records:patient_records_list')
+        response = auth_client.get(url, {'paginate': 'cursor', 'sort': 'patient_name', 'per_page': 12})
+        assert response.status_code == 200
+        assert b'cursor=' in response.content
+        assert b'Showing' not in response.content
+
+
+@pytest.mark.django_db
+class TestInfiniteScroll:
+    """"All" rows mode loads keyset chunks instead of the whole table."""
+
+    def test_all_streams_chunks(self, auth_client, hub_id):
+        """Test per_page=0 renders one chunk plus a revealed trigger, and the trigger loads the rest."""
+        from patient_records.views import SCROLL_CHUNK_SIZE
+        PatientRecord.objects.bulk_create([
+            PatientRecord(hub_id=hub_id, patient_name=f'Patient {i:03d}') for i in range(SCROLL_CHUNK_SIZE + 10)
+        ])
+        url = reverse('patient_records:patient_records_list')
+        params = {'per_page': 0, 'sort': 'patient_name'}
+        response = auth_client.get(url, params, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        content = response.content.decode()
+        assert content.count('data-id=') == SCROLL_CHUNK_SIZE
+        assert 'id="patient_records-more"' in content
+        assert 'hx-trigger="revealed"' in content
+        assert "toggleAll(['" not in content
+
+        cursor = response.context['page_obj'].next_cursor
+        response = auth_client.get(
+            url, {**params, 'cursor': cursor}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='patient_records-more',
+        )
+        content = response.content.decode()
+        assert content.count('data-id=') == 10
+        assert '<thead' not in content
+        assert 'patient_records-more' not in content
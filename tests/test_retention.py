@@ -0,0 +1,110 @@
+"""Tests for the retention purge of soft-deleted rows."""
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from patient_records import archive, retention
+from patient_records.models import (
+    ArchivedPatientRecord, ArchivedTreatment, PatientRecord, PatientRecordsSettings, Treatment,
+)
+
+LATER = timezone.now() + datetime.timedelta(days=400)
+
+
+def _patient(hub_id, name, treatments=0):
+    patient = PatientRecord.objects.create(hub_id=hub_id, patient_name=name)
+    for i in range(treatments):
+        Treatment.objects.create(hub_id=hub_id, patient=patient, date='2025-01-01', description=f'Visit {i}')
+    return patient
+
+
+def _delete(obj):
+    obj.is_deleted = True
+    obj.deleted_at = timezone.now()
+    obj.save()
+
+
+@pytest.fixture
+def deleted_rows(db, hub_id):
+    """A deleted patient with deleted visits, a deleted patient with a live visit and a live patient."""
+    gone = _patient(hub_id, 'Gone', treatments=2)
+    for treatment in Treatment.objects.filter(patient=gone):
+        _delete(treatment)
+    _delete(gone)
+    kept = _patient(hub_id, 'Kept', treatments=1)
+    _delete(kept)
+    live = _patient(hub_id, 'Live', treatments=3)
+    _delete(Treatment.objects.filter(patient=live).first())
+    return gone, kept, live
+
+
+@pytest.mark.django_db
+class TestPurge:
+    """Retention purge tests."""
+
+    def test_purge(self, hub_id, deleted_rows):
+        """Test expired deleted rows are removed and patients with remaining treatments stay."""
+        gone, kept, live = deleted_rows
+        report = retention.purge_hub(hub_id, 365, now=LATER, batch_size=1, pause=0)
+        assert report == {
+            'treatments': 3, 'patient_records': 1, 'archived_treatments': 0, 'archived_patient_records': 0,
+        }
+        assert set(PatientRecord.all_objects.filter(hub_id=hub_id)) == {kept, live}
+        assert Treatment.all_objects.filter(hub_id=hub_id).count() == 3
+        assert Treatment.objects.filter(hub_id=hub_id).count() == 3
+
+    def test_recent_deletions_stay(self, hub_id, deleted_rows):
+        """Test rows deleted within the retention period are kept."""
+        report = retention.purge_hub(hub_id, 365, pause=0)
+        assert sum(report.values()) == 0
+        assert PatientRecord.all_objects.filter(hub_id=hub_id).count() == 3
+
+    def test_dry_run(self, hub_id, deleted_rows):
+        """Test a dry run reports what a real run removes, and removes nothing."""
+        dry = retention.purge_hub(hub_id, 365, dry_run=True, now=LATER)
+        assert PatientRecord.all_objects.filter(hub_id=hub_id).count() == 3
+        assert Treatment.all_objects.filter(hub_id=hub_id).count() == 6
+        assert dry == retention.purge_hub(hub_id, 365, now=LATER, pause=0)
+
+    def test_archived_rows(self, hub_id, deleted_rows):
+        """Test archived deleted patients are purged with their archived treatments."""
+        gone, _kept, _live = deleted_rows
+        archive.archive_hub(hub_id, now=timezone.now() + datetime.timedelta(days=100))
+        assert ArchivedPatientRecord.objects.filter(pk=gone.pk).exists()
+        report = retention.purge_hub(hub_id, 365, now=LATER, pause=0)
+        assert report['archived_patient_records'] == 2
+        assert report['archived_treatments'] == 4
+        assert not ArchivedPatientRecord.objects.exists()
+        assert not ArchivedTreatment.objects.exists()
+
+    def test_command(self, hub_id, deleted_rows):
+        """Test the command applies the hub setting and supports dry runs."""
+        PatientRecordsSettings.objects.create(hub_id=hub_id, retention_days=30)
+        out = io.StringIO()
+        call_command('purge_deleted_records', '--dry-run', stdout=out)
+        assert 'would remove 0 treatments' in out.getvalue()
+        assert PatientRecord.all_objects.filter(hub_id=hub_id).count() == 3
+
+
+@pytest.mark.django_db
+class TestRetentionSettings:
+    """Retention settings page tests."""
+
+    def test_save_and_preview(self, auth_client, hub_id, deleted_rows):
+        """Test the retention period is saved, previewed and validated."""
+        url = reverse('patient_records:settings')
+        auth_client.post(url, {'retention_days': '90', 'action': 'save'})
+        assert PatientRecordsSettings.for_hub(hub_id).retention_days == 90
+
+        response = auth_client.post(url, {'retention_days': '90', 'action': 'preview'})
+        assert 'next purge would remove' in response.content.decode()
+
+        auth_client.post(url, {'retention_days': '1', 'action': 'save'})
+        assert PatientRecordsSettings.for_hub(hub_id).retention_days == 90
+
+        auth_client.post(url, {'retention_days': '', 'action': 'save'})
+        assert PatientRecordsSettings.for_hub(hub_id).retention_days is None
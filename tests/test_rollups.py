@@ -0,0 +1,84 @@
+"""Tests for the pre-aggregated treatment rollups."""
+import datetime
+import uuid
+
+import pytest
+from django.urls import reverse
+
+from patient_records import rollups
+from patient_records.models import PatientRecord, Treatment, TreatmentDailyStat
+
+DAY = datetime.date(2026, 3, 2)
+
+
+def _counts(hub_id):
+    return {
+        (row.day, row.practitioner_id): row.treatment_count
+        for row in TreatmentDailyStat.objects.filter(hub_id=hub_id, treatment_count__gt=0)
+    }
+
+
+@pytest.fixture
+def patient(db, hub_id):
+    return PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+
+
+@pytest.mark.django_db
+class TestTreatmentRollups:
+    """Treatment rollup tests."""
+
+    def test_create_move_and_delete(self, hub_id, patient):
+        """Test rollups follow creates, date/practitioner changes and soft deletes."""
+        practitioner = uuid.uuid4()
+        treatment = Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY)
+        assert _counts(hub_id) == {(DAY, rollups.UNASSIGNED): 1}
+
+        treatment = Treatment.objects.get(pk=treatment.pk)
+        treatment.date = DAY + datetime.timedelta(days=1)
+        treatment.practitioner_id = practitioner
+        treatment.save()
+        assert _counts(hub_id) == {(DAY + datetime.timedelta(days=1), practitioner): 1}
+
+        treatment.is_deleted = True
+        treatment.save(update_fields=['is_deleted', 'updated_at'])
+        assert _counts(hub_id) == {}
+
+    def test_deferred_save_applies_deltas(self, hub_id, patient, monkeypatch):
+        """Test saving a treatment loaded without its tracked fields moves its rollup without a rebuild."""
+        treatment = Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY)
+        monkeypatch.setattr(rollups, 'rebuild', lambda hub_id: pytest.fail('rollups rebuilt on save'))
+
+        treatment = Treatment.objects.only('id', 'hub_id', 'patient').get(pk=treatment.pk)
+        treatment.date = DAY + datetime.timedelta(days=1)
+        treatment.save()
+        assert _counts(hub_id) == {(DAY + datetime.timedelta(days=1), rollups.UNASSIGNED): 1}
+
+    def test_bulk_delete(self, auth_client, hub_id, patient):
+        """Test the bulk delete path removes the deleted rows from the rollups."""
+        treatments = [Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY) for _ in range(3)]
+        url = reverse('patient_records:treatments_bulk_action')
+        auth_client.post(url, {'ids': f'{treatments[0].pk},{treatments[1].pk}', 'action': 'delete'})
+        assert _counts(hub_id) == {(DAY, rollups.UNASSIGNED): 1}
+
+    def test_rebuild_matches_incremental(self, hub_id, patient):
+        """Test a rebuild reproduces the incrementally maintained rows."""
+        for offset in range(5):
+            Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY + datetime.timedelta(days=offset % 2))
+        incremental = _counts(hub_id)
+        TreatmentDailyStat.objects.filter(hub_id=hub_id).update(treatment_count=0)
+        rollups.rebuild(hub_id)
+        assert _counts(hub_id) == incremental
+
+    def test_series_are_zero_filled(self, hub_id, patient):
+        """Test daily and monthly series cover the whole range."""
+        Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY)
+        daily = rollups.daily_series(hub_id, DAY - datetime.timedelta(days=2), DAY)
+        assert daily == [(DAY - datetime.timedelta(days=2), 0), (DAY - datetime.timedelta(days=1), 0), (DAY, 1)]
+        monthly = rollups.monthly_series(hub_id, datetime.date(2026, 1, 15), DAY)
+        assert monthly == [(datetime.date(2026, 1, 1), 0), (datetime.date(2026, 2, 1), 0), (datetime.date(2026, 3, 1), 1)]
+
+    def test_dashboard_renders_ranges(self, auth_client):
+        """Test the dashboard accepts each range."""
+        url = reverse('patient_records:dashboard')
+        for days in (7, 365, 'bogus'):
+            assert auth_client.get(url, {'days': days}).status_code == 200
@@ -0,0 +1,73 @@
+"""Tests for the datatable row fragment cache."""
+import pytest
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+
+from patient_records import writes
+from patient_records.models import PatientRecord, Treatment
+
+FRAGMENT_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'row-cache-tests'},
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'row-fragments'},
+}
+
+
+@pytest.fixture
+def row_cache():
+    with override_settings(CACHES=FRAGMENT_CACHES):
+        caches['template_fragments'].clear()
+        yield caches['template_fragments']
+        caches['template_fragments'].clear()
+
+
+def _list(client, url, per_page=96):
+    response = client.get(url, {'per_page': per_page}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+    assert response.status_code == 200
+    return response.content.decode()
+
+
+@pytest.mark.django_db
+class TestRowCache:
+    """Row fragment cache tests."""
+
+    def test_rows_follow_updated_at(self, auth_client, hub_id, row_cache):
+        """Test a cached row is reused until the record's updated_at changes."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        url = reverse('patient_records:patient_records_list')
+        assert 'Ana' in _list(auth_client, url)
+
+        PatientRecord.objects.filter(pk=patient.pk).update(patient_name='Ana Silent')
+        assert 'Ana Silent' not in _list(auth_client, url)
+
+        patient.patient_name = 'Ana Saved'
+        patient.save()
+        assert 'Ana Saved' in _list(auth_client, url)
+
+    def test_treatment_rows_follow_patient_name(self, auth_client, hub_id, row_cache):
+        """Test renaming a patient refreshes the cached treatment rows that show the name."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        Treatment.objects.create(hub_id=hub_id, patient=patient, date='2026-05-01', description='Visit')
+        url = reverse('patient_records:treatments_list')
+        assert 'Ana' in _list(auth_client, url)
+        patient.patient_name = 'Beatriz'
+        patient.save()
+        assert 'Beatriz' in _list(auth_client, url)
+
+    def test_row_urls(self, auth_client, hub_id, row_cache):
+        """Test row links built from the per-response prefixes match the URL conf."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        content = _list(auth_client, reverse('patient_records:patient_records_list'))
+        for name in ('patient_record_detail', 'patient_record_edit', 'patient_record_delete', 'patient_record_toggle_status'):
+            assert reverse(f'patient_records:{name}', args=[patient.pk]) in content
+
+    def test_warm_page_matches_cold(self, auth_client, hub_id, row_cache):
+        """Test a 96-row page renders every row both cold and from the row cache."""
+        writes.create_patient_records(hub_id, [
+            PatientRecord(hub_id=hub_id, patient_name=f'Patient {i}', allergies='Penicillin') for i in range(96)
+        ])
+        url = reverse('patient_records:patient_records_list')
+        for _render in ('cold', 'warm'):
+            content = _list(auth_client, url)
+            assert content.count('Penicillin') == 96
+            assert 'Patient 95' in content
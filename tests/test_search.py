@@ -0,0 +1,97 @@
+"""Tests for the patient_records full-text search backends."""
+import uuid
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from patient_records.models import PatientRecord, Treatment
+from patient_records.search import get_search_backend, search_terms
+
+
+def _search(model, hub_id, query):
+    qs = model.objects.filter(hub_id=hub_id, is_deleted=False)
+    return list(get_search_backend().search(qs, query).order_by('-search_rank'))
+
+
+def test_search_terms():
+    """Test query tokenisation drops punctuation."""
+    assert search_terms('  Penicillin, (severe)! ') == ['penicillin', 'severe']
+
+
+@pytest.mark.django_db
+class TestSearchBackend:
+    """Search backend tests."""
+
+    def test_finds_patient_by_allergy(self, hub_id):
+        """Test matching on a non-name column."""
+        match = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana Ruiz', allergies='Penicillin')
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Luis Gil', allergies='None known')
+        assert _search(PatientRecord, hub_id, 'penicillin') == [match]
+
+    def test_partial_name(self, hub_id):
+        """Test prefix matching on patient names."""
+        match = PatientRecord.objects.create(hub_id=hub_id, patient_name='Margarita Sanchez')
+        assert _search(PatientRecord, hub_id, 'marga') == [match]
+
+    def test_ranks_name_matches_first(self, hub_id):
+        """Test a name hit outranks a hit in allergies."""
+        allergy = PatientRecord.objects.create(hub_id=hub_id, patient_name='Luis Gil', allergies='Latex')
+        name = PatientRecord.objects.create(hub_id=hub_id, patient_name='Latex Moreno')
+        assert _search(PatientRecord, hub_id, 'latex') == [name, allergy]
+
+    def test_index_follows_save(self, hub_id):
+        """Test edits are reindexed through the save signal."""
+        treatment = Treatment.objects.create(
+            hub_id=hub_id, date=timezone.now().date(), description='Dental cleaning',
+        )
+        assert _search(Treatment, hub_id, 'cleaning') == [treatment]
+        treatment.description = 'Root canal'
+        treatment.save()
+        assert _search(Treatment, hub_id, 'cleaning') == []
+        assert _search(Treatment, hub_id, 'canal') == [treatment]
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite', reason='SQLite FTS5 only')
+    def test_fts_rows_keyed_on_id(self, hub_id):
+        """Test FTS rows follow the record id even when its rowid changes."""
+        patient = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana Ruiz')
+        table = PatientRecord._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {table} SET rowid = rowid + 1000 WHERE id = %s', [patient.pk.hex])
+        assert _search(PatientRecord, hub_id, 'ruiz') == [patient]
+        patient.patient_name = 'Ana Moreno'
+        patient.save()
+        assert _search(PatientRecord, hub_id, 'ruiz') == []
+        assert _search(PatientRecord, hub_id, 'moreno') == [patient]
+
+    def test_scoped_to_queryset(self, hub_id):
+        """Test matches from other hubs are excluded."""
+        PatientRecord.objects.create(hub_id=uuid.uuid4(), patient_name='Other Hub')
+        assert _search(PatientRecord, hub_id, 'other') == []
+
+
+@pytest.mark.django_db
+class TestSearchViews:
+    """List views route ``q`` through the search backend."""
+
+    def test_patient_list_search(self, auth_client, hub_id):
+        """Test patient list returns only matching rows."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Findable Person')
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Hidden Person')
+        url = reverse('patient_records:patient_records_list')
+        response = auth_client.get(url, {'q': 'findable'})
+        assert response.status_code == 200
+        assert b'Findable Person' in response.content
+        assert b'Hidden Person' not in response.content
+
+    def test_search_without_sort_orders_by_relevance(self, auth_client, hub_id):
+        """Test a search with no chosen sort lists the best matches first."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Aaron Gil', allergies='Latex')
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Latex Moreno')
+        url = reverse('patient_records:patient_records_list')
+        response = auth_client.get(
+            url, {'q': 'latex', 'sort': '', 'dir': 'asc'}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body',
+        )
+        content = response.content.decode()
+        assert content.index('Latex Moreno') < content.index('Aaron Gil')
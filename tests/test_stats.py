@@ -0,0 +1,64 @@
+"""Tests for the cached dashboard counters."""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from patient_records import stats
+from patient_records.models import PatientRecord
+
+
+@pytest.mark.django_db
+class TestCounters:
+    """Dashboard counter tests."""
+
+    def test_counts_follow_create_and_soft_delete(self, hub_id, django_capture_on_commit_callbacks):
+        """Test counters move with saves without recounting."""
+        assert stats.get_counts(hub_id)['patient_records'] == 0
+        with django_capture_on_commit_callbacks(execute=True):
+            record = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        assert stats.get_counts(hub_id)['patient_records'] == 1
+        with django_capture_on_commit_callbacks(execute=True):
+            record.is_deleted = True
+            record.deleted_at = timezone.now()
+            record.save()
+        with CaptureQueriesContext(connection) as ctx:
+            assert stats.get_counts(hub_id)['patient_records'] == 0
+        assert len(ctx.captured_queries) == 0
+
+    def test_bulk_delete_adjusts(self, auth_client, hub_id, django_capture_on_commit_callbacks):
+        """Test the bulk delete path decrements by the rows it updated."""
+        records = [PatientRecord.objects.create(hub_id=hub_id, patient_name=f'P{i}') for i in range(3)]
+        stats.reconcile(hub_id)
+        url = reverse('patient_records:patient_records_bulk_action')
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.post(url, {'ids': f'{records[0].pk},{records[1].pk}', 'action': 'delete'})
+        assert stats.get_counts(hub_id)['patient_records'] == 1
+
+    def test_reconcile_repairs_drift(self, hub_id):
+        """Test a recount replaces stale values."""
+        PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+        stats.reconcile(hub_id)
+        PatientRecord.objects.filter(hub_id=hub_id).update(is_deleted=True)
+        assert stats.reconcile(hub_id)['patient_records'] == 0
+
+    def test_dashboard_uses_cache(self, auth_client, hub_id, patient_record):
+        """Test the dashboard shows cached totals."""
+        stats.reconcile(hub_id)
+        response = auth_client.get(reverse('patient_records:dashboard'))
+        assert response.status_code == 200
+        assert response.context['total_patient_records'] == 1
+
+    def test_bulk_deactivate_adjusts_active(self, auth_client, hub_id, django_capture_on_commit_callbacks):
+        """Test bulk activate/deactivate only count rows whose state changed."""
+        records = [PatientRecord.objects.create(hub_id=hub_id, patient_name=f'P{i}') for i in range(3)]
+        stats.reconcile(hub_id)
+        url = reverse('patient_records:patient_records_bulk_action')
+        ids = f'{records[0].pk},{records[1].pk}'
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.post(url, {'ids': ids, 'action': 'deactivate'})
+            auth_client.post(url, {'ids': ids, 'action': 'deactivate'})
+        counts = stats.get_counts(hub_id)
+        assert counts['active_patient_records'] == 1
+        assert counts == stats.reconcile(hub_id)
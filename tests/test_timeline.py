@@ -0,0 +1,105 @@
+"""Tests for the patient timeline and visit summary."""
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from patient_records import visits
+from patient_records.models import PatientRecord, Treatment
+
+DAY = datetime.date(2026, 2, 1)
+
+
+def _summary(patient):
+    patient.refresh_from_db(fields=['visit_count', 'last_visit_date'])
+    return patient.visit_count, patient.last_visit_date
+
+
+@pytest.fixture
+def patient(db, hub_id):
+    return PatientRecord.objects.create(hub_id=hub_id, patient_name='Ana')
+
+
+def _seed(hub_id, patient, rows):
+    Treatment.objects.bulk_create([
+        Treatment(hub_id=hub_id, patient=patient, date=DAY - datetime.timedelta(days=i % 400), description=f'Visit {i}')
+        for i in range(rows)
+    ])
+    visits.refresh([patient.pk])
+
+
+@pytest.mark.django_db
+class TestVisitSummary:
+    """Visit summary tests."""
+
+    def test_summary_follows_treatment_writes(self, hub_id, patient):
+        """Test create, date change, move and delete update the summary."""
+        other = PatientRecord.objects.create(hub_id=hub_id, patient_name='Ben')
+        treatment = Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY, description='First')
+        assert _summary(patient) == (1, DAY)
+
+        treatment = Treatment.objects.get(pk=treatment.pk)
+        treatment.date = DAY + datetime.timedelta(days=3)
+        treatment.save()
+        assert _summary(patient) == (1, DAY + datetime.timedelta(days=3))
+
+        treatment.patient = other
+        treatment.save()
+        assert _summary(patient) == (0, None)
+        assert _summary(other) == (1, DAY + datetime.timedelta(days=3))
+
+        treatment.is_deleted = True
+        treatment.save(update_fields=['is_deleted', 'updated_at'])
+        assert _summary(other) == (0, None)
+
+    def test_patient_save_keeps_summary(self, hub_id, patient):
+        """Test saving a stale patient instance does not overwrite the summary."""
+        stale = PatientRecord.objects.get(pk=patient.pk)
+        Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY, description='Visit')
+        stale.gender = 'f'
+        stale.save()
+        assert _summary(patient) == (1, DAY)
+
+    def test_bulk_delete_refreshes(self, auth_client, hub_id, patient):
+        """Test the bulk delete path refreshes the affected patients."""
+        treatments = [Treatment.objects.create(hub_id=hub_id, patient=patient, date=DAY, description='Visit') for _ in range(3)]
+        url = reverse('patient_records:treatments_bulk_action')
+        auth_client.post(url, {'ids': f'{treatments[0].pk},{treatments[1].pk}', 'action': 'delete'})
+        assert _summary(patient) == (1, DAY)
+
+
+@pytest.mark.django_db
+class TestTimeline:
+    """Patient timeline view tests."""
+
+    def _get(self, client, patient, **params):
+        url = reverse('patient_records:patient_record_detail', args=[patient.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url, params, HTTP_HX_REQUEST='true')
+        assert response.status_code == 200
+        return len(ctx.captured_queries), response
+
+    def test_query_count_independent_of_history(self, auth_client, hub_id, patient):
+        """Test the page issues the same queries for short and long histories."""
+        _seed(hub_id, patient, 5)
+        short, _response = self._get(auth_client, patient)
+        _seed(hub_id, patient, 3000)
+        long, response = self._get(auth_client, patient)
+        assert short == long
+        assert response.context['obj'].visit_count == 3005
+
+    def test_keyset_walk_is_newest_first(self, auth_client, hub_id, patient):
+        """Test following the cursors lists every treatment once, newest first."""
+        _seed(hub_id, patient, 60)
+        seen = []
+        _count, response = self._get(auth_client, patient)
+        page = response.context['page_obj']
+        seen += [(t.date, t.pk) for t in page]
+        while page.has_next:
+            _count, response = self._get(auth_client, patient, cursor=page.next_cursor)
+            page = response.context['page_obj']
+            seen += [(t.date, t.pk) for t in page]
+        assert len(seen) == 60
+        assert seen == sorted(seen, reverse=True)
@@ -1,6 +1,11 @@
 """Tests for patient_records views."""
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from patient_records.models import PatientRecord, Treatment
 
 
 @pytest.mark.django_db
@@ -165,6 +170,15 @@ class TestTreatmentViews:
         response = auth_client.get(url, {'sort': 'created_at', 'dir': 'desc'})
         assert response.status_code == 200
 
+    def test_list_defaults_to_newest_first(self, auth_client, hub_id):
+        """Test the treatment list without a chosen sort shows the newest treatments first."""
+        Treatment.objects.create(hub_id=hub_id, date='2026-01-01', description='Older visit')
+        Treatment.objects.create(hub_id=hub_id, date='2026-02-01', description='Newer visit')
+        url = reverse('patient_records:treatments_list')
+        response = auth_client.get(url, {'sort': ''}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        content = response.content.decode()
+        assert content.index('Newer visit') < content.index('Older visit')
+
     def test_export_csv(self, auth_client):
         """Test CSV export."""
         url = reverse('patient_records:treatments_list')
@@ -237,6 +251,85 @@ class TestTreatmentViews:
         assert response.status_code == 302
 
 
+@pytest.mark.django_db
+class TestListQueryCounts:
+    """List views issue a constant number of queries per page."""
+
+    def _count(self, client, url, per_page):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url, {'per_page': per_page}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        assert response.status_code == 200
+        return len(ctx.captured_queries), response
+
+    def test_treatments_list_query_count(self, auth_client, hub_id):
+        """Test treatment rows do not query their patient one by one."""
+        patients = [PatientRecord.objects.create(hub_id=hub_id, patient_name=f'Patient {i}') for i in range(10)]
+        for i in range(100):
+            Treatment.objects.create(
+                hub_id=hub_id, patient=patients[i % 10], date=timezone.now().date(), description='Visit',
+            )
+        url = reverse('patient_records:treatments_list')
+        small, _response = self._count(auth_client, url, 12)
+        large, response = self._count(auth_client, url, 96)
+        assert small == large
+        assert b'Patient 3' in response.content
+
+    def test_patient_records_list_query_count(self, auth_client, hub_id):
+        """Test patient rows render without deferred-field queries."""
+        for i in range(100):
+            PatientRecord.objects.create(hub_id=hub_id, patient_name=f'Patient {i}', medical_notes='x' * 500)
+        url = reverse('patient_records:patient_records_list')
+        small, _response = self._count(auth_client, url, 12)
+        large, _response = self._count(auth_client, url, 96)
+        assert small == large
+
+
+@pytest.mark.django_db
+class TestRowSwaps:
+    """Mutations return only the affected rows."""
+
+    def test_toggle_returns_single_row(self, auth_client, patient_record):
+        """Test toggling renders just the toggled row."""
+        url = reverse('patient_records:patient_record_toggle_status', args=[patient_record.pk])
+        response = auth_client.post(url, HTTP_HX_REQUEST='true')
+        assert response.status_code == 200
+        assert response.content.count(b'<tr ') == 1
+        assert f'id="patient_record-row-{patient_record.pk}"'.encode() in response.content
+        assert b'datatable-footer' not in response.content
+
+    def test_panel_edit_returns_oob_row(self, auth_client, patient_record):
+        """Test a panel edit swaps the edited row out of band."""
+        url = reverse('patient_records:patient_record_edit', args=[patient_record.pk])
+        response = auth_client.post(url, {'patient_name': 'Renamed'}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='edit-patient_record-form')
+        assert b'hx-swap-oob="true"' in response.content
+        assert b'Renamed' in response.content
+
+    def test_page_edit_redirects(self, auth_client, patient_record):
+        """Test the full-page edit form returns to the list."""
+        url = reverse('patient_records:patient_record_edit', args=[patient_record.pk])
+        response = auth_client.post(url, {'patient_name': 'Renamed'}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='main-content-area')
+        assert response.status_code == 204
+        assert response['HX-Redirect'] == reverse('patient_records:patient_records_list')
+
+    def test_delete_returns_empty(self, auth_client, treatment):
+        """Test deleting returns an empty body for the row swap."""
+        url = reverse('patient_records:treatment_delete', args=[treatment.pk])
+        response = auth_client.post(url, HTTP_HX_REQUEST='true')
+        assert response.status_code == 200
+        assert response.content == b''
+
+    def test_bulk_actions_return_affected_rows(self, auth_client, hub_id):
+        """Test bulk actions only render the selected rows."""
+        records = [PatientRecord.objects.create(hub_id=hub_id, patient_name=f'P{i}') for i in range(5)]
+        url = reverse('patient_records:patient_records_bulk_action')
+        ids = f'{records[0].pk},{records[1].pk}'
+        response = auth_client.post(url, {'ids': ids, 'action': 'deactivate'})
+        assert response.content.count(b'hx-swap-oob="true"') == 2
+        response = auth_client.post(url, {'ids': ids, 'action': 'delete'})
+        assert response.content.count(b'hx-swap-oob="delete"') == 2
+        assert f'patient_record-row-{records[0].pk}'.encode() in response.content
+
+
 @pytest.mark.django_db
 class TestSettings:
     """Settings view tests."""
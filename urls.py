@@ -15,6 +15,13 @@ urlpatterns = [
     # PatientRecord
     path('patient_records/', views.patient_records_list, name='patient_records_list'),
     path('patient_records/add/', views.patient_record_add, name='patient_record_add'),
+    path('patient_records/duplicates/', views.patient_record_duplicates, name='patient_record_duplicates'),
+    path('patient_records/merge/', views.patient_records_merge, name='patient_records_merge'),
+    path('patient_records/merges/', views.patient_merges, name='patient_merges'),
+    path('patient_records/merges/<uuid:pk>/undo/', views.patient_merge_undo, name='patient_merge_undo'),
+    path('patient_records/archive/', views.patient_archive, name='patient_archive'),
+    path('patient_records/archive/<uuid:pk>/restore/', views.patient_archive_restore, name='patient_archive_restore'),
+    path('patient_records/<uuid:pk>/', views.patient_record_detail, name='patient_record_detail'),
     path('patient_records/<uuid:pk>/edit/', views.patient_record_edit, name='patient_record_edit'),
     path('patient_records/<uuid:pk>/delete/', views.patient_record_delete, name='patient_record_delete'),
     path('patient_records/<uuid:pk>/toggle/', views.patient_record_toggle_status, name='patient_record_toggle_status'),
@@ -26,7 +33,20 @@ urlpatterns = [
     path('treatments/<uuid:pk>/edit/', views.treatment_edit, name='treatment_edit'),
     path('treatments/<uuid:pk>/delete/', views.treatment_delete, name='treatment_delete'),
     path('treatments/bulk/', views.treatments_bulk_action, name='treatments_bulk_action'),
+    path('treatments/archive/<uuid:pk>/restore/', views.treatment_archive_restore, name='treatment_archive_restore'),
+
+    # Bulk action jobs
+    path('bulk-jobs/<uuid:pk>/', views.bulk_job_status, name='bulk_job_status'),
+
+    # Background exports
+    path('exports/', views.export_job_start, name='export_job_start'),
+    path('exports/<uuid:pk>/', views.export_job_status, name='export_job_status'),
+    path('exports/<uuid:pk>/download/', views.export_job_download, name='export_job_download'),
+
+    # CSV import
+    path('import/<str:resource>/', views.import_view, name='import'),
 
     # Settings
     path('settings/', views.settings_view, name='settings'),
+    path('settings/metrics/', views.metrics, name='metrics'),
 ]
@@ -1,120 +1,278 @@
 """
 Patient Records Module Views
 """
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
-from django.http import HttpResponse
+import hashlib
+import hmac
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Q
+from django.http import FileResponse, Http404, HttpResponse
 from django.urls import reverse
 from django.shortcuts import get_object_or_404, render as django_render
 from django.utils import timezone
-from django.utils.translation import gettext_lazy as _
-from django.views.decorators.http import require_POST
+from django.utils.translation import get_language, gettext_lazy as _
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.views.decorators.vary import vary_on_headers
 
 from apps.accounts.decorators import login_required, permission_required
+from apps.accounts.models import LocalUser
 from apps.core.htmx import htmx_view
-from apps.core.services import export_to_csv, export_to_excel
 from apps.modules_runtime.navigation import with_module_nav
 
-from .models import PatientRecord, Treatment
-
+from . import archive, bulk_actions, counting, generations, instrumentation, retention, rollups, stats
+from .export_jobs import FILE_EXTENSIONS, ExportLimitReached, start_export
+from .duplicates import duplicate_groups, find_duplicates
+from .exports import (
+    EXCEL_STREAM_MAX_ROWS, PATIENT_RECORD_EXPORT_COLUMNS, TREATMENT_EXPORT_COLUMNS, stream_csv, stream_excel,
+)
+from .imports import import_patient_records, import_treatments
+from .instrumentation import instrumented
+from .merge import MergeError, merge_patients, undo_merge
+from .models import BulkActionJob, ExportJob, PatientMerge, PatientRecord, PatientRecordsSettings, Treatment
+from .pagination import paginate_keyset, paginate_offset
+from .queries import (
+    PATIENT_RECORD_DEFAULT_DIR, PATIENT_RECORD_DEFAULT_SORT, PATIENT_RECORD_LIST_FIELDS, PATIENT_RECORD_SORT_FIELDS,
+    TREATMENT_DEFAULT_DIR, TREATMENT_DEFAULT_SORT, TREATMENT_SORT_FIELDS, patient_records_queryset, resolve_sort,
+    treatments_queryset,
+)
+
+# ``0`` ("All") switches the list to infinite scroll in SCROLL_CHUNK_SIZE chunks.
 PER_PAGE_CHOICES = [12, 24, 48, 96, 0]
+SCROLL_CHUNK_SIZE = 50
+ARCHIVE_PAGE_SIZE = 50
+
+DASHBOARD_RANGES = [7, 30, 90, 365]
+DASHBOARD_DEFAULT_DAYS = 30
+
+
+# ======================================================================
+# Conditional GET
+# ======================================================================
+
+def _hub_etag(request, *args, **kwargs):
+    """Hub generation plus everything else the rendered response depends on."""
+    hub_id = request.session.get('hub_id')
+    # Exports stream a download or queue a job; a 304 would do neither.
+    if not hub_id or 'export' in request.GET:
+        return None
+    variant = '|'.join([
+        request.get_full_path(),
+        request.headers.get('HX-Request', ''),
+        request.headers.get('HX-Target', ''),
+        str(request.session.get('local_user_id', '')),
+        # Pages embed a CSRF token; a new login must not revalidate old ones.
+        request.session.session_key or '',
+        request.META.get('CSRF_COOKIE', ''),
+        get_language() or '',
+        timezone.localdate().isoformat(),
+    ])
+    return f'{generations.current(hub_id)}-{hashlib.md5(variant.encode()).hexdigest()[:16]}'
+
+
+def hub_conditional(view):
+    """Answer ``304 Not Modified`` while the hub's generation is unchanged.
+
+    Responses are marked private and always revalidated, so browsers (and
+    HTMX requests through them) send ``If-None-Match`` on every reload.
+    Export requests are never answered with a 304.
+    """
+    view = condition(etag_func=_hub_etag)(view)
+    view = cache_control(private=True, no_cache=True)(view)
+    return vary_on_headers('HX-Request', 'HX-Target')(view)
 
 
 # ======================================================================
 # Dashboard
 # ======================================================================
 
+@instrumented('dashboard')
 @login_required
+@hub_conditional
 @with_module_nav('patient_records', 'dashboard')
 @htmx_view('patient_records/pages/index.html', 'patient_records/partials/dashboard_content.html')
 def dashboard(request):
     hub_id = request.session.get('hub_id')
+    counts = stats.get_counts(hub_id)
+    try:
+        days = int(request.GET.get('days', DASHBOARD_DEFAULT_DAYS))
+    except (ValueError, TypeError):
+        days = DASHBOARD_DEFAULT_DAYS
+    if days not in DASHBOARD_RANGES:
+        days = DASHBOARD_DEFAULT_DAYS
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    if days > 90:
+        series = rollups.monthly_series(hub_id, start, end)
+    else:
+        series = rollups.daily_series(hub_id, start, end)
+    practitioners = rollups.practitioner_totals(hub_id, start, end)
+    names = dict(
+        LocalUser.objects.filter(id__in=[pid for pid, _total in practitioners if pid])
+        .values_list('id', 'name')
+    )
     return {
-        'total_patient_records': PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False).count(),
-        'total_treatments': Treatment.objects.filter(hub_id=hub_id, is_deleted=False).count(),
+        'total_patient_records': counts['patient_records'],
+        'total_treatments': counts['treatments'],
+        'active_patient_records': counts['active_patient_records'],
+        'inactive_patient_records': counts['patient_records'] - counts['active_patient_records'],
+        'days': days,
+        'dashboard_ranges': DASHBOARD_RANGES,
+        'monthly': days > 90,
+        'activity': _bars(series),
+        'activity_total': sum(total for _label, total in series),
+        'practitioners': _bars([(names.get(pid, pid) if pid else None, total) for pid, total in practitioners]),
     }
 
 
+def _bars(series):
+    peak = max([total for _label, total in series] or [0]) or 1
+    return [{'label': label, 'total': total, 'percent': round(total * 100 / peak)} for label, total in series]
+
+
 # ======================================================================
-# PatientRecord
+# Row fragments
 # ======================================================================
 
-PATIENT_RECORD_SORT_FIELDS = {
-    'is_active': 'is_active',
-    'patient_name': 'patient_name',
-    'date_of_birth': 'date_of_birth',
-    'gender': 'gender',
-    'blood_type': 'blood_type',
-    'allergies': 'allergies',
-    'created_at': 'created_at',
+ROW_TEMPLATES = {
+    PatientRecord: ('patient_records/partials/patient_record_row.html', 'patient_record-row'),
+    Treatment: ('patient_records/partials/treatment_row.html', 'treatment-row'),
+}
+
+ROW_URL_NAMES = {
+    PatientRecord: {
+        'detail': 'patient_records:patient_record_detail',
+        'edit': 'patient_records:patient_record_edit',
+        'delete': 'patient_records:patient_record_delete',
+        'toggle': 'patient_records:patient_record_toggle_status',
+    },
+    Treatment: {
+        'edit': 'patient_records:treatment_edit',
+        'delete': 'patient_records:treatment_delete',
+    },
 }
 
-def _build_patient_records_context(hub_id, per_page=10):
-    qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False).order_by('is_active')
-    paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
-    page_obj = paginator.get_page(1)
+_URL_PLACEHOLDER = str(uuid.UUID(int=0))
+
+def _row_urls(model):
+    """``{action: [prefix, suffix]}`` around the row id, reversed once per response."""
     return {
-        'patient_records': page_obj,
-        'page_obj': page_obj,
-        'search_query': '',
-        'sort_field': 'is_active',
-        'sort_dir': 'asc',
-        'current_view': 'table',
-        'per_page': per_page,
+        action: reverse(name, args=[_URL_PLACEHOLDER]).split(_URL_PLACEHOLDER)
+        for action, name in ROW_URL_NAMES[model].items()
     }
 
-def _render_patient_records_list(request, hub_id, per_page=10):
-    ctx = _build_patient_records_context(hub_id, per_page)
-    return django_render(request, 'patient_records/partials/patient_records_list.html', ctx)
+def _render_row(request, obj):
+    """Render one row for an ``outerHTML`` swap on ``closest tr``."""
+    template, _prefix = ROW_TEMPLATES[type(obj)]
+    return django_render(request, template, {'item': obj, 'row_urls': _row_urls(type(obj))})
+
+def _render_oob_rows(request, model, rows=(), removed=()):
+    """Replace ``rows`` and remove the rows with ids in ``removed`` out of band."""
+    template, prefix = ROW_TEMPLATES[model]
+    return django_render(request, 'patient_records/partials/oob_rows.html', {
+        'rows': rows, 'removed': removed, 'row_template': template, 'row_prefix': prefix,
+        'row_urls': _row_urls(model),
+    })
+
+def _saved_response(request, obj, list_url_name):
+    # The full-page edit form navigates back to the list; the side panel
+    # leaves the list where it is and only refreshes the edited row.
+    if request.htmx.target == 'main-content-area':
+        response = HttpResponse(status=204)
+        response['HX-Redirect'] = reverse(list_url_name)
+        return response
+    return _render_oob_rows(request, type(obj), rows=[obj])
+
+
+def _queue_excel_export(request, resource, search_query, sort_field, sort_dir):
+    """Queue a background Excel export too large to stream; list context showing the job."""
+    params = {'search_query': search_query, 'sort_field': sort_field, 'sort_dir': sort_dir}
+    try:
+        job = start_export(
+            request.session.get('hub_id'), resource, 'excel', params, request.session.get('local_user_id'),
+        )
+    except ExportLimitReached:
+        return {'export_error': _('Too many exports in progress. Please wait for one to finish.')}
+    return {'export_job': job}
+
+
+# ======================================================================
+# PatientRecord
+# ======================================================================
 
+@instrumented('patient_records_list')
 @login_required
+@hub_conditional
 @with_module_nav('patient_records', 'patients')
 @htmx_view('patient_records/pages/patient_records.html', 'patient_records/partials/patient_records_content.html')
 def patient_records_list(request):
     hub_id = request.session.get('hub_id')
     search_query = request.GET.get('q', '').strip()
-    sort_field = request.GET.get('sort', 'is_active')
+    # No sort means relevance order for a search, else the default sort.
+    sort_field = request.GET.get('sort', '')
     sort_dir = request.GET.get('dir', 'asc')
     page_number = request.GET.get('page', 1)
     current_view = request.GET.get('view', 'table')
     per_page = int(request.GET.get('per_page', 12))
     if per_page not in PER_PAGE_CHOICES:
         per_page = 12
+    paginate = request.GET.get('paginate', '')
 
-    qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False)
-
-    if search_query:
-        qs = qs.filter(Q(patient_name__icontains=search_query) | Q(gender__icontains=search_query) | Q(blood_type__icontains=search_query) | Q(allergies__icontains=search_query))
-
-    order_by = PATIENT_RECORD_SORT_FIELDS.get(sort_field, 'is_active')
-    if sort_dir == 'desc':
-        order_by = f'-{order_by}'
-    qs = qs.order_by(order_by)
+    qs = patient_records_queryset(hub_id, search_query, sort_field, sort_dir)
 
     export_format = request.GET.get('export')
-    if export_format in ('csv', 'excel'):
-        fields = ['is_active', 'patient_name', 'date_of_birth', 'gender', 'blood_type', 'allergies']
-        headers = ['Is Active', 'Patient Name', 'Date Of Birth', 'Gender', 'Blood Type', 'Allergies']
-        if export_format == 'csv':
-            return export_to_csv(qs, fields=fields, headers=headers, filename='patient_records.csv')
-        return export_to_excel(qs, fields=fields, headers=headers, filename='patient_records.xlsx')
-
-    paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
-    page_obj = paginator.get_page(page_number)
+    export_context = {}
+    if export_format == 'csv':
+        return stream_csv(qs, PATIENT_RECORD_EXPORT_COLUMNS, 'patient_records.csv')
+    if export_format == 'excel':
+        # A workbook is only sent once complete; large ones are built by a
+        # background job and the list page shows its progress instead.
+        export_count, _approximate = counting.list_count(hub_id, 'patient_records', qs, search_query)
+        if export_count <= EXCEL_STREAM_MAX_ROWS:
+            return stream_excel(qs, PATIENT_RECORD_EXPORT_COLUMNS, 'patient_records.xlsx')
+        export_context = _queue_excel_export(request, 'patient_records', search_query, sort_field, sort_dir)
+
+    if per_page == 0:
+        paginate = 'scroll'
+    if paginate in ('cursor', 'scroll'):
+        sort_key, key_dir = resolve_sort(
+            PATIENT_RECORD_SORT_FIELDS, PATIENT_RECORD_DEFAULT_SORT, PATIENT_RECORD_DEFAULT_DIR, sort_field, sort_dir,
+        )
+        page_obj = paginate_keyset(
+            qs, PATIENT_RECORD_SORT_FIELDS[sort_key], sort_key, key_dir,
+            request.GET.get('cursor'), per_page or SCROLL_CHUNK_SIZE,
+        )
+    else:
+        count, approximate = counting.list_count(hub_id, 'patient_records', qs, search_query)
+        page_obj = paginate_offset(qs, per_page, page_number, count, approximate)
+
+    if request.htmx and request.htmx.target == 'patient_records-more':
+        return django_render(request, 'patient_records/partials/patient_records_rows.html', {
+            'patient_records': page_obj, 'page_obj': page_obj, 'paginate': paginate,
+            'row_urls': _row_urls(PatientRecord),
+        })
 
     if request.htmx and request.htmx.target == 'datatable-body':
         return django_render(request, 'patient_records/partials/patient_records_list.html', {
             'patient_records': page_obj, 'page_obj': page_obj,
             'search_query': search_query, 'sort_field': sort_field,
             'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
+            'paginate': paginate, 'row_urls': _row_urls(PatientRecord),
         })
 
     return {
         'patient_records': page_obj, 'page_obj': page_obj,
         'search_query': search_query, 'sort_field': sort_field,
         'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
+        'paginate': paginate, 'row_urls': _row_urls(PatientRecord),
+        **export_context,
     }
 
+@instrumented('patient_record_add')
 @login_required
 @htmx_view('patient_records/pages/patient_record_add.html', 'patient_records/partials/patient_record_add_content.html')
 def patient_record_add(request):
@@ -127,6 +285,10 @@ def patient_record_add(request):
         allergies = request.POST.get('allergies', '').strip()
         medical_notes = request.POST.get('medical_notes', '').strip()
         is_active = request.POST.get('is_active') == 'on'
+        if not request.POST.get('confirm_duplicate'):
+            duplicates = find_duplicates(hub_id, patient_name, date_of_birth)
+            if duplicates:
+                return {'duplicates': duplicates, 'form': request.POST}
         obj = PatientRecord(hub_id=hub_id)
         obj.patient_name = patient_name
         obj.date_of_birth = date_of_birth
@@ -141,11 +303,127 @@ def patient_record_add(request):
         return response
     return {}
 
+@instrumented('patient_record_duplicates')
+@login_required
+@with_module_nav('patient_records', 'patients')
+@htmx_view('patient_records/pages/patient_record_duplicates.html', 'patient_records/partials/patient_record_duplicates_content.html')
+def patient_record_duplicates(request):
+    hub_id = request.session.get('hub_id')
+    return {'groups': duplicate_groups(hub_id)}
+
+@instrumented('patient_records_merge')
+@login_required
+@with_module_nav('patient_records', 'patients')
+@htmx_view('patient_records/pages/patient_records_merge.html', 'patient_records/partials/patient_records_merge_content.html')
+def patient_records_merge(request):
+    hub_id = request.session.get('hub_id')
+    source = request.POST if request.method == 'POST' else request.GET
+    ids = [i.strip() for i in source.get('ids', '').split(',') if i.strip()]
+    if request.method == 'POST':
+        survivor_id = request.POST.get('survivor', '')
+        try:
+            merge = merge_patients(
+                hub_id, survivor_id, [pk for pk in ids if pk != survivor_id], request.session.get('local_user_id'),
+            )
+        except (MergeError, ValidationError) as exc:
+            return django_render(request, 'patient_records/partials/patient_merge_result.html', {'error': exc})
+        return django_render(request, 'patient_records/partials/patient_merge_result.html', {'merge': merge})
+    try:
+        patients = list(
+            PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False, pk__in=ids)
+            .select_related('detail')
+            .annotate(treatment_count=Count('treatments', filter=Q(treatments__is_deleted=False)))
+            .order_by('created_at')
+        )
+    except ValidationError:
+        patients = []
+    return {'patients': patients, 'ids': ','.join(str(patient.pk) for patient in patients)}
+
+@instrumented('patient_merges')
+@login_required
+@with_module_nav('patient_records', 'patients')
+@htmx_view('patient_records/pages/patient_merges.html', 'patient_records/partials/patient_merges_content.html')
+def patient_merges(request):
+    hub_id = request.session.get('hub_id')
+    merges = PatientMerge.objects.filter(hub_id=hub_id).select_related('survivor').order_by('-created_at')[:50]
+    return {'merges': merges}
+
+@instrumented('patient_merge_undo')
+@login_required
+@require_POST
+def patient_merge_undo(request, pk):
+    hub_id = request.session.get('hub_id')
+    try:
+        merge = undo_merge(hub_id, pk)
+    except MergeError as exc:
+        return django_render(request, 'patient_records/partials/patient_merge_result.html', {'error': exc})
+    return django_render(request, 'patient_records/partials/patient_merge_result.html', {'merge': merge})
+
+TIMELINE_PER_PAGE = 25
+TIMELINE_FIELDS = (
+    'id', 'patient_id', 'date', 'practitioner_id',
+    'detail__description', 'detail__diagnosis', 'detail__prescription', 'detail__notes',
+)
+
+@instrumented('patient_record_detail')
+@login_required
+@with_module_nav('patient_records', 'patients')
+@htmx_view('patient_records/pages/patient_record_detail.html', 'patient_records/partials/patient_record_detail_content.html')
+def patient_record_detail(request, pk):
+    hub_id = request.session.get('hub_id')
+    # Reads the (patient, -date, -id) index; never counts the patient's treatments.
+    treatments = Treatment.objects.filter(
+        hub_id=hub_id, patient_id=pk, is_deleted=False,
+    ).select_related('detail').only(*TIMELINE_FIELDS)
+    page_obj = paginate_keyset(treatments, 'date', 'date', 'desc', request.GET.get('cursor'), TIMELINE_PER_PAGE)
+    if request.htmx and request.htmx.target == 'timeline-more':
+        return django_render(request, 'patient_records/partials/patient_record_timeline.html', {
+            'obj_id': pk, 'page_obj': page_obj,
+        })
+    obj = get_object_or_404(PatientRecord.objects.select_related('detail'), pk=pk, hub_id=hub_id, is_deleted=False)
+    return {'obj': obj, 'obj_id': pk, 'page_obj': page_obj}
+
+@instrumented('patient_archive')
+@login_required
+@with_module_nav('patient_records', 'patients')
+@htmx_view('patient_records/pages/patient_archive.html', 'patient_records/partials/patient_archive_content.html')
+def patient_archive(request):
+    hub_id = request.session.get('hub_id')
+    search_query = request.GET.get('q', '').strip()
+    patients = archive.search_archive(hub_id, search_query)[:ARCHIVE_PAGE_SIZE]
+    treatments = archive.search_archived_treatments(hub_id, search_query)[:ARCHIVE_PAGE_SIZE]
+    return {'patients': patients, 'treatments': treatments, 'search_query': search_query}
+
+@instrumented('patient_archive_restore')
+@login_required
+@require_POST
+def patient_archive_restore(request, pk):
+    hub_id = request.session.get('hub_id')
+    try:
+        patient = archive.restore_patient(hub_id, pk)
+    except archive.ArchiveError as exc:
+        return django_render(request, 'patient_records/partials/patient_archive_result.html', {'error': exc})
+    return django_render(request, 'patient_records/partials/patient_archive_result.html', {'patient': patient})
+
+@instrumented('treatment_archive_restore')
+@login_required
+@require_POST
+def treatment_archive_restore(request, pk):
+    hub_id = request.session.get('hub_id')
+    try:
+        treatment = archive.restore_treatment(hub_id, pk)
+    except archive.ArchiveError as exc:
+        return django_render(request, 'patient_records/partials/patient_archive_result.html', {'error': exc})
+    return django_render(request, 'patient_records/partials/patient_archive_result.html', {
+        'treatment': treatment, 'patient': treatment.patient,
+    })
+
+@instrumented('patient_record_edit')
 @login_required
 @htmx_view('patient_records/pages/patient_record_edit.html', 'patient_records/partials/patient_record_edit_content.html')
 def patient_record_edit(request, pk):
     hub_id = request.session.get('hub_id')
-    obj = get_object_or_404(PatientRecord, pk=pk, hub_id=hub_id, is_deleted=False)
+    obj = get_object_or_404(PatientRecord.objects.select_related('detail'), pk=pk, hub_id=hub_id, is_deleted=False)
     if request.method == 'POST':
         obj.patient_name = request.POST.get('patient_name', '').strip()
         obj.date_of_birth = request.POST.get('date_of_birth') or None
@@ -155,9 +433,10 @@ def patient_record_edit(request, pk):
         obj.medical_notes = request.POST.get('medical_notes', '').strip()
         obj.is_active = request.POST.get('is_active') == 'on'
         obj.save()
-        return _render_patient_records_list(request, hub_id)
+        return _saved_response(request, obj, 'patient_records:patient_records_list')
     return {'obj': obj}
 
+@instrumented('patient_record_delete')
 @login_required
 @require_POST
 def patient_record_delete(request, pk):
@@ -166,8 +445,9 @@ def patient_record_delete(request, pk):
     obj.is_deleted = True
     obj.deleted_at = timezone.now()
     obj.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
-    return _render_patient_records_list(request, hub_id)
+    return HttpResponse('')
 
+@instrumented('patient_record_toggle_status')
 @login_required
 @require_POST
 def patient_record_toggle_status(request, pk):
@@ -175,104 +455,99 @@ def patient_record_toggle_status(request, pk):
     obj = get_object_or_404(PatientRecord, pk=pk, hub_id=hub_id, is_deleted=False)
     obj.is_active = not obj.is_active
     obj.save(update_fields=['is_active', 'updated_at'])
-    return _render_patient_records_list(request, hub_id)
+    return _render_row(request, obj)
 
+@instrumented('patient_records_bulk_action')
 @login_required
 @require_POST
 def patient_records_bulk_action(request):
     hub_id = request.session.get('hub_id')
-    ids = [i.strip() for i in request.POST.get('ids', '').split(',') if i.strip()]
     action = request.POST.get('action', '')
+    if not bulk_actions.is_supported('patient_records', action):
+        return HttpResponse(status=400)
+    if request.POST.get('select') == 'all':
+        return _start_bulk_job(request, 'patient_records', action)
+    ids = [i.strip() for i in request.POST.get('ids', '').split(',') if i.strip()]
     qs = PatientRecord.objects.filter(hub_id=hub_id, is_deleted=False, id__in=ids)
-    if action == 'activate':
-        qs.update(is_active=True)
-    elif action == 'deactivate':
-        qs.update(is_active=False)
-    elif action == 'delete':
-        qs.update(is_deleted=True, deleted_at=timezone.now())
-    return _render_patient_records_list(request, hub_id)
+    if action == 'delete':
+        deleted_ids = [str(pk) for pk in qs.values_list('pk', flat=True)]
+        bulk_actions.apply_action(hub_id, 'patient_records', action, qs)
+        return _render_oob_rows(request, PatientRecord, removed=deleted_ids)
+    bulk_actions.apply_action(hub_id, 'patient_records', action, qs)
+    return _render_oob_rows(request, PatientRecord, rows=qs.only(*PATIENT_RECORD_LIST_FIELDS))
 
 
 # ======================================================================
 # Treatment
 # ======================================================================
 
-TREATMENT_SORT_FIELDS = {
-    'patient': 'patient',
-    'date': 'date',
-    'description': 'description',
-    'diagnosis': 'diagnosis',
-    'prescription': 'prescription',
-    'practitioner_id': 'practitioner_id',
-    'created_at': 'created_at',
-}
-
-def _build_treatments_context(hub_id, per_page=10):
-    qs = Treatment.objects.filter(hub_id=hub_id, is_deleted=False).order_by('patient')
-    paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
-    page_obj = paginator.get_page(1)
-    return {
-        'treatments': page_obj,
-        'page_obj': page_obj,
-        'search_query': '',
-        'sort_field': 'patient',
-        'sort_dir': 'asc',
-        'current_view': 'table',
-        'per_page': per_page,
-    }
-
-def _render_treatments_list(request, hub_id, per_page=10):
-    ctx = _build_treatments_context(hub_id, per_page)
-    return django_render(request, 'patient_records/partials/treatments_list.html', ctx)
-
+@instrumented('treatments_list')
 @login_required
+@hub_conditional
 @with_module_nav('patient_records', 'patients')
 @htmx_view('patient_records/pages/treatments.html', 'patient_records/partials/treatments_content.html')
 def treatments_list(request):
     hub_id = request.session.get('hub_id')
     search_query = request.GET.get('q', '').strip()
-    sort_field = request.GET.get('sort', 'patient')
+    sort_field = request.GET.get('sort', '')
     sort_dir = request.GET.get('dir', 'asc')
     page_number = request.GET.get('page', 1)
     current_view = request.GET.get('view', 'table')
     per_page = int(request.GET.get('per_page', 12))
     if per_page not in PER_PAGE_CHOICES:
         per_page = 12
+    paginate = request.GET.get('paginate', '')
 
-    qs = Treatment.objects.filter(hub_id=hub_id, is_deleted=False)
-
-    if search_query:
-        qs = qs.filter(Q(description__icontains=search_query) | Q(diagnosis__icontains=search_query) | Q(prescription__icontains=search_query) | Q(notes__icontains=search_query))
-
-    order_by = TREATMENT_SORT_FIELDS.get(sort_field, 'patient')
-    if sort_dir == 'desc':
-        order_by = f'-{order_by}'
-    qs = qs.order_by(order_by)
+    qs = treatments_queryset(hub_id, search_query, sort_field, sort_dir)
 
     export_format = request.GET.get('export')
-    if export_format in ('csv', 'excel'):
-        fields = ['patient', 'date', 'description', 'diagnosis', 'prescription', 'practitioner_id']
-        headers = ['PatientRecord', 'Date', 'Description', 'Diagnosis', 'Prescription', 'Practitioner Id']
-        if export_format == 'csv':
-            return export_to_csv(qs, fields=fields, headers=headers, filename='treatments.csv')
-        return export_to_excel(qs, fields=fields, headers=headers, filename='treatments.xlsx')
-
-    paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
-    page_obj = paginator.get_page(page_number)
+    export_context = {}
+    if export_format == 'csv':
+        return stream_csv(qs, TREATMENT_EXPORT_COLUMNS, 'treatments.csv')
+    if export_format == 'excel':
+        # Large workbooks are built by a background job (see patient_records_list).
+        export_count, _approximate = counting.list_count(hub_id, 'treatments', qs, search_query)
+        if export_count <= EXCEL_STREAM_MAX_ROWS:
+            return stream_excel(qs, TREATMENT_EXPORT_COLUMNS, 'treatments.xlsx')
+        export_context = _queue_excel_export(request, 'treatments', search_query, sort_field, sort_dir)
+
+    if per_page == 0:
+        paginate = 'scroll'
+    if paginate in ('cursor', 'scroll'):
+        sort_key, key_dir = resolve_sort(
+            TREATMENT_SORT_FIELDS, TREATMENT_DEFAULT_SORT, TREATMENT_DEFAULT_DIR, sort_field, sort_dir,
+        )
+        page_obj = paginate_keyset(
+            qs, TREATMENT_SORT_FIELDS[sort_key], sort_key, key_dir,
+            request.GET.get('cursor'), per_page or SCROLL_CHUNK_SIZE,
+        )
+    else:
+        count, approximate = counting.list_count(hub_id, 'treatments', qs, search_query)
+        page_obj = paginate_offset(qs, per_page, page_number, count, approximate)
+
+    if request.htmx and request.htmx.target == 'treatments-more':
+        return django_render(request, 'patient_records/partials/treatments_rows.html', {
+            'treatments': page_obj, 'page_obj': page_obj, 'paginate': paginate,
+            'row_urls': _row_urls(Treatment),
+        })
 
     if request.htmx and request.htmx.target == 'datatable-body':
         return django_render(request, 'patient_records/partials/treatments_list.html', {
             'treatments': page_obj, 'page_obj': page_obj,
             'search_query': search_query, 'sort_field': sort_field,
             'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
+            'paginate': paginate, 'row_urls': _row_urls(Treatment),
         })
 
     return {
         'treatments': page_obj, 'page_obj': page_obj,
         'search_query': search_query, 'sort_field': sort_field,
         'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
+        'paginate': paginate, 'row_urls': _row_urls(Treatment),
+        **export_context,
     }
 
+@instrumented('treatment_add')
 @login_required
 @htmx_view('patient_records/pages/treatment_add.html', 'patient_records/partials/treatment_add_content.html')
 def treatment_add(request):
@@ -297,11 +572,14 @@ def treatment_add(request):
         return response
     return {}
 
+@instrumented('treatment_edit')
 @login_required
 @htmx_view('patient_records/pages/treatment_edit.html', 'patient_records/partials/treatment_edit_content.html')
 def treatment_edit(request, pk):
     hub_id = request.session.get('hub_id')
-    obj = get_object_or_404(Treatment, pk=pk, hub_id=hub_id, is_deleted=False)
+    obj = get_object_or_404(
+        Treatment.objects.select_related('patient', 'detail'), pk=pk, hub_id=hub_id, is_deleted=False,
+    )
     if request.method == 'POST':
         obj.date = request.POST.get('date') or None
         obj.description = request.POST.get('description', '').strip()
@@ -310,9 +588,10 @@ def treatment_edit(request, pk):
         obj.practitioner_id = request.POST.get('practitioner_id', '').strip()
         obj.notes = request.POST.get('notes', '').strip()
         obj.save()
-        return _render_treatments_list(request, hub_id)
+        return _saved_response(request, obj, 'patient_records:treatments_list')
     return {'obj': obj}
 
+@instrumented('treatment_delete')
 @login_required
 @require_POST
 def treatment_delete(request, pk):
@@ -321,24 +600,174 @@ def treatment_delete(request, pk):
     obj.is_deleted = True
     obj.deleted_at = timezone.now()
     obj.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
-    return _render_treatments_list(request, hub_id)
+    return HttpResponse('')
 
+@instrumented('treatments_bulk_action')
 @login_required
 @require_POST
 def treatments_bulk_action(request):
     hub_id = request.session.get('hub_id')
-    ids = [i.strip() for i in request.POST.get('ids', '').split(',') if i.strip()]
     action = request.POST.get('action', '')
+    if not bulk_actions.is_supported('treatments', action):
+        return HttpResponse(status=400)
+    if request.POST.get('select') == 'all':
+        return _start_bulk_job(request, 'treatments', action)
+    ids = [i.strip() for i in request.POST.get('ids', '').split(',') if i.strip()]
     qs = Treatment.objects.filter(hub_id=hub_id, is_deleted=False, id__in=ids)
-    if action == 'delete':
-        qs.update(is_deleted=True, deleted_at=timezone.now())
-    return _render_treatments_list(request, hub_id)
+    deleted_ids = [str(pk) for pk in qs.values_list('pk', flat=True)]
+    bulk_actions.apply_action(hub_id, 'treatments', action, qs)
+    return _render_oob_rows(request, Treatment, removed=deleted_ids)
+
+
+# ======================================================================
+# Bulk action jobs ("select all matching")
+# ======================================================================
+
+def _start_bulk_job(request, resource, action):
+    try:
+        job = bulk_actions.start_bulk_action(
+            request.session.get('hub_id'), resource, action,
+            {'search_query': request.POST.get('q', '').strip()}, request.session.get('local_user_id'),
+        )
+    except bulk_actions.BulkActionInProgress:
+        return django_render(request, 'patient_records/partials/bulk_job.html', {
+            'error': _('Another bulk action is still running. Please wait for it to finish.'),
+        })
+    return django_render(request, 'patient_records/partials/bulk_job.html', {'job': job})
+
+@instrumented('bulk_job_status')
+@login_required
+def bulk_job_status(request, pk):
+    hub_id = request.session.get('hub_id')
+    job = get_object_or_404(BulkActionJob, pk=pk, hub_id=hub_id)
+    return django_render(request, 'patient_records/partials/bulk_job.html', {'job': job})
+
+
+# ======================================================================
+# Background exports
+# ======================================================================
 
+@instrumented('export_job_start')
+@login_required
+@require_POST
+def export_job_start(request):
+    hub_id = request.session.get('hub_id')
+    params = {
+        'search_query': request.POST.get('q', '').strip(),
+        'sort_field': request.POST.get('sort', ''),
+        'sort_dir': request.POST.get('dir', 'asc'),
+    }
+    try:
+        job = start_export(
+            hub_id, request.POST.get('resource', ''), request.POST.get('format', 'csv'),
+            params, request.session.get('local_user_id'),
+        )
+    except ExportLimitReached:
+        return django_render(request, 'patient_records/partials/export_job.html', {
+            'error': _('Too many exports in progress. Please wait for one to finish.'),
+        })
+    except ValueError:
+        return HttpResponse(status=400)
+    return django_render(request, 'patient_records/partials/export_job.html', {'job': job})
 
+@instrumented('export_job_status')
+@login_required
+def export_job_status(request, pk):
+    hub_id = request.session.get('hub_id')
+    job = get_object_or_404(ExportJob, pk=pk, hub_id=hub_id)
+    return django_render(request, 'patient_records/partials/export_job.html', {'job': job})
+
+@instrumented('export_job_download')
+@login_required
+def export_job_download(request, pk):
+    hub_id = request.session.get('hub_id')
+    job = get_object_or_404(ExportJob, pk=pk, hub_id=hub_id, status=ExportJob.DONE)
+    if not os.path.exists(job.file_path):
+        raise Http404
+    filename = f'{job.resource}.{FILE_EXTENSIONS[job.export_format]}'
+    return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=filename)
+
+
+# ======================================================================
+# CSV import
+# ======================================================================
+
+IMPORTERS = {
+    'patient_records': (import_patient_records, 'patient_records:patient_records_list', _('Import Patients')),
+    'treatments': (import_treatments, 'patient_records:treatments_list', _('Import Treatments')),
+}
+
+@instrumented('import_view')
+@login_required
+@with_module_nav('patient_records', 'patients')
+@htmx_view('patient_records/pages/import.html', 'patient_records/partials/import_content.html')
+def import_view(request, resource):
+    if resource not in IMPORTERS:
+        raise Http404
+    importer, list_url_name, title = IMPORTERS[resource]
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload is None:
+            result = None
+            error = _('Choose a CSV file to import.')
+        else:
+            result = importer(request.session.get('hub_id'), upload.file, request.session.get('local_user_id'))
+            error = None
+        return django_render(request, 'patient_records/partials/import_result.html', {
+            'result': result, 'error': error, 'list_url_name': list_url_name,
+        })
+    return {'resource': resource, 'title': title, 'list_url_name': list_url_name}
+
+
+@instrumented('settings_view')
 @login_required
 @permission_required('patient_records.manage_settings')
 @with_module_nav('patient_records', 'settings')
 @htmx_view('patient_records/pages/settings.html', 'patient_records/partials/settings_content.html')
 def settings_view(request):
-    return {}
+    hub_id = request.session.get('hub_id')
+    module_settings = PatientRecordsSettings.for_hub(hub_id)
+    if request.method == 'POST':
+        raw_days = request.POST.get('retention_days', '').strip()
+        error = report = None
+        try:
+            retention_days = int(raw_days) if raw_days else None
+        except ValueError:
+            retention_days, error = None, _('Enter a whole number of days.')
+        if error is None and retention_days is not None and retention_days < retention.MIN_RETENTION_DAYS:
+            error = _('Keep deleted records for at least %(days)s days.') % {'days': retention.MIN_RETENTION_DAYS}
+        if error is None and request.POST.get('action') == 'preview' and retention_days is not None:
+            report = retention.purge_hub(hub_id, retention_days, dry_run=True)
+        elif error is None:
+            module_settings.retention_days = retention_days
+            module_settings.updated_by = request.session.get('local_user_id')
+            module_settings.save()
+        return django_render(request, 'patient_records/partials/retention_result.html', {
+            'error': error, 'report': report, 'retention_days': retention_days,
+        })
+    return {
+        'module_settings': module_settings,
+        'min_retention_days': retention.MIN_RETENTION_DAYS,
+        'endpoint_metrics': instrumentation.snapshot(),
+    }
+
+
+def _metrics_token_ok(request):
+    token = getattr(settings, 'PATIENT_RECORDS_METRICS_TOKEN', None)
+    header = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(header, f'Bearer {token}')
+
+
+def _metrics_response(request):
+    return HttpResponse(instrumentation.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+_metrics_for_user = login_required(permission_required('patient_records.manage_settings')(_metrics_response))
+
+
+def metrics(request):
+    """Prometheus scrape endpoint: a bearer token from settings, or a signed-in admin."""
+    if _metrics_token_ok(request):
+        return _metrics_response(request)
+    return _metrics_for_user(request)
 
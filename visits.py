@@ -0,0 +1,55 @@
+"""
+Per-patient visit summary (``visit_count`` / ``last_visit_date``).
+
+The two columns are recomputed for the affected patients only, with one
+``UPDATE`` whose correlated subqueries read the ``(patient, -date, -id)``
+treatment index. Treatment saves and deletes call ``refresh`` through the
+signals; bulk paths (bulk delete, CSV import, merge) call it with the
+patients they touched.
+"""
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import generations
+from .models import PatientRecord, Treatment
+
+
+def visit_summary():
+    """``{field: expression}`` computing the summary columns of each ``PatientRecord`` row."""
+    live = Treatment.objects.filter(patient=OuterRef('pk'), is_deleted=False).order_by().values('patient')
+    return {
+        'visit_count': Coalesce(
+            Subquery(live.annotate(total=Count('id')).values('total')[:1], output_field=IntegerField()),
+            Value(0),
+        ),
+        'last_visit_date': Subquery(live.annotate(last=Max('date')).values('last')[:1]),
+    }
+
+
+def refresh(patient_ids):
+    """Recompute the visit summary of the given patients."""
+    patient_ids = {pk for pk in patient_ids if pk is not None}
+    if patient_ids:
+        PatientRecord.all_objects.filter(pk__in=patient_ids).update(**visit_summary())
+
+
+def rebuild(hub_id):
+    """Recompute the visit summary of every patient in ``hub_id``."""
+    updated = PatientRecord.all_objects.filter(hub_id=hub_id).update(**visit_summary())
+    generations.bump(hub_id)
+    return updated
+
+
+def treatment_patients(instance, created=False, deleted=False):
+    """Patients whose summary changes when ``instance`` is saved or hard-deleted.
+
+    Returns ``None`` when the previous state is unknown.
+    """
+    if created or deleted:
+        return {instance.patient_id}
+    fields = ('is_deleted', 'date', 'patient_id')
+    if not all(instance.is_tracked(field) for field in fields):
+        return None
+    if all(instance.loaded_value(field) == getattr(instance, field) for field in fields):
+        return set()
+    return {instance.patient_id, instance.loaded_value('patient_id')}
@@ -0,0 +1,88 @@
+"""
+Bulk write paths that keep derived data in sync.
+
+``bulk_create`` and ``bulk_update`` send no save signals, so these helpers
+make the search index, counter, rollup and visit summary updates (and the
+generation bump) the signals would otherwise have made, inside the same
+transaction as the write. Used by the CSV import and the batch AI tools.
+The detail rows holding each record's clinical text are written with the
+records.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import generations, rollups, search, stats, visits
+from .models import PatientRecord, PatientRecordDetail, Treatment, TreatmentDetail
+
+
+def _create_details(detail_model, objs):
+    detail_model.objects.bulk_create([obj.get_detail() for obj in objs])
+    for obj in objs:
+        obj.reset_tracking()
+
+
+def create_patient_records(hub_id, objs):
+    """Insert unsaved ``PatientRecord`` objects of ``hub_id`` with one ``bulk_create``."""
+    for obj in objs:
+        obj.set_name_keys()
+    with transaction.atomic():
+        PatientRecord.objects.bulk_create(objs)
+        _create_details(PatientRecordDetail, objs)
+        search.index_records(PatientRecord, [obj.pk for obj in objs])
+        stats.apply_deltas(hub_id, {
+            'patient_records': len(objs),
+            'active_patient_records': sum(1 for obj in objs if obj.is_active),
+        })
+        generations.bump(hub_id)
+    return objs
+
+
+def create_treatments(hub_id, objs):
+    """Insert unsaved ``Treatment`` objects of ``hub_id`` with one ``bulk_create``."""
+    deltas = {}
+    for obj in objs:
+        key = (obj.date, obj.practitioner_id)
+        deltas[key] = deltas.get(key, 0) + 1
+    with transaction.atomic():
+        Treatment.objects.bulk_create(objs)
+        _create_details(TreatmentDetail, objs)
+        search.index_records(Treatment, [obj.pk for obj in objs])
+        rollups.apply(hub_id, deltas)
+        visits.refresh({obj.patient_id for obj in objs})
+        stats.adjust(hub_id, 'treatments', len(objs))
+        generations.bump(hub_id)
+    return objs
+
+
+def update_treatments(hub_id, objs, fields):
+    """Write ``fields`` of loaded, modified ``Treatment`` objects with one ``bulk_update``.
+
+    The objects must have been loaded with their tracked fields, so the
+    rollup and visit summary changes can be derived from the loaded values
+    (and with ``select_related('detail')`` when ``fields`` has detail text).
+    """
+    detail_fields = [field for field in fields if field in Treatment.DETAIL_FIELDS]
+    row_fields = [
+        *(field for field in fields if field not in Treatment.DETAIL_FIELDS),
+        *(Treatment.PREVIEW_FIELDS[field] for field in detail_fields if field in Treatment.PREVIEW_FIELDS),
+    ]
+    deltas, patient_ids = {}, set()
+    for obj in objs:
+        for key, delta in rollups.treatment_deltas(obj).items():
+            deltas[key] = deltas.get(key, 0) + delta
+        patient_ids |= visits.treatment_patients(obj)
+    now = timezone.now()
+    for obj in objs:
+        obj.updated_at = now
+    with transaction.atomic():
+        Treatment.objects.bulk_update(objs, [*row_fields, 'updated_at'])
+        if detail_fields:
+            TreatmentDetail.objects.bulk_update([obj.get_detail() for obj in objs], detail_fields)
+        if any(field in fields for field, _weight in search.SEARCH_FIELDS[Treatment]):
+            search.index_records(Treatment, [obj.pk for obj in objs])
+        rollups.apply(hub_id, deltas)
+        visits.refresh(patient_ids)
+        generations.bump(hub_id)
+    for obj in objs:
+        obj.reset_tracking()
+    return objs